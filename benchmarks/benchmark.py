@@ -0,0 +1,258 @@
+# Requires Python 3.8 or later
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import builtins
+import functools
+import platform
+import tempfile
+import statistics
+import contextlib
+
+# The converter lives in the src folder of the repository
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPOSITORY_PATH, "src"))
+
+from process import run
+from manifest import CONVERTER_VERSION
+from async_io import DEFAULT_IN_FLIGHT
+from synthetic import generate_workspace, add_generator_arguments, get_generator_options
+
+DEFAULT_REPORT_PATH = os.path.join(REPOSITORY_PATH, "src", "Default.Report")
+
+# The file system calls delayed by simulated_latency(), by module
+LATENCY_FUNCTIONS = (
+    (builtins, "open"),
+    (os, "stat"),
+    (os, "lstat"),
+    (os, "scandir"),
+    (os, "listdir"),
+    (os, "mkdir"),
+    (os, "replace"),
+    (os, "remove"),
+    (os, "link")
+)
+
+
+@contextlib.contextmanager
+def simulated_latency(seconds):
+    """
+    Simulates a network file system (SMB, NFS): every open(), stat, listing, rename, removal
+    and link waits for the given time first, as for a round trip to the server. The waits
+    release the GIL, so concurrent calls overlap as they would on the network.
+
+    Parameters:
+        seconds (float): The delay of each call, 0 to leave the file system alone.
+    """
+    if not seconds:
+        yield
+        return
+
+    def delayed(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            time.sleep(seconds)
+            return function(*args, **kwargs)
+        return wrapper
+
+    originals = [(module, name, getattr(module, name)) for module, name in LATENCY_FUNCTIONS]
+    for module, name, function in originals:
+        setattr(module, name, delayed(function))
+    try:
+        yield
+    finally:
+        for module, name, function in originals:
+            setattr(module, name, function)
+
+
+def timed_run(input_path, output_path, full, jobs, quiet=True, io="sync", in_flight=DEFAULT_IN_FLIGHT, latency=0):
+    """
+    Runs the conversion once and measures it.
+
+    Parameters:
+        input_path (str): Folder with the semantic models.
+        output_path (str): Folder of the PBIP projects.
+        full (bool): Ignore the conversion manifest.
+        jobs (int): Number of worker processes.
+        quiet (bool, optional): Hide the messages of the converter.
+        io (str, optional): The I/O backend, "sync" or "async".
+        in_flight (int, optional): Maximum number of file operations running at once with async I/O.
+        latency (float, optional): Simulated delay of each file system call, in seconds (see simulated_latency()).
+
+    Returns:
+        dict: The duration of each stage and the total, in seconds.
+    """
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull if quiet else sys.stdout), simulated_latency(latency):
+            metrics = run(
+                input_path, output_path, DEFAULT_REPORT_PATH, full, jobs, io=io, in_flight=in_flight
+            )
+    return {"stages": metrics.stage_seconds(), "counters": metrics.counters, "total": time.perf_counter() - start}
+
+
+def summarize(samples):
+    """
+    Summarizes the repeated measures of a scenario with their median.
+
+    Parameters:
+        samples (list): The results of timed_run().
+
+    Returns:
+        dict: The median duration of each stage and of the total, all the totals and the file counters.
+    """
+    stages = {}
+    for name in samples[0]["stages"]:
+        stages[name] = statistics.median(sample["stages"][name] for sample in samples)
+    totals = [sample["total"] for sample in samples]
+    # The counters do not depend on the timing, the last run is representative
+    return {"stages": stages, "counters": samples[-1]["counters"], "total": statistics.median(totals), "samples": totals}
+
+
+def touch_one_table(input_path):
+    """
+    Changes one table of the first model, to measure an incremental run.
+
+    Parameters:
+        input_path (str): Folder with the semantic models.
+    """
+    model = sorted(name for name in os.listdir(input_path) if name.endswith(".SemanticModel"))[0]
+    tables_folder = os.path.join(input_path, model, "definition", "tables")
+    table_file = os.path.join(tables_folder, sorted(os.listdir(tables_folder))[0])
+    with open(table_file, "a", encoding="utf-8") as f:
+        f.write(f"\n\tannotation BenchmarkRun = {time.time_ns()}\n")
+
+
+def run_benchmark(variant, models, repeat, jobs, options, work_path, io="sync", in_flight=DEFAULT_IN_FLIGHT,
+                  latency=0):
+    """
+    Benchmarks the conversion of a synthetic workspace in three scenarios:
+        - cold: full conversion into an empty output folder.
+        - unchanged: incremental run when nothing changed.
+        - one_table_changed: incremental run after changing a single table.
+
+    Parameters:
+        variant (str): "standard", "tabular_editor" or "both".
+        models (int): Number of semantic models.
+        repeat (int): Number of repetitions of each scenario.
+        jobs (int): Number of worker processes.
+        options (dict): The options of generate_semantic_model().
+        work_path (str): Temporary folder for the input and output.
+        io (str, optional): The I/O backend, "sync" or "async". The scenarios of the async
+                            backend are named "<variant>/async/<scenario>".
+        in_flight (int, optional): Maximum number of file operations running at once with async I/O.
+        latency (float, optional): Simulated delay of each file system call, in seconds.
+
+    Returns:
+        dict: The summary of each scenario by name.
+    """
+    label = variant if io == "sync" else f"{variant}/{io}"
+    input_path = os.path.join(work_path, label, "input_as")
+    output_path = os.path.join(work_path, label, "output_pbip")
+    generate_workspace(input_path, models, variant, **options)
+    run_options = {"io": io, "in_flight": in_flight, "latency": latency}
+
+    samples = {"cold": [], "unchanged": [], "one_table_changed": []}
+    for _ in range(repeat):
+        shutil.rmtree(output_path, ignore_errors=True)
+        samples["cold"].append(timed_run(input_path, output_path, True, jobs, **run_options))
+        samples["unchanged"].append(timed_run(input_path, output_path, False, jobs, **run_options))
+        touch_one_table(input_path)
+        samples["one_table_changed"].append(timed_run(input_path, output_path, False, jobs, **run_options))
+
+    results = {}
+    tables = models * (options["tables"] + options["calculation_groups"])
+    for scenario, scenario_samples in samples.items():
+        summary = summarize(scenario_samples)
+        if scenario == "cold":
+            summary["tables_per_second"] = tables / summary["total"] if summary["total"] else None
+        results[f"{label}/{scenario}"] = summary
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compares the results with the ones of a previous version.
+
+    Parameters:
+        results (dict): The results of this run, by scenario.
+        baseline (dict): The results of the previous version, by scenario.
+        tolerance (float): Accepted slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        list: A message for each scenario that is slower than the tolerance.
+    """
+    regressions = []
+    for scenario, summary in results.items():
+        previous = baseline.get(scenario)
+        if not previous or not previous.get("total"):
+            continue
+        change = summary["total"] / previous["total"] - 1
+        if change > tolerance:
+            regressions.append(
+                f"{scenario}: {previous['total']:.3f}s -> {summary['total']:.3f}s (+{change:.0%})"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the conversion of synthetic semantic models.")
+    parser.add_argument("--variant", choices=["standard", "tabular_editor", "both"], default="both",
+                        help="kind of models to benchmark ('both' benchmarks each kind separately)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of repetitions of each scenario")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes of the converter")
+    parser.add_argument("--io", choices=["sync", "async", "both"], default="sync",
+                        help="I/O backend of the converter ('both' benchmarks each backend separately)")
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_IN_FLIGHT,
+                        help="maximum number of file operations running at once with async I/O")
+    parser.add_argument("--latency", type=float, default=0,
+                        help="simulated delay of each file system call in milliseconds, as on a network share")
+    parser.add_argument("--output", help="file to write the JSON results to (default: standard output)")
+    parser.add_argument("--baseline", help="JSON results of a previous version to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="accepted slowdown against the baseline before failing (default: 0.2)")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    options = get_generator_options(args)
+    variants = ["standard", "tabular_editor"] if args.variant == "both" else [args.variant]
+    backends = ["sync", "async"] if args.io == "both" else [args.io]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_path:
+        for variant in variants:
+            for io in backends:
+                results.update(run_benchmark(
+                    variant, args.models, args.repeat, args.jobs, options, work_path, io, args.in_flight,
+                    args.latency / 1000
+                ))
+
+    report = {
+        "converter_version": CONVERTER_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": dict(
+            options, models=args.models, repeat=args.repeat, jobs=args.jobs, io=args.io, in_flight=args.in_flight,
+            latency=args.latency
+        ),
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"Regression: {message}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,254 @@
+# Requires Python 3.8 or later
+import os
+import json
+import argparse
+
+
+def write_file(file_path, content):
+    """
+    Writes the content to a file, creating its folder if needed.
+
+    Parameters:
+        file_path (str): Path of the file to write.
+        content (str): The content of the file.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def build_table(index, columns, measures, partition_lines, data_source, tabular_editor):
+    """
+    Builds the content of a synthetic .tmdl table file.
+
+    Parameters:
+        index (int): Number of the table, used in its name.
+        columns (int): Number of columns (the first one is the key column).
+        measures (int): Number of measures.
+        partition_lines (int): Number of lines of the partition query.
+        data_source (str): Name of the data source used by the partition.
+        tabular_editor (bool): Build the Tabular Editor variant (TabularEditor_TableSchema annotation).
+
+    Returns:
+        str: The content of the table file.
+    """
+    table_name = f"Table {index}"
+    lines = [f"table '{table_name}'", f"\tlineageTag: {index:08d}-0000-0000-0000-000000000000", ""]
+
+    for measure in range(measures):
+        lines += [
+            f"\tmeasure 'Measure {index}.{measure}' = SUM('{table_name}'[Column 1])",
+            "\t\tformatString: #,0",
+            f"\t\tlineageTag: {index:08d}-{measure:04d}-0000-0000-000000000000",
+            ""
+        ]
+
+    for column in range(columns):
+        column_name = "Key" if column == 0 else f"Column {column}"
+        data_type = "int64" if column % 3 == 0 else ("string" if column % 3 == 1 else "decimal")
+        lines += [
+            f"\tcolumn '{column_name}'",
+            f"\t\tdataType: {data_type}",
+            f"\t\tsourceProviderType: {'int' if data_type == 'int64' else 'nvarchar'}",
+            "\t\tsummarizeBy: none",
+            f"\t\tsourceColumn: {column_name.replace(' ', '_')}",
+            "",
+            "\t\tannotation SummarizationSetBy = Automatic",
+            ""
+        ]
+
+    schema = "dbo"
+    source_table = f"Fact_{index}"
+    query = [f"\t\t\t\tSELECT * FROM [{schema}].[{source_table}]"]
+    query += [f"\t\t\t\t-- filter line {line}" for line in range(1, partition_lines)]
+    # Tabular Editor references the data source by "<server> <database>"
+    data_source_reference = f"'srv01 Warehouse {data_source}'" if tabular_editor else data_source
+    lines += [
+        f"\tpartition '{table_name}' = query",
+        f"\t\tdataSource: {data_source_reference}",
+        "\t\tquery ="
+    ] + query + [""]
+
+    if tabular_editor:
+        schema_annotation = json.dumps({
+            "Name": source_table,
+            "Schema": schema,
+            "Database": "Warehouse",
+            "Columns": [{"Name": f"Column_{column}", "DataType": "nvarchar"} for column in range(columns)]
+        })
+        lines += [f"\tannotation TabularEditor_TableSchema = {schema_annotation}", ""]
+
+    return "\n".join(lines) + "\n"
+
+
+def build_calculation_group(index):
+    """
+    Builds the content of a synthetic calculation group table file.
+
+    Parameters:
+        index (int): Number of the calculation group, used in its name.
+
+    Returns:
+        str: The content of the table file.
+    """
+    return "\n".join([
+        f"table 'Calculation Group {index}'",
+        "\tcalculationGroup",
+        "\t\tcalculationItem Current = SELECTEDMEASURE()",
+        "\t\tcalculationItem 'Previous Year' = CALCULATE(SELECTEDMEASURE(), SAMEPERIODLASTYEAR('Date'[Date]))",
+        "",
+        "\tcolumn Name",
+        "\t\tdataType: string",
+        "\t\tsourceColumn: Name",
+        ""
+    ]) + "\n"
+
+
+def generate_semantic_model(model_path, tables=10, columns=10, measures=2, partition_lines=1,
+                            calculation_groups=0, data_sources=1, tabular_editor=False):
+    """
+    Generates a synthetic '*.SemanticModel' folder, as deployed from Analysis Services.
+
+    Parameters:
+        model_path (str): The folder to create, ending with '.SemanticModel'.
+        tables (int, optional): Number of tables.
+        columns (int, optional): Number of columns of each table.
+        measures (int, optional): Number of measures of each table.
+        partition_lines (int, optional): Number of lines of each partition query.
+        calculation_groups (int, optional): Number of calculation group tables.
+        data_sources (int, optional): Number of data sources in dataSources.tmdl.
+        tabular_editor (bool, optional): Generate the Tabular Editor variant (annotation __TEdtr).
+    """
+    name = os.path.basename(model_path)[:-len(".SemanticModel")]
+    definition = os.path.join(model_path, "definition")
+
+    write_file(os.path.join(model_path, "definition.pbism"), json.dumps({"version": "4.0", "settings": {}}, indent=2))
+    write_file(os.path.join(model_path, ".platform"), json.dumps(
+        {"metadata": {"type": "SemanticModel", "displayName": name}}, indent=2))
+    write_file(os.path.join(definition, "database.tmdl"), f"database {name}\n\tcompatibilityLevel: 1500\n\n")
+
+    table_names = [f"Table {index}" for index in range(tables)]
+    table_names += [f"Calculation Group {index}" for index in range(calculation_groups)]
+    model_lines = [
+        "model Model",
+        "\tculture: en-US",
+        "\tdefaultPowerBIDataSourceVersion: powerBI_V3",
+        "\tdiscourageImplicitMeasures",
+        "\tsourceQueryCulture: en-US",
+        "\tdataAccessOptions",
+        "\t\tlegacyRedirects",
+        "\t\treturnErrorValuesAsNull",
+        ""
+    ]
+    if tabular_editor:
+        model_lines += ["annotation __TEdtr = 1", ""]
+    model_lines += [f"ref table '{table_name}'" for table_name in table_names]
+    model_lines += ["", "ref cultureInfo en-US", ""]
+    write_file(os.path.join(definition, "model.tmdl"), "\n".join(model_lines))
+
+    data_source_names = [f"DataSource{index}" for index in range(max(1, data_sources))]
+    data_source_lines = []
+    for index, data_source in enumerate(data_source_names):
+        data_source_lines += [
+            f"dataSource {data_source} = provider",
+            f"\tconnectionString: Provider=SQLNCLI11.1;Data Source=srv{index:02d};"
+            f"Initial Catalog=Warehouse{index};Integrated Security=SSPI;Persist Security Info=false",
+            "\timpersonationMode: impersonateServiceAccount",
+            "\tprovider: System.Data.SqlClient",
+            "",
+            "\tannotation Owner = benchmark",
+            ""
+        ]
+    write_file(os.path.join(definition, "dataSources.tmdl"), "\n".join(data_source_lines))
+
+    relationship_lines = []
+    for index in range(1, tables):
+        relationship_lines += [
+            f"relationship rel_{index}",
+            f"\tfromColumn: 'Table {index}'.'Column 3'",
+            "\ttoColumn: 'Table 0'.Key",
+            ""
+        ]
+    write_file(os.path.join(definition, "relationships.tmdl"), "\n".join(relationship_lines))
+
+    for index in range(tables):
+        data_source = data_source_names[index % len(data_source_names)]
+        write_file(os.path.join(definition, "tables", f"Table {index}.tmdl"),
+                   build_table(index, columns, measures, partition_lines, data_source, tabular_editor))
+
+    for index in range(calculation_groups):
+        write_file(os.path.join(definition, "tables", f"Calculation Group {index}.tmdl"),
+                   build_calculation_group(index))
+
+
+def generate_workspace(input_path, models=1, variant="standard", **options):
+    """
+    Generates a folder of synthetic semantic models.
+
+    Parameters:
+        input_path (str): The folder to create the models in.
+        models (int, optional): Number of semantic models.
+        variant (str, optional): "standard", "tabular_editor" or "both" (alternating).
+        **options: The options of generate_semantic_model().
+
+    Returns:
+        list: The paths of the generated models.
+    """
+    paths = []
+    for index in range(models):
+        if variant == "both":
+            tabular_editor = index % 2 == 1
+        else:
+            tabular_editor = variant == "tabular_editor"
+        model_path = os.path.join(input_path, f"Synthetic_{index:03d}.SemanticModel")
+        generate_semantic_model(model_path, tabular_editor=tabular_editor, **options)
+        paths.append(model_path)
+    return paths
+
+
+def add_generator_arguments(parser):
+    """
+    Adds the options of the generator to a command line parser.
+
+    Parameters:
+        parser (argparse.ArgumentParser): The parser.
+    """
+    parser.add_argument("--models", type=int, default=2, help="number of semantic models")
+    parser.add_argument("--tables", type=int, default=50, help="number of tables per model")
+    parser.add_argument("--columns", type=int, default=20, help="number of columns per table")
+    parser.add_argument("--measures", type=int, default=2, help="number of measures per table")
+    parser.add_argument("--partition-lines", type=int, default=1, help="number of lines of each partition query")
+    parser.add_argument("--calculation-groups", type=int, default=1, help="number of calculation groups per model")
+    parser.add_argument("--data-sources", type=int, default=5, help="number of data sources in dataSources.tmdl")
+
+
+def get_generator_options(args):
+    """
+    Returns the options of generate_semantic_model() from the parsed command line.
+
+    Parameters:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        dict: The options.
+    """
+    return {
+        "tables": args.tables,
+        "columns": args.columns,
+        "measures": args.measures,
+        "partition_lines": args.partition_lines,
+        "calculation_groups": args.calculation_groups,
+        "data_sources": args.data_sources
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates synthetic Analysis Services semantic models.")
+    parser.add_argument("output", help="folder to create the models in")
+    parser.add_argument("--variant", choices=["standard", "tabular_editor", "both"], default="standard",
+                        help="kind of models to generate")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    paths = generate_workspace(args.output, args.models, args.variant, **get_generator_options(args))
+    print(f"Generated {len(paths)} semantic model(s) in {args.output}")
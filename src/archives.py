@@ -0,0 +1,599 @@
+# Requires Python 3.8 or later
+import io
+import os
+import time
+import shutil
+import tarfile
+import zipfile
+import tempfile
+
+from utils import *
+from metrics import count
+
+# Extensions of the supported archives, and the tarfile compression of each one
+TAR_EXTENSIONS = {
+    ".tar": "",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.bz2": "bz2",
+    ".tar.xz": "xz"
+}
+ZIP_EXTENSIONS = (".zip",)
+
+
+def is_archive(path):
+    """
+    Checks if a path is a zip or tar archive, by its extension.
+
+    Parameters:
+        path (str): The path.
+
+    Returns:
+        bool: True for the extensions in ZIP_EXTENSIONS and TAR_EXTENSIONS.
+    """
+    lower_path = path.lower()
+    return lower_path.endswith(ZIP_EXTENSIONS) or lower_path.endswith(tuple(TAR_EXTENSIONS))
+
+
+def get_tar_compression(path):
+    """
+    Returns:
+        str: The tarfile compression of the archive ('', 'gz', 'bz2' or 'xz').
+    """
+    lower_path = path.lower()
+    for extension, compression in TAR_EXTENSIONS.items():
+        if lower_path.endswith(extension):
+            return compression
+    return ""
+
+
+def normalize_entry_name(name):
+    """
+    Returns:
+        str: The name of an archive entry with '/' separators and without a leading './' or '/'.
+    """
+    name = name.replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name.lstrip("/")
+
+
+def is_safe_entry_name(name):
+    """
+    Checks that a normalized entry name stays inside the folder it is extracted to.
+    
+    Parameters:
+        name (str): The normalized name of the entry.
+        
+    Returns:
+        bool: False for names with '..' parts or a drive (e.g. 'C:/'); otherwise, True.
+    """
+    parts = name.split("/")
+    return ".." not in parts and ":" not in parts[0] and not os.path.isabs(name)
+
+
+def split_entry_name(name):
+    """
+    Splits the name of an entry into its semantic model and its path inside the model.
+
+    Parameters:
+        name (str): The normalized name of the entry.
+
+    Returns:
+        tuple: (model name, relative path), or (None, None) if the entry is not inside
+               a '.SemanticModel' folder.
+    """
+    parts = name.split("/")
+    if parts[0] == "__MACOSX":
+        # Resource forks added by the archiver of macOS
+        return None, None
+    for index, part in enumerate(parts[:-1]):
+        if part.endswith(".SemanticModel"):
+            return "/".join(parts[:index + 1]), "/".join(parts[index + 1:])
+    return None, None
+
+
+class LargeEntry:
+    """
+    A file of the input too large to be read into memory (see STREAMING_THRESHOLD), on
+    disk: the file itself in a folder, or a temporary copy of the entry of an archive.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): The file on disk.
+        """
+        self.path = path
+
+
+def spool_entry(fileobj):
+    """
+    Copies an entry of an archive into a temporary file, in blocks.
+
+    Parameters:
+        fileobj (file): The entry, opened in binary mode.
+
+    Returns:
+        str: The path of the temporary file, to be removed by the caller.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".tmdl", delete=False) as temp:
+        try:
+            shutil.copyfileobj(fileobj, temp)
+        except BaseException:
+            temp.close()
+            os.remove(temp.name)
+            raise
+    return temp.name
+
+
+class ArchiveInput:
+    """
+    Reads the files of a zip or tar archive (or a folder) one at a time, in the order
+    they are stored, without extracting them. Tar archives are read as a stream, so
+    compressed archives are never decompressed twice in the same pass.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): The archive, or a folder.
+        """
+        self.path = path
+        # Unsafe entries already reported, to report them once over several passes
+        self.skipped = set()
+
+    def iter_entries(self, select=None, large_size=None):
+        """
+        Parameters:
+            select (callable, optional): Called with the name of each file; the content of the
+                                         files for which it returns False is not read.
+            large_size (int, optional): Files of this size (in bytes) or larger are not read
+                                        into memory, but given as a LargeEntry.
+
+        Yields:
+            tuple: (name, content) of each file, where content is the bytes of the file
+                   (None if not selected), or a LargeEntry valid until the next file.
+        """
+        def is_selected(name):
+            return select is None or select(name)
+
+        def is_large(size):
+            return large_size is not None and size >= large_size
+
+        def read_large(name, opener):
+            with opener() as f:
+                temp_file = spool_entry(f)
+            try:
+                yield name, LargeEntry(temp_file)
+            finally:
+                os.remove(temp_file)
+        
+        def is_safe(name):
+            if is_safe_entry_name(name):
+                return True
+            if name not in self.skipped:
+                self.skipped.add(name)
+                log(f"Skipping unsafe archive entry: {name}", ERROR)
+            return False
+
+        def read_file(file_path):
+            with open(file_path, "rb") as f:
+                return f.read()
+
+        if os.path.isdir(self.path):
+            for relative_path, info in scan_files(self.path).items():
+                file_path = os.path.join(self.path, *relative_path.split("/"))
+                if not is_selected(relative_path):
+                    yield relative_path, None
+                elif is_large(info.size):
+                    yield relative_path, LargeEntry(file_path)
+                else:
+                    yield relative_path, read_file(file_path)
+        elif self.path.lower().endswith(ZIP_EXTENSIONS):
+            with zipfile.ZipFile(self.path) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    name = normalize_entry_name(info.filename)
+                    if not is_safe(name):
+                        continue
+                    if not is_selected(name):
+                        yield name, None
+                    elif is_large(info.file_size):
+                        yield from read_large(name, lambda: archive.open(info))
+                    else:
+                        yield name, archive.read(info)
+        else:
+            with tarfile.open(self.path, "r|" + get_tar_compression(self.path)) as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    name = normalize_entry_name(member.name)
+                    if not is_safe(name):
+                        continue
+                    if not is_selected(name):
+                        yield name, None
+                    elif is_large(member.size):
+                        yield from read_large(name, lambda: archive.extractfile(member))
+                    else:
+                        yield name, archive.extractfile(member).read()
+
+
+class ArchiveOutput:
+    """
+    Writes files into a new zip or tar archive, one at a time. The archive is written
+    to a temporary file that replaces the destination only when it is closed, so a
+    failed or interrupted run (see abort()) never leaves a truncated archive.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): The archive to create.
+        """
+        self.path = path
+        self.temp_file = path + ".tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if path.lower().endswith(ZIP_EXTENSIONS):
+            self.archive = zipfile.ZipFile(self.temp_file, "w", zipfile.ZIP_DEFLATED)
+        else:
+            self.archive = tarfile.open(self.temp_file, "w:" + get_tar_compression(path))
+
+    def write(self, name, content):
+        """
+        Adds a file to the archive.
+
+        Parameters:
+            name (str): Name of the entry, with '/' separators.
+            content (bytes): The content of the file.
+        """
+        if isinstance(self.archive, zipfile.ZipFile):
+            self.archive.writestr(name, content)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            self.archive.addfile(info, io.BytesIO(content))
+        count("files_written")
+        count("bytes_out", len(content))
+
+    def write_file(self, name, file_path):
+        """
+        Adds a file on disk to the archive, without reading it into memory.
+        The file is not counted as written (see write_large_entry()).
+
+        Parameters:
+            name (str): Name of the entry, with '/' separators.
+            file_path (str): The file.
+        """
+        if isinstance(self.archive, zipfile.ZipFile):
+            self.archive.write(file_path, name)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = os.path.getsize(file_path)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            with open(file_path, "rb") as f:
+                self.archive.addfile(info, f)
+
+    def close(self):
+        """
+        Completes the archive and replaces the destination with it.
+        """
+        self.archive.close()
+        os.replace(self.temp_file, self.path)
+    
+    def abort(self):
+        """
+        Discards the archive, leaving the destination as it was.
+        """
+        try:
+            self.archive.close()
+        finally:
+            if os.path.exists(self.temp_file):
+                os.remove(self.temp_file)
+
+
+class ArchiveFileSystem:
+    """
+    The files of one folder inside an ArchiveOutput, with the writing part of the
+    interface of LocalFileSystem, used as the destination of the conversion.
+    """
+
+    def __init__(self, output, prefix):
+        """
+        Parameters:
+            output (ArchiveOutput): The archive.
+            prefix (str): The folder inside the archive, e.g. 'Sales.SemanticModel'.
+        """
+        self.output = output
+        self.prefix = prefix
+
+    def path(self, relative_path):
+        return f"{self.output.path}:{self.prefix}/{relative_path}"
+
+    def write_text(self, relative_path, content):
+        self.output.write(f"{self.prefix}/{relative_path}", content.encode("utf-8"))
+
+    def write_bytes(self, relative_path, content):
+        self.output.write(f"{self.prefix}/{relative_path}", content)
+
+    def remove(self, relative_path):
+        # A new archive has nothing to remove
+        pass
+
+    def copy_from(self, source, relative_path):
+        self.write_bytes(relative_path, source.read_bytes(relative_path))
+
+    def write_file(self, relative_path, file_path):
+        self.output.write_file(f"{self.prefix}/{relative_path}", file_path)
+
+
+def stream_large_table(entry, dest, relative_path, model, config=None, expressions=None):
+    """
+    Converts a table too large to be read into memory (see LargeEntry) line by line with
+    stream_table_file(), straight into the output folder, or through a temporary file
+    into the output archive.
+
+    Parameters:
+        entry (LargeEntry): The table file.
+        dest (LocalFileSystem or ArchiveFileSystem): The files of the semantic model in the output.
+        relative_path (str): Relative path of the table file.
+        model (dict): The semantic model (see scan_archive_models()).
+        config (dict, optional): The configuration of the conversion (see config.py).
+        expressions (dict, optional): Receives the model expressions the new partition uses, by name.
+
+    Returns:
+        str or None: The error message if the table could not be transformed; otherwise, None.
+    """
+    def convert(dest_file):
+        return stream_table_file(
+            entry.path, dest_file, model["tabular_editor"], model["data_sources"], "None", config, expressions,
+            model["pruned_columns"].get(relative_path)
+        )
+
+    if isinstance(dest, LocalFileSystem):
+        return convert(dest.path(relative_path))
+    handle, temp_file = tempfile.mkstemp(suffix=".tmdl")
+    os.close(handle)
+    try:
+        error = convert(temp_file)
+        dest.write_file(relative_path, temp_file)
+    finally:
+        os.remove(temp_file)
+    return error
+
+
+def remove_stale_files(dest, relative_paths):
+    """
+    Removes the files of a semantic model of the output folder that are not in the input,
+    left by an earlier conversion (the expressions.tmdl is written by write_model_expressions()).
+
+    Parameters:
+        dest (LocalFileSystem): The files of the semantic model in the output.
+        relative_paths (set): Relative paths of the files of the model in the input.
+    """
+    for relative_path in scan_files(dest.root):
+        if relative_path not in relative_paths and relative_path.lower() != EXPRESSIONS_FILE.lower():
+            log(f"Removing file deleted from the input: {dest.path(relative_path)}", DEBUG)
+            dest.remove(relative_path)
+
+
+def open_entry_text(content):
+    """
+    Opens the content of an entry (see ArchiveInput.iter_entries()) as a text file.
+
+    Returns:
+        file: The file, to be closed by the caller.
+    """
+    if isinstance(content, LargeEntry):
+        return open(content.path, "r", encoding="utf-8")
+    return io.StringIO(content.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n"))
+
+
+def scan_archive_models(source, config=None):
+    """
+    First pass over the input: finds the semantic models and reads their model.tmdl and
+    dataSources.tmdl files, the only ones needed before converting the tables. With a
+    "pruning" section in the configuration, the other definition files are also read, one
+    at a time, into the reference graph of their model (see pruning.py). With shared
+    connection parameters, the connections of the tables are read for the Tabular Editor
+    models (see get_model_data_sources()).
+
+    Parameters:
+        source (ArchiveInput): The input.
+        config (dict, optional): The configuration of the conversion (see config.py).
+
+    Returns:
+        dict: For each model name, the keys model_document, tabular_editor, data_sources,
+              pruned_tables and pruned_columns.
+    """
+    scope = get_pruning_scope(config)
+    shared_connections = bool((config or {}).get("connectionParameters"))
+
+    def is_scanned_file(name):
+        relative_path = split_entry_name(name)[1]
+        if relative_path is None:
+            return False
+        if scope is not None and relative_path.startswith("definition/") and relative_path.endswith(".tmdl"):
+            return True
+        if shared_connections and is_table_file(relative_path):
+            return True
+        return relative_path.lower() in MODEL_LEVEL_FILES
+
+    contents = {}
+    graphs = {}
+    # The connections of the tables of each model, used if it is a Tabular Editor model
+    table_connections = {}
+    for name, content in source.iter_entries(is_scanned_file, STREAMING_THRESHOLD):
+        model_name, relative_path = split_entry_name(name)
+        if model_name is None:
+            continue
+        model = contents.setdefault(model_name, {})
+        graph = graphs.setdefault(model_name, ReferenceGraph())
+        connections = table_connections.setdefault(model_name, {})
+        if content is None:
+            continue
+        if relative_path.lower() in MODEL_LEVEL_FILES:
+            if isinstance(content, LargeEntry):
+                with open(content.path, "rb") as f:
+                    content = f.read()
+            model[relative_path.lower()] = content
+            continue
+        if shared_connections and is_table_file(relative_path):
+            with open_entry_text(content) as f:
+                server, database = scan_table_connection_tab_edtr(f)
+            connections[relative_path] = (server, database, None)
+        if scope is not None and relative_path.startswith("definition/"):
+            with open_entry_text(content) as f:
+                graph.add_file(relative_path, f.read())
+
+    models = {}
+    for model_name, files in contents.items():
+        model = SemanticModel(MemoryFileSystem(files))
+        pruned_tables, pruned_columns = graphs[model_name].plan(scope) if scope is not None else ({}, {})
+        data_sources = model.data_sources
+        if model.tabular_editor and shared_connections:
+            data_sources = dict(sorted(table_connections[model_name].items()))
+        models[model_name] = {
+            "model_document": model.model_document,
+            "tabular_editor": model.tabular_editor,
+            "data_sources": data_sources,
+            "pruned_tables": pruned_tables,
+            "pruned_columns": pruned_columns
+        }
+    return models
+
+
+def convert_archive(input_path, output_path, default_report_path, config=None):
+    """
+    Converts the semantic models of an archive (or a folder) into an archive (or a folder),
+    streaming every file through the transforms one at a time: only the file being converted
+    and the model.tmdl and data sources of each model are kept in memory, and nothing is
+    extracted to disk. Files outside the '.SemanticModel' folders are ignored.
+
+    The input is read twice (see scan_archive_models()). Every model is converted, the
+    conversion manifest is not used. The expressions.tmdl of each model is written after
+    all the tables, with the expressions they need (see write_model_expressions()). Tables
+    of STREAMING_THRESHOLD bytes or more are converted line by line (see stream_large_table()).
+    When the output is a folder, the files of its models that are not in the input are removed.
+
+    Parameters:
+        input_path (str): The archive (or folder) with the Analysis Services semantic models.
+        output_path (str): The archive (or folder) where the PBIP projects are written.
+        default_report_path (str): The 'Default.Report' folder used as template for the reports.
+        config (dict, optional): The configuration of the conversion (see config.py).
+
+    Returns:
+        dict: For each model name, the error message of each table that could not be transformed.
+    """
+    source = ArchiveInput(input_path)
+    models = scan_archive_models(source, config)
+    failures = {model_name: {} for model_name in models}
+    output = ArchiveOutput(output_path) if is_archive(output_path) else None
+    if output is None:
+        os.makedirs(output_path, exist_ok=True)
+
+    def get_dest(model_name):
+        if output is None:
+            return LocalFileSystem(os.path.join(output_path, *model_name.split("/")))
+        return ArchiveFileSystem(output, model_name)
+
+    for model in models.values():
+        # The expressions.tmdl of the input (kept until the end) and the expressions used by each table
+        model["expressions_files"] = {}
+        model["table_expressions"] = {}
+        # The files of the model in the input
+        model["files"] = set()
+
+    try:
+        for name, content in source.iter_entries(large_size=STREAMING_THRESHOLD):
+            model_name, relative_path = split_entry_name(name)
+            if model_name is None:
+                continue
+            model = models[model_name]
+            model["files"].add(relative_path)
+            dest = get_dest(model_name)
+            if isinstance(content, LargeEntry) and not is_table_file(relative_path):
+                # Only the tables are streamed
+                with open(content.path, "rb") as f:
+                    content = f.read()
+            # The entry is the only file of its source, released once converted
+            entry = content if isinstance(content, LargeEntry) else MemoryFileSystem({relative_path: content})
+
+            try:
+                error = None
+                if relative_path.lower() == EXPRESSIONS_FILE.lower():
+                    model["expressions_files"][relative_path] = content
+                elif relative_path in model["pruned_tables"]:
+                    log(f"Skipping pruned table: {name}", DEBUG)
+                    # The table may be left in the output by a run without pruning
+                    dest.remove(relative_path)
+                elif isinstance(entry, LargeEntry):
+                    expressions = model["table_expressions"][relative_path] = {}
+                    error = stream_large_table(entry, dest, relative_path, model, config, expressions)
+                elif is_table_file(relative_path):
+                    expressions = model["table_expressions"][relative_path] = {}
+                    error = convert_table(
+                        entry, dest, relative_path, model["tabular_editor"], model["data_sources"], config, expressions,
+                        model["pruned_columns"].get(relative_path)
+                    )
+                else:
+                    convert_model_file(
+                        entry, dest, relative_path, model["model_document"], model["pruned_tables"].values(), config
+                    )
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            if error is not None:
+                failures[model_name][relative_path] = error
+
+        for model_name in sorted(models):
+            model = models[model_name]
+            write_model_expressions(
+                MemoryFileSystem(model["expressions_files"]), get_dest(model_name), model["table_expressions"]
+            )
+            if output is None:
+                remove_stale_files(get_dest(model_name), model["files"])
+
+        if output is None:
+            copy_and_rename_reports(
+                output_path, default_report_path, [model_name.replace("/", os.sep) for model_name in models]
+            )
+        else:
+            write_archive_reports(output, models, default_report_path)
+    except BaseException:
+        if output is not None:
+            output.abort()
+        raise
+    if output is not None:
+        output.close()
+
+    return failures
+
+
+def write_archive_reports(output, models, default_report_path):
+    """
+    Writes the '<name>.Report' folder of every semantic model into the archive, next to the
+    model, as copy_and_rename_reports() does in a folder.
+
+    Parameters:
+        output (ArchiveOutput): The archive.
+        models (dict): The semantic models, by name.
+        default_report_path (str): The 'Default.Report' folder used as template for the reports.
+    """
+    template = load_report_template(default_report_path)
+    if template is None:
+        log(f"Default report folder not found at: {default_report_path}", ERROR)
+        return
+
+    for model_name in sorted(models):
+        base_name = model_name.rpartition("/")[2][:-len(".SemanticModel")]
+        # The entry names of the archive use '/' separators
+        report_path = get_report_path("", model_name).replace(os.sep, "/")
+        rendered = render_report_files(template, base_name)
+        for relative_path, content in template["files"].items():
+            if relative_path in rendered:
+                content = rendered[relative_path].encode("utf-8")
+            output.write(f"{report_path}/{relative_path}", content)
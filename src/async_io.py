@@ -0,0 +1,275 @@
+# Requires Python 3.8 or later
+"""
+Asynchronous I/O backend of the conversion (--io async).
+
+On network file systems (SMB, NFS) every open(), read(), write() and stat waits for a round
+trip to the server, so a run mostly waits instead of converting. This backend overlaps the
+I/O of many files with asyncio, keeping at most in_flight file operations running at once in
+a pool of threads, while the transforms stay synchronous and unchanged:
+
+    1. The .tmdl files of a model are read concurrently into a PrefetchedFileSystem.
+    2. The model is converted by convert_semantic_model_files() in a converter thread, one
+       model at a time, reading the prefetched content and staging its output files in a
+       StagedFileSystem.
+    3. The staged files are written, copied and removed concurrently.
+
+The steps of consecutive models overlap: the next model is read and the previous one written
+while a model is converted. Huge tables (see STREAMING_THRESHOLD) are not read ahead, and are
+still converted line by line straight into the output.
+
+    failures = convert_all_semantic_models_async(models, link, config, in_flight=32)
+    copy_and_rename_reports_async(output_path, default_report_path, in_flight=32)
+"""
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import (
+    convert_semantic_model_files, load_report_template, write_report_directory, list_report_models, STREAMING_THRESHOLD
+)
+from filesystem import LocalFileSystem, write_text_file, write_bytes_file, link_or_copy_file
+from pruning import get_pruning_scope
+from catalog import scan_files, get_report_path
+from metrics import log, count, ERROR, DEBUG
+
+# Default number of file operations running at once
+DEFAULT_IN_FLIGHT = 32
+
+
+class PrefetchedFileSystem(LocalFileSystem):
+    """
+    The files of a folder on disk, already scanned (see catalog.py), with the content of some
+    of them read ahead. The files that were not read ahead are read from disk when needed.
+    """
+
+    def __init__(self, root, files, contents):
+        """
+        Parameters:
+            root (str): The folder.
+            files (dict): The FileInfo of the files of the folder by relative path.
+            contents (dict): The content (bytes) of the files read ahead, by relative path.
+        """
+        super().__init__(root, files=files)
+        self.contents = contents
+
+    def read_text(self, relative_path):
+        content = self.contents.get(relative_path)
+        if content is None:
+            return super().read_text(relative_path)
+        # Same newlines as a file opened in text mode
+        return content.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+    def read_bytes(self, relative_path):
+        content = self.contents.get(relative_path)
+        return super().read_bytes(relative_path) if content is None else content
+
+
+class StagedFileSystem(LocalFileSystem):
+    """
+    A folder on disk whose changes are staged in memory, in the format of SemanticModel.changes,
+    to be written concurrently by flush_changes(). Huge tables are still streamed straight into
+    the folder (see convert_table()).
+    """
+
+    def __init__(self, root, link=False):
+        super().__init__(root, link)
+        # The staged changes by relative path: ("text", str), ("bytes", bytes), ("copy", file system) or ("remove", None)
+        self.changes = {}
+
+    def write_text(self, relative_path, content):
+        self.changes[relative_path] = ("text", content)
+
+    def write_bytes(self, relative_path, content):
+        self.changes[relative_path] = ("bytes", content)
+
+    def remove(self, relative_path):
+        self.changes[relative_path] = ("remove", None)
+
+    def copy_from(self, source, relative_path):
+        self.changes[relative_path] = ("copy", source)
+
+
+def read_file_ahead(file_path):
+    """
+    Returns:
+        bytes: The content of a file.
+    """
+    with open(file_path, "rb") as f:
+        content = f.read()
+    count("files_read")
+    count("bytes_in", len(content))
+    return content
+
+
+def apply_change(dest, relative_path, action, value):
+    """
+    Writes a change staged by a StagedFileSystem (see LocalFileSystem).
+    """
+    file_path = dest.path(relative_path)
+    if action == "text":
+        write_text_file(file_path, value)
+    elif action == "bytes":
+        write_bytes_file(file_path, value)
+    elif action == "copy":
+        if isinstance(value, LocalFileSystem):
+            link_or_copy_file(value.path(relative_path), file_path, dest.link)
+        else:
+            write_bytes_file(file_path, value.read_bytes(relative_path))
+    elif os.path.lexists(file_path):
+        os.remove(file_path)
+
+
+class BoundedIO:
+    """
+    Runs blocking file operations in a pool of threads, at most in_flight at once.
+    """
+
+    def __init__(self, executor, in_flight):
+        self.executor = executor
+        self.semaphore = asyncio.Semaphore(in_flight)
+
+    async def run(self, function, *args):
+        async with self.semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+
+def get_files_to_read(files, changed_files, config):
+    """
+    Chooses the files of a semantic model that the conversion reads: every .tmdl file when the
+    whole model is converted, otherwise the changed ones and the model level files. Huge tables
+    (see STREAMING_THRESHOLD) are left to be streamed.
+
+    Parameters:
+        files (dict): The FileInfo of the files of the model by relative path.
+        changed_files (list): The relative paths of the files to convert, None for every file.
+        config (dict): The configuration (see config.py), or None.
+
+    Returns:
+        list: The relative paths of the files to read ahead.
+    """
+    changed = None if changed_files is None or get_pruning_scope(config) is not None else set(changed_files)
+    return [
+        path for path, info in files.items()
+        if path.endswith(".tmdl") and info.size < STREAMING_THRESHOLD
+        and (changed is None or path in changed or path.rpartition("/")[0] == "definition")
+    ]
+
+
+async def prefetch_model(io, model, config):
+    """
+    Reads the files of a semantic model that the conversion needs, concurrently.
+
+    Parameters:
+        io (BoundedIO): Runs the file operations.
+        model (dict): The semantic model (see find_semantic_models()).
+        config (dict): The configuration (see config.py), or None.
+
+    Returns:
+        PrefetchedFileSystem: The files of the model in the input.
+    """
+    files = model.get("catalog")
+    if files is None:
+        files = await io.run(scan_files, model["source"])
+    to_read = get_files_to_read(files, model["changed"], config)
+    results = await asyncio.gather(*(
+        io.run(read_file_ahead, os.path.join(model["source"], *path.split("/"))) for path in to_read
+    ))
+    return PrefetchedFileSystem(model["source"], files, dict(zip(to_read, results)))
+
+
+async def flush_changes(io, dest):
+    """
+    Writes the changes staged in a StagedFileSystem, concurrently.
+    """
+    changes, dest.changes = dest.changes, {}
+    await asyncio.gather(*(
+        io.run(apply_change, dest, relative_path, *changes[relative_path]) for relative_path in sorted(changes)
+    ))
+
+
+async def convert_models(models, link, config, in_flight):
+    """
+    Converts the semantic models, reading the next model and writing the previous ones
+    while a model is converted (see convert_all_semantic_models_async()).
+    """
+    failures = {model["name"]: {} for model in models}
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(in_flight) as executor, ThreadPoolExecutor(1) as converter:
+        io = BoundedIO(executor, in_flight)
+        writes = []
+        next_source = asyncio.ensure_future(prefetch_model(io, models[0], config)) if models else None
+        for index, model in enumerate(models):
+            source = await next_source
+            if index + 1 < len(models):
+                next_source = asyncio.ensure_future(prefetch_model(io, models[index + 1], config))
+            dest = StagedFileSystem(model["destination"], link)
+            failures[model["name"]] = await loop.run_in_executor(
+                converter, convert_semantic_model_files, source, dest, model["changed"], config,
+                model.setdefault("expressions", {})
+            )
+            writes.append(asyncio.ensure_future(flush_changes(io, dest)))
+        await asyncio.gather(*writes)
+    return failures
+
+
+def convert_all_semantic_models_async(models, link=False, config=None, in_flight=DEFAULT_IN_FLIGHT):
+    """
+    Converts the semantic models found by find_semantic_models(), as convert_all_semantic_models()
+    does with a single job, overlapping the reads and writes of their files.
+
+    Parameters:
+        models (list): The semantic models to convert.
+        link (bool, optional): Hard-link the input files that need no conversion instead of copying them.
+        config (dict, optional): The configuration (see config.py).
+        in_flight (int, optional): Maximum number of file operations running at once.
+
+    Returns:
+        dict: For each model name, the error message of each table that could not be transformed.
+    """
+    return asyncio.run(convert_models(models, link, config, in_flight))
+
+
+async def render_reports(output_path, default_report_path, in_flight, model_names):
+    """
+    Writes the reports of the semantic models concurrently (see copy_and_rename_reports_async()).
+    """
+    base_names = []
+    template = load_report_template(default_report_path)
+    if template is None:
+        log(f"Default report folder not found at: {default_report_path}", ERROR)
+        return base_names
+
+    model_names = list_report_models(output_path, model_names)
+    base_names = [os.path.basename(model_name)[:-len(".SemanticModel")] for model_name in model_names]
+    report_dirs = [get_report_path(output_path, model_name) for model_name in model_names]
+    with ThreadPoolExecutor(in_flight) as executor:
+        io = BoundedIO(executor, in_flight)
+        results = await asyncio.gather(*(
+            io.run(write_report_directory, template, report_dir, base_name)
+            for report_dir, base_name in zip(report_dirs, base_names)
+        ))
+
+    for report_dir, changed in zip(report_dirs, results):
+        if changed:
+            log(f"Rendered report folder '{report_dir}' from '{default_report_path}'", DEBUG)
+        else:
+            log(f"Report folder unchanged, skipping: {report_dir}", DEBUG)
+    return base_names
+
+
+def copy_and_rename_reports_async(output_path, default_report_path, in_flight=DEFAULT_IN_FLIGHT, model_names=None):
+    """
+    Renders the report of each semantic model of the output, as copy_and_rename_reports() does,
+    writing the reports concurrently.
+
+    Parameters:
+        output_path (str): Directory where the SemanticModel directories are located.
+        default_report_path (str): Directory containing the 'Default.Report' folder.
+        in_flight (int, optional): Maximum number of reports written at once.
+        model_names (list, optional): The models found by the catalog of the run, by relative path
+                                      (see list_report_models()).
+
+    Returns:
+        List[str]: The names of the semantic models.
+    """
+    return asyncio.run(render_reports(output_path, default_report_path, in_flight, model_names))
@@ -0,0 +1,105 @@
+# Requires Python 3.8 or later
+"""
+Catalog of the semantic models of the input, built in a single walk of the tree.
+
+scan_models() walks the input folder once with os.scandir and yields each semantic model as
+soon as its folder is scanned, with the size and modification time of each of its files, so
+the stages of a run never list the folders again:
+
+    for entry in scan_models("input_as"):
+        entry["name"]      # 'Sales.SemanticModel' (relative path inside the input folder)
+        entry["source"]    # 'input_as/Sales.SemanticModel'
+        entry["files"]     # {'definition/tables/Sales.tmdl': FileInfo(size=1234, mtime_ns=...), ...}
+
+Models nested in subfolders are found as the ones at the top of the input folder.
+"""
+import os
+from collections import namedtuple
+
+from semantic_model import is_table_file
+
+# Size (bytes) and modification time (nanoseconds) of a file
+FileInfo = namedtuple("FileInfo", ["size", "mtime_ns"])
+
+# Suffix of the folders of the semantic models
+MODEL_SUFFIX = ".SemanticModel"
+
+
+def scan_files(directory):
+    """
+    Lists the files inside a directory, recursively, as os.walk() does (symbolic links to
+    folders are not followed).
+
+    Parameters:
+        directory (str): The directory.
+
+    Returns:
+        dict: The FileInfo of each file by relative path (with '/' separators), sorted by path.
+              Empty if the directory does not exist.
+    """
+    files = {}
+    folders = [("", directory)]
+    while folders:
+        prefix, folder = folders.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            folders.append((f"{prefix}{entry.name}/", entry.path))
+                    else:
+                        stat = entry.stat()
+                        files[prefix + entry.name] = FileInfo(stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            continue
+    return dict(sorted(files.items()))
+
+
+def scan_models(input_path):
+    """
+    Finds the semantic models (the folders ending with '.SemanticModel') in input_path and its
+    subfolders, folder by folder in the order of their names. Hidden folders are skipped, and
+    the folders of the models are not searched for other models.
+
+    Parameters:
+        input_path (str): The input folder.
+
+    Yields:
+        dict: Each model as soon as it is scanned, with the keys name (relative path inside
+              input_path), source (the model folder) and files (see scan_files()).
+    """
+    folders = [input_path]
+    while folders:
+        folder = folders.pop()
+        try:
+            with os.scandir(folder) as entries:
+                subfolders = sorted(
+                    (entry.name, entry.path) for entry in entries if entry.is_dir() and not entry.name.startswith(".")
+                )
+        except OSError:
+            continue
+        nested = []
+        for name, path in subfolders:
+            if name.endswith(MODEL_SUFFIX):
+                yield {"name": os.path.relpath(path, input_path), "source": path, "files": scan_files(path)}
+            else:
+                nested.append(path)
+        # The subfolders are searched in the order of their names
+        folders.extend(reversed(nested))
+
+
+def count_table_files(files):
+    """
+    Returns:
+        int: The number of table files of a model (see scan_files()).
+    """
+    return sum(1 for relative_path in files if is_table_file(relative_path))
+
+
+def get_report_path(output_path, model_name):
+    """
+    Returns:
+        str: The report folder of a semantic model, next to it in the output folder
+             (e.g. 'output_pbip/sales/Sales.Report' for 'sales/Sales.SemanticModel').
+    """
+    return os.path.join(output_path, f"{model_name[:-len(MODEL_SUFFIX)]}.Report")
@@ -0,0 +1,429 @@
+# Requires Python 3.8 or later
+"""
+Options of the conversion, read from a JSON file given with --config, e.g.:
+
+    {
+        "incrementalRefresh": {
+            "rangeStart": "2020-01-01",
+            "rangeEnd": "2021-01-01",
+            "rules": [
+                {"tables": "Fact*", "dateColumn": "OrderDate", "rollingWindowPeriods": 5},
+                {"dateColumn": "TransactionDate", "incrementalGranularity": "month"}
+            ]
+        },
+        "storageModes": {
+            "default": "import",
+            "rules": [
+                {"tables": ["Fact*", "Log*"], "mode": "directQuery"},
+                {"tables": "Dim*", "mode": "dual"}
+            ]
+        },
+        "connectionParameters": {"server": "Server", "database": "Database"},
+        "pruning": {"scope": "hidden"},
+        "columnHints": {"encoding": true, "dataTypes": true, "keyPatterns": ["*Key", "*Id"]},
+        "transformRules": {
+            "builtin": true,
+            "rules": [
+                {"keyword": "annotation", "names": "PBI_*", "action": "drop"},
+                {"tables": "Fact*", "keyword": "formatString", "action": "rewrite",
+                 "pattern": "^#,0$", "replacement": "#,0.00"},
+                {"files": "definition/relationships.tmdl", "keyword": "crossFilteringBehavior", "action": "drop"}
+            ]
+        }
+    }
+
+Every section is optional, and unknown sections are rejected (e.g. a misspelled name); without a
+file the conversion keeps its default behaviour.
+"""
+import re
+import json
+import hashlib
+from fnmatch import fnmatchcase
+from datetime import datetime
+
+from tmdl import OBJECT_KEYWORDS
+
+# Granularities of a refresh policy
+GRANULARITIES = ("day", "month", "quarter", "year")
+
+# Defaults of the refresh policy of a rule
+REFRESH_POLICY_DEFAULTS = {
+    "rollingWindowGranularity": "year",
+    "rollingWindowPeriods": 5,
+    "incrementalGranularity": "day",
+    "incrementalPeriods": 10
+}
+
+# Names of the shared connection parameters (see connections.py)
+DEFAULT_PARAMETER_NAMES = {"server": "Server", "database": "Database"}
+
+# Storage modes of the converted partitions
+STORAGE_MODES = ("import", "directQuery", "dual")
+
+# Which unreferenced columns and tables are pruned (see pruning.py)
+PRUNING_SCOPES = ("hidden", "all")
+
+# Defaults of the columnHints section (see hints.py)
+COLUMN_HINTS_DEFAULTS = {
+    "encoding": True,
+    "dataTypes": True,
+    "keyPatterns": ["*Key", "*Id"]
+}
+
+# Actions of the transform rules (see rules.py)
+RULE_ACTIONS = ("keep", "drop", "rewrite", "replace")
+
+# Files the conversion writes or removes itself, that the "files" rules cannot apply to
+GENERATED_FILES = ("definition/expressions.tmdl", "definition/dataSources.tmdl")
+
+# Sections of a configuration file
+CONFIG_SECTIONS = (
+    "incrementalRefresh", "storageModes", "connectionParameters", "pruning", "columnHints", "transformRules"
+)
+
+# Initial value of the RangeStart parameter. RangeEnd defaults to the next 1st of January.
+DEFAULT_RANGE_START = "2020-01-01"
+
+
+class ConfigError(ValueError):
+    """
+    Raised when the configuration file is not valid.
+    """
+
+
+def parse_datetime(value, key):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"'{key}' must be a date or date and time (e.g. 2020-01-01), not {value!r}") from None
+
+
+def validate_refresh_rule(rule, index):
+    """
+    Checks a rule of the incrementalRefresh section and fills in the policy defaults.
+
+    Parameters:
+        rule (dict): The rule.
+        index (int): Position of the rule, used in the messages.
+
+    Returns:
+        dict: The rule with every key of REFRESH_POLICY_DEFAULTS, and 'tables' as a list of patterns.
+    """
+    where = f"incrementalRefresh.rules[{index}]"
+    if not isinstance(rule, dict):
+        raise ConfigError(f"{where} must be an object")
+    unknown = set(rule) - {"tables", "dateColumn"} - set(REFRESH_POLICY_DEFAULTS)
+    if unknown:
+        raise ConfigError(f"{where} has unknown keys: {', '.join(sorted(unknown))}")
+    if "tables" not in rule and "dateColumn" not in rule:
+        raise ConfigError(f"{where} needs 'tables' (name patterns) or 'dateColumn'")
+
+    result = dict(REFRESH_POLICY_DEFAULTS)
+    result.update(rule)
+    if "tables" in result:
+        result["tables"] = validate_patterns(result["tables"], where)
+    if "dateColumn" in result and not isinstance(result["dateColumn"], str):
+        raise ConfigError(f"{where}.dateColumn must be a column name")
+    for key in ("rollingWindowGranularity", "incrementalGranularity"):
+        if result[key] not in GRANULARITIES:
+            raise ConfigError(f"{where}.{key} must be one of: {', '.join(GRANULARITIES)}")
+    for key in ("rollingWindowPeriods", "incrementalPeriods"):
+        if not isinstance(result[key], int) or isinstance(result[key], bool) or result[key] < 1:
+            raise ConfigError(f"{where}.{key} must be a positive integer")
+    return result
+
+
+def match_table(patterns, table_name):
+    """
+    Checks a table name against the 'tables' patterns of a rule ('*' and '?' wildcards, any case).
+
+    Returns:
+        bool: True if one of the patterns matches.
+    """
+    return any(fnmatchcase(table_name.lower(), pattern.lower()) for pattern in patterns)
+
+
+def match_column(patterns, column_name):
+    """
+    Checks a column name against name patterns, e.g. columnHints.keyPatterns ('*' and '?'
+    wildcards, any case).
+
+    Returns:
+        bool: True if one of the patterns matches.
+    """
+    name = column_name.lower()
+    return any(fnmatchcase(name, pattern.lower()) for pattern in patterns)
+
+
+def validate_patterns(tables, where):
+    """
+    Returns:
+        list: The table name patterns of a rule, given as a single pattern or a list.
+    """
+    if isinstance(tables, str):
+        return [tables]
+    if not (isinstance(tables, list) and all(isinstance(t, str) for t in tables)):
+        raise ConfigError(f"{where}.tables must be a pattern or a list of patterns")
+    return tables
+
+
+def validate_storage_mode(mode, where):
+    """
+    Returns:
+        str: The storage mode as written in TMDL, whatever its case in the configuration.
+    """
+    for storage_mode in STORAGE_MODES:
+        if isinstance(mode, str) and mode.lower() == storage_mode.lower():
+            return storage_mode
+    raise ConfigError(f"{where} must be one of: {', '.join(STORAGE_MODES)}")
+
+
+def validate_storage_rule(rule, index):
+    """
+    Checks a rule of the storageModes section.
+
+    Parameters:
+        rule (dict): The rule.
+        index (int): Position of the rule, used in the messages.
+
+    Returns:
+        dict: The rule with 'tables' as a list of patterns.
+    """
+    where = f"storageModes.rules[{index}]"
+    if not isinstance(rule, dict) or set(rule) != {"tables", "mode"}:
+        raise ConfigError(f"{where} must be an object with the keys 'tables' and 'mode'")
+    return {
+        "tables": validate_patterns(rule["tables"], where),
+        "mode": validate_storage_mode(rule["mode"], f"{where}.mode")
+    }
+
+
+def validate_names(value, where, key):
+    """
+    Returns:
+        list: The names or patterns of a key of a rule, given as a single string or a list.
+    """
+    if isinstance(value, str):
+        value = [value]
+    if not (isinstance(value, list) and value and all(isinstance(item, str) and item for item in value)):
+        raise ConfigError(f"{where}.{key} must be a name or a list of names")
+    return value
+
+
+def validate_transform_rule(rule, where):
+    """
+    Checks a rule of the transformRules section (see rules.py).
+
+    Parameters:
+        rule (dict): The rule.
+        where (str): Position of the rule, used in the messages.
+
+    Returns:
+        dict: The rule with the keys tables and files (lists of patterns, one of them None),
+              keywords and names (lists, names None for any name), action, pattern, replacement and with.
+    """
+    if not isinstance(rule, dict):
+        raise ConfigError(f"{where} must be an object")
+    unknown = set(rule) - {"tables", "files", "keyword", "names", "action", "pattern", "replacement", "with"}
+    if unknown:
+        raise ConfigError(f"{where} has unknown keys: {', '.join(sorted(unknown))}")
+    if "tables" in rule and "files" in rule:
+        raise ConfigError(f"{where} applies to 'tables' or to 'files', not both")
+    action = rule.get("action")
+    if action not in RULE_ACTIONS:
+        raise ConfigError(f"{where}.action must be one of: {', '.join(RULE_ACTIONS)}")
+    if "keyword" not in rule:
+        raise ConfigError(f"{where} needs a 'keyword' (the first word of the lines it applies to)")
+
+    result = {
+        "tables": None,
+        "files": None,
+        "keywords": validate_names(rule["keyword"], where, "keyword"),
+        "names": validate_names(rule["names"], where, "names") if "names" in rule else None,
+        "action": action,
+        "pattern": None,
+        "replacement": None,
+        "with": None
+    }
+    if "files" in rule:
+        result["files"] = validate_names(rule["files"], where, "files")
+        for generated_file in GENERATED_FILES:
+            if generated_file.lower() in (pattern.lower() for pattern in result["files"]):
+                raise ConfigError(f"{where} cannot apply to {generated_file}: the conversion writes it")
+    else:
+        result["tables"] = validate_patterns(rule.get("tables", "*"), where)
+        if "table" in result["keywords"]:
+            raise ConfigError(f"{where} cannot apply to the table declaration: use 'tables' to choose the tables")
+
+    objects = [keyword for keyword in result["keywords"] if keyword in OBJECT_KEYWORDS]
+    if action == "replace" and len(objects) < len(result["keywords"]):
+        raise ConfigError(f"{where}: only objects (e.g. column, measure, annotation) can be replaced")
+    if action == "rewrite" and objects:
+        raise ConfigError(f"{where}: only the value of properties (e.g. formatString) can be rewritten")
+    if result["names"] is not None and not objects:
+        raise ConfigError(f"{where}.names only applies to objects (e.g. column, measure, annotation)")
+
+    if action == "rewrite":
+        if not isinstance(rule.get("replacement"), str):
+            raise ConfigError(f"{where}.replacement must be the new value (a string)")
+        result["replacement"] = rule["replacement"]
+        if "pattern" in rule:
+            try:
+                re.compile(rule["pattern"])
+            except (TypeError, re.error) as e:
+                raise ConfigError(f"{where}.pattern must be a regular expression: {e}") from None
+            result["pattern"] = rule["pattern"]
+    elif "pattern" in rule or "replacement" in rule:
+        raise ConfigError(f"{where}: 'pattern' and 'replacement' are only used by the rewrite action")
+    if action == "replace":
+        lines = rule.get("with")
+        if isinstance(lines, list) and all(isinstance(line, str) for line in lines):
+            lines = "\n".join(lines)
+        if not isinstance(lines, str):
+            raise ConfigError(f"{where}.with must be the TMDL text (a string or a list of lines) of the new block")
+        result["with"] = lines
+    elif "with" in rule:
+        raise ConfigError(f"{where}: 'with' is only used by the replace action")
+    return result
+
+
+def validate_config(data):
+    """
+    Checks the content of a configuration file and fills in the defaults.
+
+    Parameters:
+        data (dict): The parsed JSON file.
+
+    Returns:
+        dict: The configuration.
+
+    Raises:
+        ConfigError: If the configuration is not valid.
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("The configuration must be a JSON object")
+    unknown = set(data) - set(CONFIG_SECTIONS)
+    if unknown:
+        raise ConfigError(
+            f"Unknown sections in the configuration: {', '.join(sorted(unknown))} "
+            f"(expected {', '.join(CONFIG_SECTIONS)})"
+        )
+    config = {}
+
+    refresh = data.get("incrementalRefresh")
+    if refresh is not None:
+        if not isinstance(refresh, dict) or not isinstance(refresh.get("rules", []), list):
+            raise ConfigError("incrementalRefresh must be an object with a list of rules")
+        range_start = refresh.get("rangeStart", DEFAULT_RANGE_START)
+        start = parse_datetime(range_start, "rangeStart")
+        range_end = refresh.get("rangeEnd", f"{start.year + 1}-01-01")
+        if start >= parse_datetime(range_end, "rangeEnd"):
+            raise ConfigError("incrementalRefresh.rangeStart must be before rangeEnd")
+        config["incrementalRefresh"] = {
+            "rangeStart": range_start,
+            "rangeEnd": range_end,
+            "rules": [validate_refresh_rule(rule, index) for index, rule in enumerate(refresh.get("rules", []))]
+        }
+
+    storage = data.get("storageModes")
+    if storage is not None:
+        if not isinstance(storage, dict) or not isinstance(storage.get("rules", []), list):
+            raise ConfigError("storageModes must be an object with a list of rules")
+        default = storage.get("default")
+        config["storageModes"] = {
+            "default": None if default is None else validate_storage_mode(default, "storageModes.default"),
+            "rules": [validate_storage_rule(rule, index) for index, rule in enumerate(storage.get("rules", []))]
+        }
+
+    parameters = data.get("connectionParameters")
+    if parameters is True:
+        parameters = {}
+    if parameters not in (None, False):
+        if not isinstance(parameters, dict) or set(parameters) - set(DEFAULT_PARAMETER_NAMES):
+            raise ConfigError("connectionParameters must be true or an object with the keys 'server' and 'database'")
+        names = dict(DEFAULT_PARAMETER_NAMES)
+        names.update(parameters)
+        if not all(isinstance(name, str) and name.strip() for name in names.values()) or len(set(names.values())) < 2:
+            raise ConfigError("connectionParameters needs two different parameter names")
+        config["connectionParameters"] = names
+
+    pruning = data.get("pruning")
+    if pruning is True:
+        pruning = {}
+    if pruning not in (None, False):
+        if not isinstance(pruning, dict) or set(pruning) - {"scope"}:
+            raise ConfigError("pruning must be true or an object with the key 'scope'")
+        scope = pruning.get("scope", PRUNING_SCOPES[0])
+        if scope not in PRUNING_SCOPES:
+            raise ConfigError(f"pruning.scope must be one of {', '.join(PRUNING_SCOPES)}, not {scope!r}")
+        config["pruning"] = {"scope": scope}
+
+    hints = data.get("columnHints")
+    if hints is True:
+        hints = {}
+    if hints not in (None, False):
+        if not isinstance(hints, dict) or set(hints) - set(COLUMN_HINTS_DEFAULTS):
+            raise ConfigError(
+                f"columnHints must be true or an object with the keys {', '.join(COLUMN_HINTS_DEFAULTS)}"
+            )
+        settings = dict(COLUMN_HINTS_DEFAULTS)
+        settings.update(hints)
+        if not isinstance(settings["encoding"], bool) or not isinstance(settings["dataTypes"], bool):
+            raise ConfigError("columnHints.encoding and columnHints.dataTypes must be true or false")
+        patterns = settings["keyPatterns"]
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        if not (isinstance(patterns, list) and all(isinstance(pattern, str) for pattern in patterns)):
+            raise ConfigError("columnHints.keyPatterns must be a pattern or a list of patterns")
+        settings["keyPatterns"] = patterns
+        config["columnHints"] = settings
+
+    rules = data.get("transformRules")
+    if isinstance(rules, list):
+        rules = {"rules": rules}
+    if rules is not None:
+        if not isinstance(rules, dict) or set(rules) - {"builtin", "rules"} or not isinstance(rules.get("rules", []), list):
+            raise ConfigError("transformRules must be a list of rules or an object with the keys 'builtin' and 'rules'")
+        if not isinstance(rules.get("builtin", True), bool):
+            raise ConfigError("transformRules.builtin must be true or false")
+        config["transformRules"] = {
+            "builtin": rules.get("builtin", True),
+            "rules": [
+                validate_transform_rule(rule, f"transformRules.rules[{index}]")
+                for index, rule in enumerate(rules.get("rules", []))
+            ]
+        }
+
+    return config
+
+
+def load_config(file_path):
+    """
+    Loads and validates a configuration file.
+
+    Parameters:
+        file_path (str): The JSON file.
+
+    Returns:
+        dict: The configuration (see validate_config()).
+
+    Raises:
+        ConfigError: If the file cannot be read or is not valid.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (IOError, ValueError) as e:
+        raise ConfigError(f"Cannot read the configuration {file_path}: {e}") from None
+    return validate_config(data)
+
+
+def get_config_fingerprint(config):
+    """
+    Returns:
+        str: A hash of the configuration, empty without one, recorded in the conversion manifest
+             so that changing the configuration converts every model again.
+    """
+    if not config:
+        return ""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
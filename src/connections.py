@@ -0,0 +1,106 @@
+# Requires Python 3.8 or later
+"""
+Shared connection parameters of the converted partitions.
+
+With a "connectionParameters" section in the configuration (see config.py), the partitions
+read their server and database from text parameters declared once in expressions.tmdl,
+instead of repeating them as literals in every table, so the whole model is repointed to
+another server by editing one parameter.
+
+The connections of a model are the ones of its data sources, in the order of dataSources.tmdl
+(for Tabular Editor models, the ones of its tables, in the order of their paths). The first one
+uses the plain parameter names (Server and Database by default), and any other server or
+database is numbered by its position among them (e.g. 'Server 2'). Every table chooses its
+parameters from the connections of the whole model, so the result does not depend on the order
+in which the tables are converted. A value that is not among them (e.g. a missing database)
+gets a parameter named after it (e.g. 'Database None').
+"""
+import re
+
+# M identifiers that can be written without quotes
+M_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Characters left out of the parameters named after a value
+PARAMETER_SUFFIX_PATTERN = re.compile(r"[^A-Za-z0-9]+")
+
+TEXT_PARAMETER_META = 'meta [IsParameterQuery=true, Type="Text", IsParameterQueryRequired=true]'
+
+
+def format_m_text(value):
+    """
+    Returns:
+        str: The M text literal of a value, e.g. "srv01".
+    """
+    return '"' + value.replace('"', '""') + '"'
+
+
+def format_m_identifier(name):
+    """
+    Returns:
+        str: The M reference to a query or parameter, quoted as #"..." when needed.
+    """
+    if M_IDENTIFIER_PATTERN.fullmatch(name):
+        return name
+    return "#" + format_m_text(name)
+
+
+def get_model_connections(data_sources):
+    """
+    Lists the connections of a model: the data sources of its index with a server, in order.
+    The first one is the main connection.
+
+    Parameters:
+        data_sources (dict): Index of the data sources of the model (see datasources.py).
+
+    Returns:
+        list: The (server, database) of each data source.
+    """
+    return [(server, database) for server, database, _ in (data_sources or {}).values() if server]
+
+
+def get_parameter_name(name, value, values):
+    """
+    Names the parameter of a server or database (see the module docstring).
+
+    Parameters:
+        name (str): The name of the main parameter, e.g. 'Server'.
+        value (str): The server or database.
+        values (list): The distinct servers (or databases) of the connections of the model, in order.
+
+    Returns:
+        str: e.g. 'Server' for the first value, 'Server 2' for the second one.
+    """
+    if value in values:
+        position = values.index(value)
+        return name if position == 0 else f"{name} {position + 1}"
+    suffix = PARAMETER_SUFFIX_PATTERN.sub("_", value).strip("_") or "_"
+    # Never the name of a numbered parameter
+    return f"{name} {'_' + suffix if suffix.isdigit() else suffix}"
+
+
+def get_connection_parameters(names, server, database, connections, expressions):
+    """
+    Chooses the parameters of the connection of a partition and collects their expressions.
+
+    Parameters:
+        names (dict): The names of the main parameters, with the keys server and database.
+        server (str): The server of the partition.
+        database (str): The database of the partition.
+        connections (list): The connections of the model (see get_model_connections()).
+        expressions (dict): Receives the M expression of each parameter, by name.
+
+    Returns:
+        tuple: (server, database) as M references to the parameters.
+    """
+    references = []
+    for index, (key, value) in enumerate((("server", server), ("database", database))):
+        values = []
+        for connection in connections or ():
+            if f"{connection[index]}" not in values:
+                values.append(f"{connection[index]}")
+        # Missing values are written as the literal partitions do
+        value = f"{value}"
+        name = get_parameter_name(names[key], value, values)
+        expressions[name] = f"{format_m_text(value)} {TEXT_PARAMETER_META}"
+        references.append(format_m_identifier(name))
+    return tuple(references)
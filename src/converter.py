@@ -0,0 +1,99 @@
+# Requires Python 3.8 or later
+"""
+Library API of the converter, to embed it in another application without staging
+the models in temporary folders:
+
+    from converter import convert_semantic_model, render_report
+
+    output_files = convert_semantic_model(input_files)
+    report_files = render_report("Sales")
+
+The files are dictionaries of their content (bytes) by path relative to the
+'.SemanticModel' (or '.Report') folder, e.g. 'definition/tables/Sales.tmdl'.
+The functions can run in parallel threads. They only share the report templates, loaded
+from disk once per folder and kept in memory (see load_template()), and the counters of
+the process-wide metrics (see metrics.get_metrics()), which every call adds to; do not
+call them while process.run() is running in another thread, since it swaps the metrics.
+"""
+import os
+import threading
+
+from utils import convert_semantic_model_files, load_report_template, render_report_files
+from filesystem import MemoryFileSystem
+
+# The blank report shipped with the converter
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Default.Report")
+
+# The report templates already loaded, by folder
+templates = {}
+templates_lock = threading.Lock()
+
+
+def load_template(default_report_path=DEFAULT_REPORT_PATH, reload=False):
+    """
+    Loads a 'Default.Report' folder once, and returns the same template on the next calls.
+
+    Parameters:
+        default_report_path (str, optional): The 'Default.Report' folder.
+        reload (bool, optional): Read the folder again (e.g. after editing the template).
+
+    Returns:
+        dict: The template (see utils.load_report_template()).
+
+    Raises:
+        FileNotFoundError: If the folder does not exist.
+    """
+    key = os.path.abspath(default_report_path)
+    with templates_lock:
+        template = None if reload else templates.get(key)
+        if template is None:
+            template = load_report_template(default_report_path)
+            if template is None:
+                raise FileNotFoundError(f"Default report folder not found at: {default_report_path}")
+            templates[key] = template
+    return template
+
+
+def convert_semantic_model(files, errors=None, config=None):
+    """
+    Converts the files of an Analysis Services semantic model into the files of
+    the semantic model of a Power BI project, in memory.
+
+    Parameters:
+        files (Mapping): The content (bytes or str) of each file of the '.SemanticModel' folder,
+                         by relative path.
+        errors (dict, optional): Receives the error message of each table that could not be
+                                 transformed (and was copied unchanged), by relative path.
+        config (dict, optional): The options of the conversion, as returned by config.load_config().
+
+    Returns:
+        dict: The content (bytes) of each converted file, by relative path.
+    """
+    source = MemoryFileSystem(files)
+    dest = MemoryFileSystem()
+    failures = convert_semantic_model_files(source, dest, config=config)
+    if errors is not None:
+        errors.update(failures)
+    return dest.files
+
+
+def render_report(semantic_model_name, default_report_path=DEFAULT_REPORT_PATH, template=None):
+    """
+    Renders the files of the '<semantic_model_name>.Report' folder, pointing to
+    '../<semantic_model_name>.SemanticModel'. The template is read from disk only once.
+
+    Parameters:
+        semantic_model_name (str): Name of the semantic model.
+        default_report_path (str, optional): The 'Default.Report' folder used as template.
+        template (dict, optional): A template already loaded (see load_template()), used instead
+                                   of default_report_path.
+
+    Returns:
+        dict: The content (bytes) of each file of the report, by relative path.
+    """
+    if template is None:
+        template = load_template(default_report_path)
+    files = dict(template["files"])
+    for relative_path, content in render_report_files(template, semantic_model_name).items():
+        files[relative_path] = content.encode("utf-8")
+    return files
@@ -0,0 +1,135 @@
+# Requires Python 3.8 or later
+from tmdl import as_document, unquote_name
+
+# Connection string keywords that hold the server and the database, in order of preference
+SERVER_KEYWORDS = ("data source", "server", "address", "addr", "network address", "host")
+DATABASE_KEYWORDS = ("initial catalog", "database")
+PROVIDER_KEYWORDS = ("provider",)
+
+
+def parse_connection_string(connection_string):
+    """
+    Parses a connection string into its keywords and values.
+
+    The keys may come in any order and are case insensitive. Values may be enclosed
+    in double or single quotes (doubling the quote escapes it), so they can contain ';'.
+
+    Parameters:
+        connection_string (str): e.g. 'Provider=SQLNCLI11;Data Source=srv;Initial Catalog="My DB"'.
+
+    Returns:
+        dict: The values by lower case keyword.
+    """
+    values = {}
+    position = 0
+    length = len(connection_string)
+
+    while position < length:
+        # Read the keyword up to the '='
+        equals = connection_string.find("=", position)
+        if equals == -1:
+            break
+        key = connection_string[position:equals].strip().strip(";").strip().lower()
+        position = equals + 1
+
+        # Skip the spaces before the value
+        while position < length and connection_string[position] == " ":
+            position += 1
+
+        if position < length and connection_string[position] in "\"'":
+            # Quoted value: read up to the closing quote, a doubled quote is an escaped quote
+            quote = connection_string[position]
+            position += 1
+            value = []
+            while position < length:
+                char = connection_string[position]
+                if char == quote:
+                    if position + 1 < length and connection_string[position + 1] == quote:
+                        value.append(quote)
+                        position += 2
+                        continue
+                    position += 1
+                    break
+                value.append(char)
+                position += 1
+            value = "".join(value)
+            # Skip anything up to the next separator
+            separator = connection_string.find(";", position)
+            position = length if separator == -1 else separator + 1
+        else:
+            separator = connection_string.find(";", position)
+            if separator == -1:
+                separator = length
+            value = connection_string[position:separator].strip()
+            position = separator + 1
+
+        if key:
+            values[key] = value
+
+    return values
+
+
+def get_connection_value(values, keywords):
+    """
+    Returns the value of the first keyword found in a parsed connection string.
+
+    Parameters:
+        values (dict): The parsed connection string (see parse_connection_string()).
+        keywords (tuple): The keywords to look for, in order of preference.
+
+    Returns:
+        str or None: The value, or None if no keyword was found.
+    """
+    for keyword in keywords:
+        if values.get(keyword):
+            return values[keyword]
+    return None
+
+
+def parse_data_sources(text):
+    """
+    Parses the content of a dataSources.tmdl file into an index of its provider data sources.
+
+    Parameters:
+        text (str or Document): Content of the dataSources.tmdl file, or its parsed document.
+
+    Returns:
+        dict: Mapping of the lower case data source name to a tuple (server, database, provider).
+              Values that are not found are None.
+    """
+    index = {}
+
+    for node in as_document(text).iter_nodes("dataSource"):
+        # Only provider (legacy) data sources have a connection string
+        if (node.value or "provider").lower() != "provider" or node.name is None:
+            continue
+
+        properties = {}
+        for key in ("connectionString", "provider"):
+            value = (node.properties.get(key) or "").strip()
+            if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+                value = value[1:-1].replace('""', '"')
+            properties[key] = value
+
+        values = parse_connection_string(properties["connectionString"])
+        index[node.name.lower()] = (
+            get_connection_value(values, SERVER_KEYWORDS),
+            get_connection_value(values, DATABASE_KEYWORDS),
+            properties["provider"] or get_connection_value(values, PROVIDER_KEYWORDS)
+        )
+
+    return index
+
+
+def get_data_source(data_sources, data_source_id):
+    """
+    Looks up a data source in the index, ignoring the case of its name.
+
+    Parameters:
+        data_sources (dict): The index returned by parse_data_sources().
+        data_source_id (str): Data source identifier (e.g., "DemoSAP").
+
+    Returns:
+        tuple: (server, database, provider), or (None, None, None) if not found.
+    """
+    return data_sources.get(unquote_name(data_source_id).lower(), (None, None, None))
@@ -0,0 +1,334 @@
+# Requires Python 3.8 or later
+import os
+import shutil
+
+from metrics import count
+
+
+def read_text_file(file_path):
+    """
+    Reads the whole content of a text file.
+
+    Parameters:
+        file_path (str): Path of the file to read.
+
+    Returns:
+        str: The content of the file.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        count("files_read")
+        count("bytes_in", os.fstat(f.fileno()).st_size)
+        return f.read()
+
+
+def has_content(file_path, content):
+    """
+    Checks if a file already has the given content, reading it only if the sizes match.
+
+    Parameters:
+        file_path (str): Path of the file.
+        content (bytes): The expected content.
+
+    Returns:
+        bool: True if the file exists (as a regular file, not a symbolic link) with that content.
+    """
+    try:
+        if os.path.islink(file_path) or os.path.getsize(file_path) != len(content):
+            return False
+        with open(file_path, "rb") as f:
+            return f.read() == content
+    except OSError:
+        return False
+
+
+def has_same_content(file_path, other_file, chunk_size=1024 * 1024):
+    """
+    Checks if two files have the same content, reading them chunk by chunk
+    (the files can be too large to be held in memory).
+
+    Parameters:
+        file_path (str): Path of the first file.
+        other_file (str): Path of the second file, which must not be a symbolic link.
+        chunk_size (int, optional): Bytes read from each file at a time.
+
+    Returns:
+        bool: True if both files exist with the same content.
+    """
+    try:
+        if os.path.islink(other_file) or os.path.getsize(file_path) != os.path.getsize(other_file):
+            return False
+        with open(file_path, "rb") as f, open(other_file, "rb") as other:
+            while True:
+                chunk = f.read(chunk_size)
+                if chunk != other.read(chunk_size):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+def write_bytes_file(file_path, content):
+    """
+    Writes the content to a file, creating its folder if needed, unless the file
+    already has that content: it is then left alone, with its modification time,
+    so that git and the tools syncing the output only see the files that really changed.
+
+    The content is written to a temporary file that then replaces the destination,
+    so a destination that is a hard link to an input file is never modified in place.
+
+    Parameters:
+        file_path (str): Path of the file to write.
+        content (bytes): The new content of the file.
+
+    Returns:
+        bool: True if the file was written, False if it was unchanged.
+    """
+    if has_content(file_path, content):
+        count("files_unchanged")
+        return False
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    temp_file = file_path + ".tmp"
+    with open(temp_file, "wb") as f:
+        f.write(content)
+    count("files_written")
+    count("bytes_out", len(content))
+    os.replace(temp_file, file_path)
+    return True
+
+
+def encode_text(content):
+    """
+    Encodes text as written to a file opened in text mode, with the line breaks of the platform.
+
+    Parameters:
+        content (str): The text.
+
+    Returns:
+        bytes: The content of the file.
+    """
+    if os.linesep != "\n":
+        content = content.replace("\n", os.linesep)
+    return content.encode("utf-8")
+
+
+def write_text_file(file_path, content):
+    """
+    Writes the content to a file with the line breaks of the platform, unless the file
+    already has that content (see write_bytes_file()).
+
+    Parameters:
+        file_path (str): Path of the file to write.
+        content (str): The new content of the file.
+
+    Returns:
+        bool: True if the file was written, False if it was unchanged.
+    """
+    return write_bytes_file(file_path, encode_text(content))
+
+
+def link_or_copy_file(source_file, dest_file, link=False):
+    """
+    Copies the source file into the destination, or hard-links it if requested and
+    supported (not across file systems). An existing destination is replaced, unless
+    it already has the content of the source file.
+    
+    A hard link shares its content with the source: an editor saving the destination
+    in place would also change the source, so files are only linked on request.
+    
+    Parameters:
+        source_file (str): The file to link or copy.
+        dest_file (str): The destination path.
+        link (bool, optional): Hard-link the file instead of copying it.
+    """
+    os.makedirs(os.path.dirname(dest_file) or ".", exist_ok=True)
+    if os.path.lexists(dest_file):
+        linked = not os.path.islink(dest_file) and os.path.samefile(source_file, dest_file)
+        # A destination linked by an earlier run is copied again, unless linking was requested
+        if (link and linked) or (not linked and has_same_content(source_file, dest_file)):
+            count("files_unchanged")
+            return
+        os.remove(dest_file)
+    if link:
+        try:
+            os.link(source_file, dest_file)
+            count("files_linked")
+            return
+        except OSError:
+            pass
+    shutil.copy2(source_file, dest_file)
+    count("files_written")
+    count("bytes_out", os.path.getsize(dest_file))
+
+
+class LocalFileSystem:
+    """
+    The files of a folder on disk, addressed by their path relative to the folder
+    with '/' separators (e.g. 'definition/tables/Sales.tmdl').
+
+    The conversion functions only access the files of a semantic model through
+    this interface, so the same transforms run over a folder, memory or an archive.
+    """
+
+    def __init__(self, root, link=False, files=None):
+        """
+        Parameters:
+            root (str): The folder.
+            link (bool, optional): Hard-link the files copied unchanged from another folder
+                                   instead of copying them (see link_or_copy_file()).
+            files (dict, optional): The FileInfo of the files of the folder by relative path, when it
+                                    was already scanned (see catalog.py): list_files(), exists() and
+                                    get_size() then use it instead of the disk.
+        """
+        self.root = root
+        self.link = link
+        self.files = files
+
+    def path(self, relative_path):
+        """
+        Returns:
+            str: The path of the file on disk (the folder itself for an empty path).
+        """
+        if not relative_path:
+            return self.root
+        return os.path.join(self.root, *relative_path.split("/"))
+
+    def list_files(self, folder=""):
+        """
+        Lists the files inside a folder, recursively.
+
+        Parameters:
+            folder (str, optional): Relative path of the folder. Defaults to the root.
+
+        Returns:
+            list: The sorted relative paths of the files.
+        """
+        if self.files is not None:
+            prefix = folder.rstrip("/") + "/" if folder else ""
+            return [path for path in self.files if path.startswith(prefix)]
+        files = []
+        for root, _, names in os.walk(self.path(folder) if folder else self.root):
+            for name in names:
+                files.append(os.path.relpath(os.path.join(root, name), self.root).replace(os.sep, "/"))
+        return sorted(files)
+
+    def exists(self, relative_path):
+        if self.files is not None:
+            return relative_path in self.files
+        return os.path.isfile(self.path(relative_path))
+
+    def get_size(self, relative_path):
+        if self.files is not None and relative_path in self.files:
+            return self.files[relative_path].size
+        return os.path.getsize(self.path(relative_path))
+
+    def read_text(self, relative_path):
+        return read_text_file(self.path(relative_path))
+
+    def read_bytes(self, relative_path):
+        with open(self.path(relative_path), "rb") as f:
+            content = f.read()
+        count("files_read")
+        count("bytes_in", len(content))
+        return content
+
+    def write_text(self, relative_path, content):
+        write_text_file(self.path(relative_path), content)
+
+    def write_bytes(self, relative_path, content):
+        write_bytes_file(self.path(relative_path), content)
+
+    def remove(self, relative_path):
+        if os.path.lexists(self.path(relative_path)):
+            os.remove(self.path(relative_path))
+
+    def copy_from(self, source, relative_path):
+        """
+        Copies a file unchanged from another file system (hard-linked on request when both are on disk).
+
+        Parameters:
+            source (LocalFileSystem or MemoryFileSystem): The file system to copy from.
+            relative_path (str): Relative path of the file, the same in both file systems.
+        """
+        if isinstance(source, LocalFileSystem):
+            link_or_copy_file(source.path(relative_path), self.path(relative_path), self.link)
+        else:
+            self.write_bytes(relative_path, source.read_bytes(relative_path))
+
+
+class MemoryFileSystem:
+    """
+    Files kept in memory in a dictionary of their content (bytes) by relative path,
+    with the same interface as LocalFileSystem.
+    """
+
+    def __init__(self, files=None):
+        """
+        Parameters:
+            files (Mapping, optional): The initial content (bytes or str) of each file by relative path.
+                                       Backslashes in the paths are read as '/'.
+        """
+        self.files = {}
+        for relative_path, content in (files or {}).items():
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            self.files[relative_path.replace("\\", "/").lstrip("/")] = bytes(content)
+
+    def path(self, relative_path):
+        return relative_path or "<memory>"
+
+    def list_files(self, folder=""):
+        prefix = folder.rstrip("/") + "/" if folder else ""
+        return sorted(path for path in self.files if path.startswith(prefix))
+
+    def exists(self, relative_path):
+        return relative_path in self.files
+
+    def read_text(self, relative_path):
+        # Same newlines as a file opened in text mode
+        text = self.read_bytes(relative_path).decode("utf-8")
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+    def read_bytes(self, relative_path):
+        try:
+            content = self.files[relative_path]
+        except KeyError:
+            raise FileNotFoundError(f"No such file: '{relative_path}'") from None
+        count("files_read")
+        count("bytes_in", len(content))
+        return content
+
+    def write_text(self, relative_path, content):
+        self.write_bytes(relative_path, content.encode("utf-8"))
+
+    def write_bytes(self, relative_path, content):
+        self.files[relative_path] = bytes(content)
+        count("files_written")
+        count("bytes_out", len(content))
+
+    def remove(self, relative_path):
+        self.files.pop(relative_path, None)
+
+    def copy_from(self, source, relative_path):
+        self.write_bytes(relative_path, source.read_bytes(relative_path))
+
+
+def find_file(file_system, relative_path):
+    """
+    Finds a file ignoring the case of its name (e.g. 'definition/dataSources.tmdl'
+    and 'definition/datasources.tmdl').
+
+    Parameters:
+        file_system (LocalFileSystem or MemoryFileSystem): The file system to search.
+        relative_path (str): Relative path of the file.
+
+    Returns:
+        str or None: The relative path of the file as stored if found; otherwise, None.
+    """
+    if file_system.exists(relative_path):
+        return relative_path
+    folder = relative_path.rpartition("/")[0]
+    for path in file_system.list_files(folder):
+        if path.lower() == relative_path.lower():
+            return path
+    return None
@@ -0,0 +1,255 @@
+# Requires Python 3.8 or later
+"""
+Encoding and data type hints of the imported columns.
+
+With a "columnHints" section in the configuration (see config.py), the columns of the
+tables converted to import partitions are analysed from their metadata: dataType,
+summarizeBy, sourceProviderType, their name and, for Tabular Editor models, the
+"Columns" of the TabularEditor_TableSchema annotation. Two kinds of hints are written
+into their column blocks:
+
+    - encodingHint: Value for the numeric columns that are aggregated and the integer keys,
+      which VertiPaq would otherwise often hash encode, building a dictionary as large
+      as the column.
+    - A tighter dataType when the source type is narrower than the declared one, e.g.
+      int64 instead of double for an int column, or decimal (fixed decimal) instead of
+      double for a money column.
+
+Columns that already declare an encodingHint, and calculated columns, are left unchanged.
+"""
+import re
+
+from tmdl import Line
+from config import match_column
+from metrics import log, DEBUG
+
+# Source types (SQL Server names) loaded as whole numbers, as booleans, and as decimals
+# with at most 4 digits after the point (the precision of the fixed decimal type)
+INTEGER_SOURCE_TYPES = ("bigint", "int", "integer", "smallint", "tinyint", "int64", "int32", "int16")
+BOOLEAN_SOURCE_TYPES = ("bit",)
+FIXED_DECIMAL_SOURCE_TYPES = ("money", "smallmoney")
+DECIMAL_SOURCE_TYPES = ("decimal", "numeric")
+
+NUMERIC_DATA_TYPES = ("int64", "decimal", "double")
+
+# "decimal(18, 2)" -> ("decimal", "18, 2")
+SOURCE_TYPE_PATTERN = re.compile(r"\s*([A-Za-z]\w*)\s*(?:\((.*)\))?\s*$")
+
+
+def get_hint_settings(config):
+    """
+    Returns:
+        dict or None: The "columnHints" section of the configuration, None without it.
+    """
+    return (config or {}).get("columnHints")
+
+
+def get_schema_column_types(schema_columns):
+    """
+    Reads the source types of the "Columns" of a TabularEditor_TableSchema annotation.
+
+    Parameters:
+        schema_columns (list): The "Columns" of the annotation, or None.
+
+    Returns:
+        dict: The source type of each column, by lower case name.
+    """
+    types = {}
+    for entry in schema_columns or []:
+        if not isinstance(entry, dict) or not isinstance(entry.get("Name"), str):
+            continue
+        source_type = entry.get("DataType") or entry.get("SourceType")
+        if isinstance(source_type, str):
+            types[entry["Name"].lower()] = source_type
+    return types
+
+
+def tighten_data_type(data_type, source_type):
+    """
+    Chooses a narrower data type for a column from the type of its source column.
+
+    Parameters:
+        data_type (str): The declared dataType.
+        source_type (str): The type of the source column, e.g. 'int' or 'decimal(18, 2)'.
+
+    Returns:
+        str or None: The new dataType, None to keep the declared one.
+    """
+    match = SOURCE_TYPE_PATTERN.match(source_type or "")
+    if match is None or not data_type:
+        return None
+    name = match.group(1).lower()
+    data_type = data_type.lower()
+
+    if name in INTEGER_SOURCE_TYPES and data_type in ("decimal", "double"):
+        return "int64"
+    if name in BOOLEAN_SOURCE_TYPES and data_type in ("int64", "string"):
+        return "boolean"
+    if name in FIXED_DECIMAL_SOURCE_TYPES and data_type == "double":
+        return "decimal"
+    if name in DECIMAL_SOURCE_TYPES and data_type == "double" and match.group(2):
+        # Only when the scale is known and fits in the fixed decimal type
+        arguments = [argument.strip() for argument in match.group(2).split(",")]
+        if len(arguments) == 2 and arguments[1].isdigit() and int(arguments[1]) <= 4:
+            return "decimal"
+    return None
+
+
+def choose_encoding_hint(column, data_type, key_patterns):
+    """
+    Chooses the encodingHint of a column.
+
+    Parameters:
+        column (dict): The column, with the keys name and summarizeBy.
+        data_type (str): Its dataType, after tighten_data_type().
+        key_patterns (list): Name patterns of the key columns.
+
+    Returns:
+        str or None: "Value", or None to leave the choice to the engine.
+    """
+    data_type = (data_type or "").lower()
+    if data_type not in NUMERIC_DATA_TYPES:
+        return None
+    if data_type == "int64" and match_column(key_patterns, column["name"]):
+        # Integer keys are dense: their values need no dictionary
+        return "Value"
+    if (column.get("summarizeBy") or "").lower() != "none":
+        # Aggregated columns (numeric columns are summed by default)
+        return "Value"
+    return None
+
+
+def find_column_hints(config, columns, schema_columns=None, file_path=""):
+    """
+    Chooses the hints of the columns of a table.
+
+    Parameters:
+        config (dict): The configuration (see config.py), or None.
+        columns (list): The columns of the table, as dicts with the keys name, sourceColumn,
+                        dataType, summarizeBy, sourceProviderType and encodingHint.
+        schema_columns (list, optional): The "Columns" of the TabularEditor_TableSchema annotation.
+        file_path (str, optional): Path of the table file, used in the messages.
+
+    Returns:
+        dict: For each column to change, by lower case name, a dict with the keys dataType
+              (the new type or None) and encodingHint (the hint to add or None).
+    """
+    settings = get_hint_settings(config)
+    if settings is None:
+        return {}
+    schema_types = get_schema_column_types(schema_columns)
+
+    hints = {}
+    for column in columns:
+        if not column.get("sourceColumn") or column.get("encodingHint"):
+            continue
+        data_type = None
+        if settings["dataTypes"]:
+            source_type = column.get("sourceProviderType") or schema_types.get(column["name"].lower()) \
+                or schema_types.get(column["sourceColumn"].lower())
+            data_type = tighten_data_type(column.get("dataType"), source_type)
+        encoding_hint = None
+        if settings["encoding"]:
+            encoding_hint = choose_encoding_hint(column, data_type or column.get("dataType"), settings["keyPatterns"])
+        if data_type or encoding_hint:
+            hints[column["name"].lower()] = {"dataType": data_type, "encodingHint": encoding_hint}
+    if hints:
+        log(f"Column hints for {len(hints)} column(s) of '{file_path}'", DEBUG)
+    return hints
+
+
+class ColumnHintWriter:
+    """
+    Writes the hints of find_column_hints() into the lines of a table file, line by line:
+    the dataType line of each column is replaced and the encodingHint is added after it.
+    A column without a dataType line (e.g. dropped by a transform rule) gets its hints at
+    the end of its block, before the blank lines and descriptions that follow it.
+    """
+
+    def __init__(self, hints):
+        """
+        Parameters:
+            hints (dict): The hints of the columns, by lower case name.
+        """
+        self.hints = hints
+        # The hints of the column being read, None outside of a column with hints not written yet
+        self.column = None
+        self.indent = None
+        # The indentation and line break of the properties of the column
+        self.prefix = None
+        self.ending = None
+        # The blank lines and descriptions held until the next line shows if the column ends
+        self.held = []
+
+    def needs_whole_line(self, line):
+        """
+        Returns:
+            bool: True if feed() needs the whole line rather than its beginning (see streaming.py).
+        """
+        return self.column is not None and (
+            line.kind in ("blank", "comment") or (line.kind == "property" and line.keyword == "dataType")
+        )
+
+    def feed(self, line):
+        """
+        Parameters:
+            line (Line): The next line (whole, for a dataType property, or a blank line or
+                         description inside a column with hints).
+
+        Returns:
+            list: The lines to write instead of the line.
+        """
+        lines = []
+        if self.column is not None:
+            if line.kind in ("blank", "comment"):
+                self.held.append(line)
+                return []
+            if line.kind in ("object", "property") and line.indent <= self.indent:
+                lines = self.flush()
+            else:
+                lines, self.held = self.held, []
+        if line.kind == "object" and line.keyword == "column" and line.name:
+            self.column = self.hints.get(line.name.lower())
+            self.indent = line.indent
+            self.prefix = line.text[:len(line.text) - len(line.text.lstrip())] + "\t"
+            self.ending = line.text[len(line.text.rstrip("\r\n")):] or "\n"
+            return lines + [line]
+        if self.column is None or line.kind != "property":
+            return lines + [line]
+        if line.indent == self.indent + 1:
+            self.prefix = line.text[:len(line.text) - len(line.text.lstrip())]
+        if line.keyword != "dataType":
+            return lines + [line]
+
+        hint_lines = self.format_hints(line)
+        self.column = None
+        return lines + hint_lines
+
+    def format_hints(self, line=None):
+        """
+        Returns:
+            list: The dataType line (the given one if its type is kept, if any) and the encodingHint
+                  line of the current column.
+        """
+        ending = self.ending if line is None else line.text[len(line.text.rstrip("\r\n")):] or "\n"
+        lines = [] if line is None else [line]
+        data_type = self.column["dataType"]
+        if data_type:
+            lines = [Line(f"{self.prefix}dataType: {data_type}{ending}", self.indent + 1, "property", "dataType",
+                          value=data_type)]
+        hint = self.column["encodingHint"]
+        if hint:
+            lines.append(Line(f"{self.prefix}encodingHint: {hint}{ending}", self.indent + 1, "property",
+                              "encodingHint", value=hint))
+        return lines
+
+    def flush(self):
+        """
+        Returns:
+            list: The hints of the column being read if it had no dataType line, and the lines
+                  held after it, at the end of its block or of the header.
+        """
+        lines = self.format_hints() if self.column is not None else []
+        lines, self.held = lines + self.held, []
+        self.column = None
+        return lines
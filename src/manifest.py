@@ -0,0 +1,216 @@
+# Requires Python 3.8 or later
+import os
+import json
+import glob
+import hashlib
+
+from config import get_config_fingerprint
+from metrics import log, ERROR, INFO
+
+# Version of the conversion rules. Bump it whenever the transforms change the
+# generated output, so that every semantic model is converted again.
+CONVERTER_VERSION = "1.0.0"
+
+# Name of the manifest file persisted in the output folder
+MANIFEST_FILE_NAME = ".conversion_manifest.json"
+
+# Size of the blocks read while hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_converter_fingerprint(config=None):
+    """
+    Builds a fingerprint of the converter from CONVERTER_VERSION, the content
+    of the Python sources in this folder and the configuration, so that editing
+    a transform or the configuration also invalidates the previous results even
+    if the version was not bumped.
+
+    Parameters:
+        config (dict, optional): The configuration of the run (see config.py).
+
+    Returns:
+        str: The hexadecimal fingerprint of the converter.
+    """
+    digest = hashlib.sha256(CONVERTER_VERSION.encode("utf-8"))
+    digest.update(get_config_fingerprint(config).encode("utf-8"))
+    source_folder = os.path.dirname(os.path.abspath(__file__))
+    for source_file in sorted(glob.glob(os.path.join(source_folder, "*.py"))):
+        digest.update(os.path.basename(source_file).encode("utf-8"))
+        digest.update(hash_file(source_file).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hash_file(file_path):
+    """
+    Calculates the SHA-256 hash of a file, reading it in blocks.
+
+    Parameters:
+        file_path (str): Path of the file to hash.
+
+    Returns:
+        str: The hexadecimal digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_directory(directory):
+    """
+    Calculates the hash of every file inside a directory (recursively).
+
+    Parameters:
+        directory (str): Directory to hash.
+
+    Returns:
+        dict: Mapping of the relative file path (with '/' separators) to its hash.
+    """
+    hashes = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            file_path = os.path.join(root, name)
+            relative_path = os.path.relpath(file_path, directory).replace(os.sep, "/")
+            hashes[relative_path] = hash_file(file_path)
+    return hashes
+
+
+def hash_files(directory, files, previous=None):
+    """
+    Calculates the hash of the listed files of a directory. The hashes recorded by the
+    previous run are reused for the files whose size and modification time did not change
+    (see record_model()), so unchanged files are not read again.
+
+    Parameters:
+        directory (str): The directory.
+        files (dict): The FileInfo of the files by relative path (see catalog.scan_files()).
+        previous (dict, optional): The manifest entry of the directory recorded by the previous run.
+
+    Returns:
+        dict: Mapping of the relative file path (with '/' separators) to its hash.
+    """
+    previous_hashes = (previous or {}).get("files", {})
+    previous_stats = (previous or {}).get("stats", {})
+    hashes = {}
+    for relative_path, info in files.items():
+        digest = previous_hashes.get(relative_path)
+        if digest is None or previous_stats.get(relative_path) != [info.size, info.mtime_ns]:
+            digest = hash_file(os.path.join(directory, *relative_path.split("/")))
+        hashes[relative_path] = digest
+    return hashes
+
+
+def new_manifest(config=None):
+    """
+    Creates an empty manifest for the current converter.
+
+    Parameters:
+        config (dict, optional): The configuration of the run (see config.py).
+
+    Returns:
+        dict: The empty manifest.
+    """
+    return {
+        "converter_version": CONVERTER_VERSION,
+        "converter_fingerprint": get_converter_fingerprint(config),
+        "models": {}
+    }
+
+
+def load_manifest(output_path, config=None):
+    """
+    Loads the manifest persisted by the previous run from the output folder.
+
+    If the file does not exist, cannot be read or was written by another version
+    of the converter, an empty manifest is returned and every model is converted.
+
+    Parameters:
+        output_path (str): The output folder containing the manifest file.
+        config (dict, optional): The configuration of the run (see config.py).
+
+    Returns:
+        dict: The loaded manifest.
+    """
+    manifest_file = os.path.join(output_path, MANIFEST_FILE_NAME)
+    manifest = new_manifest(config)
+
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return manifest
+    except (IOError, ValueError) as e:
+        log(f"Error reading the manifest {manifest_file}: {e}", ERROR)
+        return manifest
+
+    if data.get("converter_fingerprint") != manifest["converter_fingerprint"]:
+        log("The converter or its configuration has changed since the last run. Converting all semantic models.", INFO)
+        return manifest
+
+    manifest["models"] = data.get("models", {})
+    return manifest
+
+
+def save_manifest(output_path, manifest):
+    """
+    Saves the manifest into the output folder. The file is written to a temporary
+    file first and then renamed, so an interrupted run never leaves a broken manifest.
+
+    Parameters:
+        output_path (str): The output folder.
+        manifest (dict): The manifest to save.
+    """
+    manifest_file = os.path.join(output_path, MANIFEST_FILE_NAME)
+    temp_file = manifest_file + ".tmp"
+    try:
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_file, manifest_file)
+    except IOError as e:
+        log(f"Error writing the manifest {manifest_file}: {e}", ERROR)
+
+
+def compare_file_hashes(previous_files, current_files):
+    """
+    Compares the file hashes of two runs.
+
+    Parameters:
+        previous_files (dict): Hashes recorded by the previous run.
+        current_files (dict): Hashes of the current input.
+
+    Returns:
+        tuple: (changed, removed) sorted lists of relative paths. New files are reported as changed.
+    """
+    changed = sorted(path for path, digest in current_files.items() if previous_files.get(path) != digest)
+    removed = sorted(path for path in previous_files if path not in current_files)
+    return changed, removed
+
+
+def record_model(manifest, model_name, files, failed_files=(), expressions=None, stats=None):
+    """
+    Records the input hashes of a converted semantic model in the manifest.
+    Files that failed to convert are left out, so they are retried on the next run.
+
+    Parameters:
+        manifest (dict): The manifest to update.
+        model_name (str): Relative path of the semantic model inside the input folder.
+        files (dict): Hashes of the model files.
+        failed_files (iterable): Relative paths of the files that failed to convert.
+        expressions (dict, optional): The model expressions used by each table, by relative path,
+                                      needed to write the expressions.tmdl when only some tables change.
+        stats (dict, optional): The FileInfo of the model files (see catalog.scan_files()), recorded to
+                                reuse the hashes of the files that keep their size and modification time.
+    """
+    failed = set(failed_files)
+    manifest["models"][model_name] = {
+        "files": {path: digest for path, digest in files.items() if path not in failed}
+    }
+    if stats:
+        manifest["models"][model_name]["stats"] = {
+            path: [info.size, info.mtime_ns] for path, info in stats.items()
+            if path in manifest["models"][model_name]["files"]
+        }
+    used = {path: names for path, names in (expressions or {}).items() if names and path not in failed}
+    if used:
+        manifest["models"][model_name]["expressions"] = used
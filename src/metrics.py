@@ -0,0 +1,229 @@
+# Requires Python 3.8 or later
+import sys
+import json
+import time
+import pstats
+import threading
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+# Verbosity levels of the messages
+ERROR = 0  # Errors, always shown
+INFO = 1   # Warnings and the summary of the run (default)
+DEBUG = 2  # One or more lines per model and per file
+
+# Counters of a run, in the order they are reported
+COUNTERS = (
+    "files_read",
+    "files_written",
+    "files_unchanged",
+    "files_linked",
+    "files_skipped",
+    "files_failed",
+    "bytes_in",
+    "bytes_out"
+)
+
+
+class RunMetrics:
+    """
+    Collects the metrics of a conversion run: the duration (and optionally the peak
+    memory) of each stage, and counters of the files and bytes read and written.
+    It also filters the messages of the converter by verbosity level.
+    """
+
+    def __init__(self, verbosity=INFO, trace_memory=False, profile_path=None):
+        """
+        Parameters:
+            verbosity (int, optional): ERROR, INFO or DEBUG.
+            trace_memory (bool, optional): Record the peak memory of each stage with tracemalloc.
+            profile_path (str, optional): Profile the stages with cProfile and save the stats to this file.
+        """
+        self.verbosity = verbosity
+        self.trace_memory = trace_memory
+        self.profile_path = profile_path
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # The counters are also incremented by the I/O threads of the async backend (see async_io.py)
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.started = time.time()
+        self.profiler = cProfile.Profile() if profile_path else None
+
+    def log(self, message, level=DEBUG):
+        """
+        Prints a message if the verbosity allows it. Errors go to the standard error.
+
+        Parameters:
+            message (str): The message.
+            level (int, optional): ERROR, INFO or DEBUG.
+        """
+        if level <= self.verbosity:
+            print(message, file=sys.stderr if level == ERROR else sys.stdout)
+
+    def count(self, name, value=1):
+        """
+        Increments a counter.
+
+        Parameters:
+            name (str): Name of the counter (see COUNTERS).
+            value (int, optional): The increment.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, counters):
+        """
+        Adds the counters collected elsewhere (e.g. by a worker process).
+
+        Parameters:
+            counters (dict): The counters to add.
+        """
+        for name, value in counters.items():
+            self.count(name, value)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures a stage of the run:
+
+            with metrics.stage("convert_models"):
+                ...
+
+        Parameters:
+            name (str): Name of the stage.
+        """
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        if self.profiler is not None:
+            self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = {"seconds": time.perf_counter() - start}
+            if self.profiler is not None:
+                self.profiler.disable()
+            if self.trace_memory:
+                stage["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            self.stages[name] = stage
+
+    def stage_seconds(self):
+        """
+        Returns:
+            dict: The duration in seconds of each stage, in the order they ran.
+        """
+        return {name: stage["seconds"] for name, stage in self.stages.items()}
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The machine-readable report of the run.
+        """
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "seconds": sum(stage["seconds"] for stage in self.stages.values()),
+            "stages": self.stages,
+            "counters": self.counters
+        }
+
+    def summary(self):
+        """
+        Returns:
+            str: A single line summarizing the run.
+        """
+        counters = self.counters
+        seconds = sum(stage["seconds"] for stage in self.stages.values())
+        return (
+            f"Done in {seconds:.2f}s: {counters['files_read']} read, {counters['files_written']} written, "
+            f"{counters['files_unchanged']} unchanged, {counters['files_linked']} linked, {counters['files_skipped']} skipped, "
+            f"{counters['files_failed']} failed, {format_bytes(counters['bytes_in'])} in, "
+            f"{format_bytes(counters['bytes_out'])} out."
+        )
+
+    def write_report(self, report_path):
+        """
+        Writes the JSON report of the run, and the cProfile stats if profiling.
+
+        Parameters:
+            report_path (str): Path of the JSON report.
+        """
+        try:
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=2)
+        except IOError as e:
+            self.log(f"Error writing the run report {report_path}: {e}", ERROR)
+
+        if self.profiler is not None:
+            pstats.Stats(self.profiler).dump_stats(self.profile_path)
+
+
+def format_bytes(value):
+    """
+    Formats a number of bytes for humans, e.g. 1536 -> '1.5 KB'.
+
+    Parameters:
+        value (int): The number of bytes.
+
+    Returns:
+        str: The formatted value.
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+# The metrics of the current run, used by the functions of the converter
+current_metrics = RunMetrics()
+
+
+def get_metrics():
+    """
+    Returns:
+        RunMetrics: The metrics of the current run.
+    """
+    return current_metrics
+
+
+def set_metrics(metrics):
+    """
+    Replaces the metrics of the current run.
+
+    Parameters:
+        metrics (RunMetrics): The new metrics.
+
+    Returns:
+        RunMetrics: The previous metrics.
+    """
+    global current_metrics
+    previous = current_metrics
+    current_metrics = metrics
+    return previous
+
+
+def init_worker(verbosity):
+    """
+    Initializes the metrics of a worker process with the verbosity of the main process.
+
+    Parameters:
+        verbosity (int): ERROR, INFO or DEBUG.
+    """
+    set_metrics(RunMetrics(verbosity))
+
+
+def log(message, level=DEBUG):
+    """
+    Prints a message with the metrics of the current run (see RunMetrics.log()).
+    """
+    current_metrics.log(message, level)
+
+
+def count(name, value=1):
+    """
+    Increments a counter of the current run (see RunMetrics.count()).
+    """
+    current_metrics.count(name, value)
@@ -0,0 +1,173 @@
+# Requires Python 3.8 or later
+"""
+Dry run of the conversion (--plan).
+
+Every semantic model of the input is converted in memory, with the same transforms as a
+run, into a PlannedFileSystem that only records what would be written and removed. The
+reports are rendered from the template the same way. The planned files are then compared
+with the current output, and nothing is written to disk:
+
+    changes = plan_run("input_as", "output_pbip", "src/Default.Report")
+    sys.stdout.writelines(format_plan(changes))
+    print(summarize_plan(changes))
+"""
+import os
+import difflib
+
+from utils import find_semantic_models, convert_semantic_model_files, load_report_template, render_report_files
+from filesystem import LocalFileSystem, MemoryFileSystem, encode_text
+from manifest import load_manifest
+from catalog import get_report_path
+from metrics import log, count, ERROR, DEBUG
+
+# Order of the actions in the summary
+ACTIONS = ("add", "change", "remove")
+
+
+class PlannedFileSystem(MemoryFileSystem):
+    """
+    The files a run would write into an output folder, kept in memory, and the files it would
+    remove from it. Text is encoded as write_text_file() would write it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.removed = set()
+
+    def write_text(self, relative_path, content):
+        self.write_bytes(relative_path, encode_text(content))
+
+    def write_bytes(self, relative_path, content):
+        self.files[relative_path] = bytes(content)
+        self.removed.discard(relative_path)
+
+    def remove(self, relative_path):
+        self.files.pop(relative_path, None)
+        self.removed.add(relative_path)
+
+
+def compare_files(changes, prefix, current, planned, removed=()):
+    """
+    Compares the planned files of a folder with its current files on disk.
+
+    Parameters:
+        changes (list): Receives the changes (see plan_run()).
+        prefix (str): Path of the folder relative to the output, with '/' separators.
+        current (LocalFileSystem): The current files of the folder.
+        planned (dict): The planned content (bytes) of the files, by relative path.
+        removed (Iterable, optional): Relative paths of the files that would be removed.
+    """
+    for relative_path in sorted(planned):
+        before = current.read_bytes(relative_path) if current.exists(relative_path) else None
+        if before == planned[relative_path]:
+            count("files_unchanged")
+            continue
+        changes.append({
+            "path": f"{prefix}/{relative_path}",
+            "action": "add" if before is None else "change",
+            "before": before,
+            "after": planned[relative_path]
+        })
+    for relative_path in sorted(removed):
+        if relative_path not in planned and current.exists(relative_path):
+            changes.append({
+                "path": f"{prefix}/{relative_path}",
+                "action": "remove",
+                "before": current.read_bytes(relative_path),
+                "after": None
+            })
+
+
+def plan_run(input_path, output_path, default_report_path, config=None):
+    """
+    Computes the changes a run would make to the output, without writing anything.
+    Every model is converted again, as with --full, but the files removed from the input
+    since the previous run are removed from the output, as in an incremental run.
+
+    Parameters:
+        input_path (str): Folder with the Analysis Services semantic models.
+        output_path (str): Folder with the current PBIP projects.
+        default_report_path (str): The 'Default.Report' folder used as template for the reports.
+        config (dict, optional): The configuration of the conversion (see config.py).
+
+    Returns:
+        list: The changes, as dicts with the keys path (relative to the output, with '/' separators),
+              action ("add", "change" or "remove"), before and after (the bytes of the file, or None).
+    """
+    changes = []
+    # The files of the models recorded by the previous run, to find the ones removed from the input since
+    manifest = load_manifest(output_path, config)
+    models = sorted(find_semantic_models(input_path, output_path, None, config), key=lambda m: m["name"])
+
+    for model in models:
+        log(f"Planning semantic model: {model['source']}", DEBUG)
+        source = LocalFileSystem(model["source"], files=model["catalog"])
+        dest = PlannedFileSystem()
+        errors = convert_semantic_model_files(source, dest, config=config)
+        for relative_path, error in errors.items():
+            log(f"Error converting {model['name']}/{relative_path}: {error}", ERROR)
+            count("files_failed")
+
+        previous = manifest["models"].get(model["name"], {}).get("files", {})
+        removed = dest.removed | {path for path in previous if not source.exists(path)}
+        compare_files(
+            changes, model["name"].replace(os.sep, "/"), LocalFileSystem(model["destination"]), dest.files, removed
+        )
+
+    # The reports of the models of the catalog (see copy_and_rename_reports())
+    template = load_report_template(default_report_path)
+    if template is None:
+        log(f"Default report folder not found at: {default_report_path}", ERROR)
+        models = []
+    for model in models:
+        report_path = get_report_path(output_path, model["name"])
+        current = LocalFileSystem(report_path)
+        planned = dict(template["files"])
+        name = os.path.basename(model["name"])[:-len(".SemanticModel")]
+        for relative_path, content in render_report_files(template, name).items():
+            planned[relative_path] = encode_text(content)
+        removed = current.list_files() if os.path.isdir(current.root) else []
+        compare_files(changes, os.path.relpath(report_path, output_path).replace(os.sep, "/"), current, planned, removed)
+
+    return changes
+
+
+def format_plan(changes):
+    """
+    Formats the changes as a unified diff.
+
+    Parameters:
+        changes (list): The changes returned by plan_run().
+
+    Returns:
+        generator: The lines of the diff, with their line breaks.
+    """
+    for change in changes:
+        path = change["path"]
+        before_name = "/dev/null" if change["before"] is None else f"a/{path}"
+        after_name = "/dev/null" if change["after"] is None else f"b/{path}"
+        try:
+            before = (change["before"] or b"").decode("utf-8").splitlines(keepends=True)
+            after = (change["after"] or b"").decode("utf-8").splitlines(keepends=True)
+        except UnicodeDecodeError:
+            yield f"Binary files {before_name} and {after_name} differ\n"
+            continue
+        if not before and not after:
+            # An empty file added or removed
+            yield f"--- {before_name}\n+++ {after_name}\n"
+            continue
+        for line in difflib.unified_diff(before, after, before_name, after_name):
+            yield line if line.endswith("\n") else line + "\n\\ No newline at end of file\n"
+
+
+def summarize_plan(changes):
+    """
+    Returns:
+        str: A single line with the number of files to add, change and remove.
+    """
+    counts = dict.fromkeys(ACTIONS, 0)
+    for change in changes:
+        counts[change["action"]] += 1
+    if not changes:
+        return "Plan: no changes, the output is up to date."
+    return f"Plan: {counts['add']} to add, {counts['change']} to change, {counts['remove']} to remove."
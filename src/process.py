@@ -1,4 +1,15 @@
+import sys
+import argparse
+
 from utils import *
+from config import load_config, ConfigError
+from manifest import load_manifest, new_manifest, save_manifest, record_model
+from metrics import RunMetrics, set_metrics
+from archives import is_archive, convert_archive
+from validate import validate_output, write_validation_report
+from plan import plan_run, format_plan, summarize_plan
+from shards import parse_shard, merge_shards, write_merged_report, ShardError
+from async_io import convert_all_semantic_models_async, copy_and_rename_reports_async, DEFAULT_IN_FLIGHT
 
 
 # Constants for input and output paths
@@ -6,27 +17,258 @@ from utils import *
 input_path = "input_as"
 output_path = "output_pbip"
 default_report_path = "src/Default.Report"
+report_file_name = ".conversion_report.json"
+validation_report_file_name = ".validation_report.json"
+
+
+def report_failures(failures, metrics):
+    """
+    Reports the tables that could not be converted.
+
+    Parameters:
+        failures (dict): For each model name, the error message of each table that could not be transformed.
+        metrics (RunMetrics): The metrics of the run.
+    """
+    for name, errors in failures.items():
+        for relative_path, error in errors.items():
+            metrics.log(f"Error converting {name}/{relative_path}: {error}", ERROR)
+            metrics.count("files_failed")
+
+
+def run_validation(output_path, validation_report, metrics):
+    """
+    Validates the whole output, not only the models converted by the run (see validate.py).
+
+    Parameters:
+        output_path (str): Folder (or zip/tar archive) where the PBIP projects are written.
+        validation_report (str): File to write the JSON report of the validation to, None to skip it.
+        metrics (RunMetrics): The metrics of the run.
+    """
+    if validation_report is None:
+        return
+    with metrics.stage("validate"):
+        write_validation_report(validate_output(output_path), validation_report)
+
+
+def run(input_path, output_path, default_report_path, full=False, jobs=1, metrics=None, link=False, config=None,
+        validation_report=None, io="sync", in_flight=DEFAULT_IN_FLIGHT, shard=None):
+    """
+    Runs every stage of the conversion of the semantic models in input_path
+    into Power BI projects in output_path.
+
+    Parameters:
+        input_path (str): Folder (or zip/tar archive) with the Analysis Services semantic models.
+        output_path (str): Folder (or zip/tar archive) where the PBIP projects are written.
+        default_report_path (str): The 'Default.Report' folder used as template for the reports.
+        full (bool, optional): Ignore the conversion manifest and convert every model.
+                               Archives are always converted completely.
+        jobs (int, optional): Number of worker processes converting the tables (synchronous I/O only).
+        metrics (RunMetrics, optional): Collects the metrics of the run. Defaults to a new RunMetrics.
+        link (bool, optional): Hard-link the input files that need no conversion instead of copying them.
+        config (dict, optional): The configuration of the conversion (see config.py).
+        validation_report (str, optional): Validate the output once converted (see validate.py) and
+                                           write the JSON report of the validation to this file.
+        io (str, optional): "sync" reads and writes the files one at a time, "async" overlaps the reads
+                            and writes of many files (see async_io.py), for network file systems.
+        in_flight (int, optional): With async I/O, the maximum number of file operations running at once.
+        shard (tuple, optional): (index, count) to convert only the models of one shard of the run
+                                 (see shards.py). The manifest then only records them.
+
+    Returns:
+        RunMetrics: The duration of each stage and the counters of the run.
+    """
+    metrics = metrics or RunMetrics()
+    previous_metrics = set_metrics(metrics)
+    try:
+        if is_archive(input_path) or is_archive(output_path):
+            # Archives are streamed through the transforms in a single stage
+            with metrics.stage("convert_archive"):
+                failures = convert_archive(input_path, output_path, default_report_path, config)
+                report_failures(failures, metrics)
+                if not is_archive(output_path):
+                    # The models written into the output folder no longer match the manifest
+                    manifest = load_manifest(output_path, config)
+                    for name in failures:
+                        manifest["models"].pop(name.replace("/", os.sep), None)
+                    save_manifest(output_path, manifest)
+            run_validation(output_path, validation_report, metrics)
+            return metrics
+
+        with metrics.stage("discover"):
+            # Ensure the output path exists
+            if not os.path.exists(output_path):
+                os.makedirs(output_path)
+
+            # Load the manifest of the previous run, used to skip unchanged models and tables
+            manifest = new_manifest(config) if full else load_manifest(output_path, config)
+
+            # Find the semantic model directories in input_path in a single walk, cataloging
+            # their files (only the models and files that changed since the previous run are converted)
+            catalog = []
+            models = find_semantic_models(input_path, output_path, manifest, config, shard, catalog)
+            model_names = [entry["name"] for entry in catalog]
+
+        with metrics.stage("convert_models"):
+            # Convert the semantic models straight from input_path into output_path
+            # by updating the database.tmdl, dropping datasources.tmdl,
+            # cleaning the model.tmdl, and transforming the table files,
+            # reading each input file once and writing only the final output
+            if io == "async":
+                failures = convert_all_semantic_models_async(models, link, config, in_flight)
+            else:
+                failures = convert_all_semantic_models(models, jobs, link, config)
+
+            # Report the tables that could not be converted
+            report_failures(failures, metrics)
+
+        with metrics.stage("render_reports"):
+            # Render the reports
+            # Render the Default.Report folder for each semantic model of the catalog,
+            # named after the semantic model, with the definition.pbir and .platform
+            # files pointing to it (reports already up to date are left alone)
+            if io == "async":
+                copy_and_rename_reports_async(output_path, default_report_path, in_flight, model_names)
+            else:
+                copy_and_rename_reports(output_path, default_report_path, model_names)
+
+        with metrics.stage("save_manifest"):
+            # Record the converted models, so the next run can skip them
+            for model in models:
+                record_model(
+                    manifest, model["name"], model["files"], failures.get(model["name"], []), model["expressions"],
+                    model["catalog"]
+                )
+            if shard is not None:
+                # Marks the output as a shard, to be merged with the others (see merge_shards())
+                manifest["shard"] = list(shard)
+            save_manifest(output_path, manifest)
+
+        run_validation(output_path, validation_report, metrics)
+    finally:
+        set_metrics(previous_metrics)
+
+    return metrics
+
 
 if __name__ == "__main__":
-    # Ensure the output path exists
-    if not os.path.exists(output_path):
-        os.makedirs(output_path)
-
-    # Process the semantic model directories and reports
-    # Copy the semantic model directories from input_path to output_path
-    copy_semanticmodel_directories(input_path, output_path)
-    
-    # Copy and rename the reports
-    # Copy the Default.Report folder to each semantic model directory
-    # and rename it to match the semantic model name
-    copy_and_rename_reports(output_path, default_report_path)
-    
-    # Update the definition.pbir and .platform files in the reports
-    # with the semantic model name
-    update_definition_and_platform_in_reports(output_path)
-    
-    # Process all semantic model directories
-    # by updating the database.tmdl, deleting datasources.tmdl,
-    # cleaning the model.tmdl, and transforming the table files
-    # in each semantic model directory
-    process_all_semantic_models(output_path)
+    parser = argparse.ArgumentParser(description="Converts Analysis Services semantic models into Power BI projects (PBIP).")
+    parser.add_argument("--input", default=input_path, metavar="PATH",
+                        help=f"folder or zip/tar archive with the semantic models (default: {input_path})")
+    parser.add_argument("--output", default=output_path, metavar="PATH",
+                        help=f"folder or zip/tar archive to write the PBIP projects to (default: {output_path})")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the conversion manifest and convert every semantic model again")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, metavar="N",
+                        help="number of worker processes converting the tables (default: number of CPUs)")
+    parser.add_argument("--link", action="store_true",
+                        help="hard-link the files that need no conversion instead of copying them "
+                             "(faster, but editing them in the output also changes the input)")
+    parser.add_argument("--io", choices=["sync", "async"], default="sync",
+                        help="'async' overlaps the reads and writes of many files, for input and output folders "
+                             "on network file systems (SMB, NFS); the tables are then converted in the main "
+                             "process (default: sync)")
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_IN_FLIGHT, metavar="N",
+                        help=f"with --io async, the maximum number of file operations running at once "
+                             f"(default: {DEFAULT_IN_FLIGHT})")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="convert only the semantic models of the shard I of N (e.g. 1/4), balanced by "
+                             "number of tables, to split a run across several machines")
+    parser.add_argument("--merge", nargs="+", metavar="FOLDER",
+                        help="merge the output folders of all the shards of a run (see --shard) into the output "
+                             "folder, with their manifests and run reports, instead of converting")
+    parser.add_argument("--config", metavar="FILE",
+                        help="JSON file with the options of the conversion, e.g. the incremental refresh rules")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="print a line for every semantic model and file")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="print only the errors")
+    parser.add_argument("--report", metavar="FILE",
+                        help=f"file to write the JSON report of the run to (default: {report_file_name} "
+                             "in the output folder, or next to the output archive)")
+    parser.add_argument("--validate", nargs="?", const="", metavar="FILE",
+                        help="check the references of the converted models and write the JSON report to FILE "
+                             f"(default: {validation_report_file_name} next to the run report); "
+                             "exits with status 1 if there are issues")
+    parser.add_argument("--plan", action="store_true",
+                        help="convert in memory and print the diff of the changes to the output, writing nothing")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record the peak memory of each stage in the report (slower)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="profile the run with cProfile and save the stats to FILE")
+    parser.add_argument("--watch", action="store_true",
+                        help=f"keep running and convert every file saved in {input_path} (Ctrl+C to stop)")
+    parser.add_argument("--poll", action="store_true",
+                        help="with --watch, poll the input folder instead of using inotify")
+    parser.add_argument("--poll-interval", type=float, default=0.5, metavar="SECONDS",
+                        help="seconds between two scans of the input folder when polling (default: 0.5)")
+    args = parser.parse_args()
+
+    input_path, output_path = args.input, args.output
+    if args.report is None:
+        report_folder = os.path.dirname(output_path) if is_archive(output_path) else output_path
+        args.report = os.path.join(report_folder, report_file_name)
+    if args.validate == "":
+        args.validate = os.path.join(os.path.dirname(args.report), validation_report_file_name)
+    if args.shard is not None:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.watch or args.plan or args.merge or is_archive(input_path) or is_archive(output_path):
+            parser.error("--shard needs folders, not archives, and cannot be combined with --watch, --plan or --merge")
+    if args.merge and (args.watch or args.plan or is_archive(output_path)):
+        parser.error("--merge needs an output folder and cannot be combined with --watch or --plan")
+    if args.in_flight < 1:
+        parser.error("--in-flight must be at least 1")
+    if args.watch and (is_archive(input_path) or is_archive(output_path)):
+        parser.error("--watch needs folders, not archives")
+    if args.plan and (args.watch or is_archive(input_path) or is_archive(output_path)):
+        parser.error("--plan needs folders, not archives, and cannot be combined with --watch")
+    try:
+        config = load_config(args.config) if args.config else None
+    except ConfigError as e:
+        parser.error(str(e))
+
+    verbosity = ERROR if args.quiet else (DEBUG if args.verbose else INFO)
+    metrics = RunMetrics(verbosity, args.trace_memory, args.profile)
+    if args.plan:
+        # Nothing is written, not even the run report
+        previous_metrics = set_metrics(metrics)
+        with metrics.stage("plan"):
+            changes = plan_run(input_path, output_path, default_report_path, config)
+        set_metrics(previous_metrics)
+        sys.stdout.writelines(format_plan(changes))
+        print(summarize_plan(changes))
+        sys.exit(1 if metrics.counters["files_failed"] else 0)
+
+    if args.merge:
+        # The shards were converted elsewhere, only their outputs are combined
+        previous_metrics = set_metrics(metrics)
+        try:
+            with metrics.stage("merge"):
+                report = merge_shards(args.merge, output_path, report_file_name, args.link)
+            run_validation(output_path, args.validate, metrics)
+        except ShardError as e:
+            metrics.log(f"Error merging the shards: {e}", ERROR)
+            sys.exit(1)
+        finally:
+            set_metrics(previous_metrics)
+        report["merge"] = metrics.to_dict()
+        write_merged_report(report, args.report)
+        metrics.log(f"Merged {len(args.merge)} shards: " + metrics.summary(), INFO)
+        sys.exit(1 if metrics.counters.get("validation_issues") else 0)
+
+    run(input_path, output_path, default_report_path, args.full, args.jobs, metrics, args.link, config, args.validate,
+        args.io, args.in_flight, args.shard)
+
+    metrics.write_report(args.report)
+    metrics.log(metrics.summary(), INFO)
+    if metrics.counters.get("validation_issues") and not args.watch:
+        sys.exit(1)
+
+    if args.watch:
+        # Keep the output in sync with the input while it is edited
+        from watch import watch
+        previous_metrics = set_metrics(metrics)
+        watch(input_path, output_path, default_report_path, args.poll, args.poll_interval, config)
+        set_metrics(previous_metrics)
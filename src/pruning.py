@@ -0,0 +1,257 @@
+# Requires Python 3.8 or later
+"""
+Pruning of the columns and tables that nothing references.
+
+With a "pruning" section in the configuration (see config.py), the definition files of a
+model are scanned first to build a reference graph: the DAX expressions of the measures,
+calculated columns, calculated tables, calculation items and roles, the columns of the
+relationships, hierarchies, sort-by columns, perspectives and translations. The unreferenced
+columns are then left out of the converted tables (and of the SQL projection of their
+partitions), and the unreferenced tables are left out of the model.
+
+The graph errs on the side of keeping: a column referenced without its table (e.g. [Amount])
+is kept in every table, and a table whose name appears anywhere in an expression is kept.
+By default only hidden columns and tables are pruned, since the reports built on the model
+may use the visible ones.
+"""
+import re
+
+from tmdl import parse_tmdl, unquote_name
+from metrics import log, DEBUG
+
+# A column reference in DAX: 'Table'[Column], Table[Column] or [Column]
+COLUMN_REFERENCE_PATTERN = re.compile(
+    r"(?:'((?:[^']|'')+)'|([A-Za-z_]\w*))?\s*\[((?:[^\]]|\]\])+)\]"
+)
+# Words and quoted names that may be tables
+TABLE_REFERENCE_PATTERN = re.compile(r"'((?:[^']|'')+)'|([A-Za-z_]\w*)")
+
+# Properties of the objects of a table whose value is a column of the same table
+COLUMN_PROPERTIES = ("sortByColumn", "column", "groupByColumn")
+# Properties whose value is a column of any table, as Table.Column
+QUALIFIED_COLUMN_PROPERTIES = ("fromColumn", "toColumn", "baseColumn")
+# Properties that never reference a column or a table
+IGNORED_PROPERTIES = ("sourceColumn", "lineageTag", "sourceLineageTag", "dataType", "formatString",
+                      "summarizeBy", "dataCategory", "description", "displayFolder")
+
+# Objects that name a table, and the objects inside them that name one of its columns
+TABLE_OBJECTS = ("table", "perspectiveTable", "tablePermission")
+COLUMN_OBJECTS = ("column", "perspectiveColumn", "columnPermission")
+
+# Partitions whose source is a DAX expression (the others are queries of the source)
+DAX_PARTITION_TYPES = ("calculated", "entity")
+
+
+def get_pruning_scope(config):
+    """
+    Returns:
+        str or None: The scope of the "pruning" section of the configuration, None without it.
+    """
+    return ((config or {}).get("pruning") or {}).get("scope")
+
+
+def split_qualified_name(value):
+    """
+    Splits a 'Table'.'Column' (or Table.Column) reference of a relationship.
+
+    Returns:
+        tuple: (table, column) unquoted, column None if there is no dot outside the quotes.
+    """
+    value = value.strip()
+    quoted = False
+    for index, char in enumerate(value):
+        if char == "'":
+            quoted = not quoted
+        elif char == "." and not quoted:
+            return unquote_name(value[:index]), unquote_name(value[index + 1:])
+    return unquote_name(value), None
+
+
+class ReferenceGraph:
+    """
+    The columns and tables of a model and what references them, built one file at a time
+    with add_file(), so the files do not need to be held in memory together.
+    """
+
+    def __init__(self):
+        # The declared tables by lower case name: dict with the keys name, path, hidden, keep and columns
+        # (the declared columns by lower case name: dict with the keys name and hidden)
+        self.tables = {}
+        # Referenced columns as (lower case table, lower case column)
+        self.columns = set()
+        # Column names referenced without their table, lower case
+        self.names = set()
+        # Words and quoted names found in expressions, lower case (they may be tables)
+        self.words = set()
+
+    def add_expression(self, text):
+        """
+        Records the references of a DAX expression.
+        """
+        if not text:
+            return
+        for quoted, bare, column in COLUMN_REFERENCE_PATTERN.findall(text):
+            column = column.replace("]]", "]").lower()
+            table = quoted.replace("''", "'") if quoted else bare
+            if table:
+                self.columns.add((table.lower(), column))
+            else:
+                self.names.add(column)
+        for quoted, bare in TABLE_REFERENCE_PATTERN.findall(text):
+            self.words.add((quoted.replace("''", "'") if quoted else bare).lower())
+
+    def add_file(self, relative_path, content):
+        """
+        Records the objects and references of a definition file of the model.
+
+        Parameters:
+            relative_path (str): Path relative to the semantic model directory.
+            content (str): Content of the file.
+        """
+        lower_path = relative_path.lower()
+        if not lower_path.endswith(".tmdl") or lower_path in ("definition/model.tmdl", "definition/database.tmdl",
+                                                              "definition/datasources.tmdl",
+                                                              "definition/expressions.tmdl"):
+            return
+        document = parse_tmdl(content)
+        table_file = lower_path.startswith("definition/tables/")
+
+        for node in document.iter_nodes():
+            keyword = node.keyword
+            table = node
+            while table is not None and table.keyword not in TABLE_OBJECTS:
+                table = table.parent
+            table_name = table.name.lower() if table is not None and table.name else None
+
+            if keyword == "table" and table_file and node.name:
+                self.tables[table_name] = {
+                    "name": node.name,
+                    "path": relative_path,
+                    "hidden": "isHidden" in node.properties,
+                    # Tables whose content is not a plain import of the source are kept
+                    "keep": False,
+                    "columns": {}
+                }
+            elif keyword in TABLE_OBJECTS and node.name:
+                self.words.add(table_name)
+
+            if table_file and table_name in self.tables:
+                declared = self.tables[table_name]
+                if keyword in ("measure", "calculationGroup") or (
+                        keyword == "partition" and (node.value or "").lower() in DAX_PARTITION_TYPES):
+                    declared["keep"] = True
+                if keyword == "column" and node.name and node.parent is table:
+                    declared["columns"][node.name.lower()] = {
+                        "name": node.name,
+                        "hidden": "isHidden" in node.properties
+                    }
+
+            if keyword in COLUMN_OBJECTS and node.name and table_name:
+                if not (table_file and keyword == "column" and node.parent is table):
+                    self.columns.add((table_name, node.name.lower()))
+
+            if keyword == "partition" and (node.value or "").lower() not in DAX_PARTITION_TYPES:
+                # The query of the source is not DAX
+                continue
+            if keyword != "annotation":
+                self.add_expression(node.value)
+            for key, value in node.properties.items():
+                if key in QUALIFIED_COLUMN_PROPERTIES:
+                    related_table, column = split_qualified_name(value)
+                    self.words.add(related_table.lower())
+                    if column:
+                        self.columns.add((related_table.lower(), column.lower()))
+                elif key in COLUMN_PROPERTIES and table_name:
+                    self.columns.add((table_name, unquote_name(value).lower()))
+                    self.add_expression(value)
+                elif key not in IGNORED_PROPERTIES:
+                    self.add_expression(value)
+
+    def is_column_used(self, table_name, column_name):
+        """
+        Returns:
+            bool: True if something may reference the column of the table.
+        """
+        table_name, column_name = table_name.lower(), column_name.lower()
+        return (table_name, column_name) in self.columns or column_name in self.names
+
+    def plan(self, scope="hidden"):
+        """
+        Chooses the tables and columns to prune.
+
+        Parameters:
+            scope (str): "hidden" prunes only hidden columns and tables, "all" any of them.
+
+        Returns:
+            tuple: (tables, columns) where tables maps the relative path of each table to leave
+                   out to its name, and columns maps the relative path of a table to the set of the
+                   lower case names of its columns to leave out.
+        """
+        tables = {}
+        columns = {}
+        for table_name, table in self.tables.items():
+            unused = [
+                key for key, column in table["columns"].items()
+                if (scope == "all" or column["hidden"] or table["hidden"])
+                and not self.is_column_used(table_name, column["name"])
+            ]
+            if (not table["keep"] and table_name not in self.words and len(unused) == len(table["columns"])
+                    and (scope == "all" or table["hidden"])):
+                log(f"Pruning unused table: {table['path']}", DEBUG)
+                tables[table["path"]] = table["name"]
+            elif unused and len(unused) < len(table["columns"]):
+                # A table keeps at least one column
+                log(f"Pruning {len(unused)} unused column(s) of {table['path']}", DEBUG)
+                columns[table["path"]] = set(unused)
+        return tables, columns
+
+
+class ColumnPruner:
+    """
+    Leaves the lines of some columns out of a table file, line by line: the declaration of
+    each column, its properties and children, and the /// description just before it.
+    """
+
+    def __init__(self, columns):
+        """
+        Parameters:
+            columns (set): The lower case names of the columns to leave out.
+        """
+        self.columns = columns
+        # The indentation of the column being left out, None outside of it
+        self.indent = None
+        # The description lines held until the next object shows whether they are left out
+        self.held = []
+
+    def feed(self, line):
+        """
+        Decides what to do with the next line.
+
+        Parameters:
+            line (Line): The classified line (whole, for a description).
+
+        Returns:
+            tuple: (released, keep) where released are the held lines to write before this
+                   one, and keep tells whether this line is written.
+        """
+        if self.indent is not None:
+            if line.kind in ("blank", "expression") or line.indent > self.indent:
+                return [], False
+            self.indent = None
+        if line.kind == "comment":
+            self.held.append(line)
+            return [], False
+        if line.kind == "object" and line.keyword == "column" and line.name and line.name.lower() in self.columns:
+            self.held = []
+            self.indent = line.indent
+            return [], False
+        released, self.held = self.held, []
+        return released, True
+
+    def flush(self):
+        """
+        Returns:
+            list: The lines still held, at the end of the header.
+        """
+        released, self.held = self.held, []
+        return released
@@ -0,0 +1,137 @@
+# Requires Python 3.8 or later
+"""
+Incremental refresh of the converted tables.
+
+The tables matched by a rule of the "incrementalRefresh" section of the configuration
+(see config.py) get a partition query filtered on a date column by the RangeStart and
+RangeEnd parameters, and a refreshPolicy block, so that Power BI refreshes only the
+most recent periods instead of reloading the whole table.
+"""
+from datetime import datetime
+
+from config import match_table
+from metrics import log, DEBUG
+
+# Names of the parameters that Power BI fills in for each refreshed partition
+RANGE_START = "RangeStart"
+RANGE_END = "RangeEnd"
+
+# Format of the range parameters in the SQL query
+SQL_DATETIME_FORMAT = "yyyy-MM-dd HH:mm:ss"
+
+
+def find_refresh_policy(config, table_name, columns, file_path=""):
+    """
+    Finds the first rule of the configuration that applies to a table.
+
+    A rule applies when the table name matches one of its 'tables' patterns (case-insensitive,
+    '*' and '?' wildcards) if it has some, and the table has its 'dateColumn' (matched by
+    name or sourceColumn) if it has one. Without 'dateColumn', the first dateTime column
+    of the table is used.
+
+    Parameters:
+        config (dict): The configuration (see config.py), or None.
+        table_name (str): The name of the table declaration.
+        columns (list): The columns of the table, as dicts with the keys name, sourceColumn and dataType.
+        file_path (str, optional): Path of the table file, used in the messages.
+
+    Returns:
+        dict or None: The policy of the rule with the key 'column' set to the sourceColumn
+                      to filter on, or None if no rule applies.
+    """
+    rules = ((config or {}).get("incrementalRefresh") or {}).get("rules")
+    if not rules or not table_name:
+        return None
+
+    # Only the columns loaded from the source can be filtered in the query
+    columns = [column for column in columns if column.get("sourceColumn")]
+    for rule in rules:
+        patterns = rule.get("tables")
+        if patterns and not match_table(patterns, table_name):
+            continue
+        if "dateColumn" in rule:
+            wanted = rule["dateColumn"].lower()
+            column = next(
+                (c for c in columns if wanted in (c["name"].lower(), c["sourceColumn"].lower())), None
+            )
+        else:
+            column = next((c for c in columns if (c.get("dataType") or "").lower() == "datetime"), None)
+        if column is None:
+            log(f"No date column for the incremental refresh of '{table_name}' in '{file_path}'", DEBUG)
+            continue
+
+        policy = {key: value for key, value in rule.items() if key not in ("tables", "dateColumn")}
+        policy["column"] = column["sourceColumn"]
+        return policy
+    return None
+
+
+def format_datetime_literal(value):
+    """
+    Returns:
+        str: The M literal of a date or date and time in ISO format, e.g. #datetime(2020, 1, 1, 0, 0, 0).
+    """
+    moment = datetime.fromisoformat(value)
+    return (f"#datetime({moment.year}, {moment.month}, {moment.day}, "
+            f"{moment.hour}, {moment.minute}, {moment.second})")
+
+
+def get_range_parameters(config):
+    """
+    Builds the RangeStart and RangeEnd parameters needed by the refresh policies.
+
+    Parameters:
+        config (dict): The configuration, with an "incrementalRefresh" section.
+
+    Returns:
+        dict: The M expression of each parameter, by name.
+    """
+    section = config["incrementalRefresh"]
+    meta = 'meta [IsParameterQuery=true, Type="DateTime", IsParameterQueryRequired=true]'
+    return {
+        RANGE_START: f"{format_datetime_literal(section['rangeStart'])} {meta}",
+        RANGE_END: f"{format_datetime_literal(section['rangeEnd'])} {meta}"
+    }
+
+
+def format_range_filter(source_column):
+    """
+    Formats the WHERE clause appended to a SQL query inside an M string literal, keeping
+    the rows of one refresh range: RangeStart <= column < RangeEnd.
+
+    Parameters:
+        source_column (str): The column to filter on.
+
+    Returns:
+        str: The clause, starting with a space.
+    """
+    start = f'" & DateTime.ToText({RANGE_START}, "{SQL_DATETIME_FORMAT}") & "'
+    end = f'" & DateTime.ToText({RANGE_END}, "{SQL_DATETIME_FORMAT}") & "'
+    return f" WHERE [{source_column}] >= '{start}' AND [{source_column}] < '{end}'"
+
+
+def format_refresh_policy(policy, steps, result):
+    """
+    Formats the refreshPolicy block of a table, indented like the partition blocks.
+
+    Parameters:
+        policy (dict): The policy found by find_refresh_policy().
+        steps (str): The steps of the 'let' expression of the partition.
+        result (str): The step returned by the expression.
+
+    Returns:
+        str: The refreshPolicy block.
+    """
+    return f"""
+    refreshPolicy
+        policyType: basic
+        rollingWindowGranularity: {policy['rollingWindowGranularity']}
+        rollingWindowPeriods: {policy['rollingWindowPeriods']}
+        incrementalGranularity: {policy['incrementalGranularity']}
+        incrementalPeriods: {policy['incrementalPeriods']}
+        sourceExpression =
+            let
+                {steps}
+            in
+                {result}
+    """
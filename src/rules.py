@@ -0,0 +1,267 @@
+# Requires Python 3.8 or later
+"""
+Transform rules applied to the lines of the definition files.
+
+The line-level transforms of the conversion are declared as rules, in the format of the
+"transformRules" section of the configuration (see config.py), which adds rules of its own:
+
+    - keep: in the files of the rule, only the lines with a kept keyword are written
+      (e.g. the filter of model.tmdl).
+    - drop: the lines with the keyword are left out; for an object, with its properties,
+      children and the /// description before it.
+    - rewrite: the value of a property is replaced (all of it, or what "pattern" matches).
+    - replace: an object, with its properties and children, is replaced by the TMDL text "with",
+      indented as the object.
+
+A rule applies to the table files of the tables whose name matches "tables" (only to the lines
+before the partitions, which are replaced by the conversion), or to the other definition files
+whose path matches "files". Its "keyword" is the first word of the lines, and "names" the names of
+the objects it applies to.
+
+The rules of a file are compiled once into a dispatch table keyed by keyword, and a RuleFilter
+applies them as the lines are read, in the same pass as the other transforms of the file.
+"""
+import re
+import json
+
+from tmdl import Line, tokenize_tmdl, render_lines, as_document, OBJECT_KEYWORDS
+from config import validate_transform_rule, match_table
+
+# Keywords of the model.tmdl lines kept by the conversion
+MODEL_ALLOWED_KEYWORDS = [
+    "model",
+    "culture",
+    "defaultPowerBIDataSourceVersion",
+    "discourageImplicitMeasures",
+    "ref"
+]
+
+# The rules of the conversion, applied unless "builtin" is false in the transformRules section
+BUILTIN_RULES = [
+    validate_transform_rule(rule, f"BUILTIN_RULES[{index}]") for index, rule in enumerate([
+        # The compatibility level of the models of Power BI
+        {"files": "definition/database.tmdl", "keyword": "compatibilityLevel", "action": "rewrite",
+         "pattern": "^(1500|1600)$", "replacement": "1605"},
+        {"files": "definition/model.tmdl", "keyword": MODEL_ALLOWED_KEYWORDS, "action": "keep"},
+        {"tables": "*", "keyword": "sourceProviderType", "action": "drop"}
+    ])
+]
+
+# The compiled rules, by transformRules section
+rule_sets = {}
+
+
+def get_rule_set(config):
+    """
+    Returns the compiled rules of a configuration, compiled on the first call only.
+
+    Parameters:
+        config (dict): The configuration (see config.py), or None.
+
+    Returns:
+        RuleSet: The built-in rules followed by the rules of the transformRules section.
+    """
+    section = (config or {}).get("transformRules") or {"builtin": True, "rules": []}
+    key = json.dumps(section, sort_keys=True)
+    rule_set = rule_sets.get(key)
+    if rule_set is None:
+        rule_set = rule_sets[key] = RuleSet((BUILTIN_RULES if section["builtin"] else []) + section["rules"])
+    return rule_set
+
+
+class RuleSet:
+    """
+    Compiled transform rules, with the dispatch table of each combination of rules that
+    applies to a file, built once.
+    """
+
+    def __init__(self, rules):
+        """
+        Parameters:
+            rules (list): The rules, as returned by config.validate_transform_rule().
+        """
+        self.rules = rules
+        self.patterns = [re.compile(rule["pattern"]) if rule["pattern"] else None for rule in rules]
+        # The dispatch tables by the indexes of their rules
+        self.dispatch_tables = {}
+        # The lines of the replace rules by (index, indent)
+        self.replacements = {}
+
+    def for_table(self, table_name):
+        """
+        Returns:
+            RuleFilter or None: The filter of the rules of a table, None if no rule applies to it.
+        """
+        return self.get_filter(tuple(
+            index for index, rule in enumerate(self.rules)
+            if rule["tables"] is not None and match_table(rule["tables"], table_name or "")
+        ))
+
+    def for_file(self, relative_path):
+        """
+        Returns:
+            RuleFilter or None: The filter of the rules of a file that is not a table, None if no rule applies to it.
+        """
+        return self.get_filter(tuple(
+            index for index, rule in enumerate(self.rules)
+            if rule["files"] is not None and match_table(rule["files"], relative_path)
+        ))
+
+    def get_filter(self, indexes):
+        if not indexes:
+            return None
+        table = self.dispatch_tables.get(indexes)
+        if table is None:
+            # keyword -> indexes of the drop, rewrite and replace rules, and keyword -> names kept
+            dispatch = {}
+            keep = None
+            for index in indexes:
+                rule = self.rules[index]
+                for keyword in rule["keywords"]:
+                    if rule["action"] == "keep":
+                        keep = {} if keep is None else keep
+                        names = keep.setdefault(keyword, [])
+                        names.append(rule["names"])
+                    else:
+                        dispatch.setdefault(keyword, []).append(index)
+            table = self.dispatch_tables[indexes] = (dispatch, keep)
+        return RuleFilter(self, *table)
+
+    def get_replacement(self, index, indent):
+        """
+        Returns:
+            list: The classified lines of the block of a replace rule, indented at the given level.
+        """
+        lines = self.replacements.get((index, indent))
+        if lines is None:
+            prefix = "\t" * indent
+            text = "".join(
+                f"{prefix}{line}\n" if line.strip() else "\n" for line in self.rules[index]["with"].splitlines()
+            )
+            lines = self.replacements[(index, indent)] = list(tokenize_tmdl(text.splitlines(keepends=True)))
+        return lines
+
+
+def match_names(names, line):
+    """
+    Returns:
+        bool: True if the rule applies to any name (names is None) or to the name of the object line.
+    """
+    return names is None or (line.kind == "object" and line.name is not None and match_table(names, line.name))
+
+
+class RuleFilter:
+    """
+    Applies the rules of a file line by line (see RuleSet.get_filter()).
+    """
+
+    def __init__(self, rule_set, dispatch, keep):
+        self.rule_set = rule_set
+        self.dispatch = dispatch
+        self.keep = keep
+        # Descriptions are held until the next object only if objects can be left out
+        self.holds_comments = any(
+            keyword in OBJECT_KEYWORDS and rule_set.rules[index]["action"] in ("drop", "replace")
+            for keyword, indexes in dispatch.items() for index in indexes
+        )
+        # The indentation of the object being left out, None outside of one
+        self.indent = None
+        # True while the multi-line expression of a dropped property is read
+        self.in_expression = False
+        self.held = []
+
+    def needs_whole_line(self, line):
+        """
+        Returns:
+            bool: True if feed() needs the whole line rather than its beginning (see streaming.py).
+        """
+        return (line.kind == "comment" and self.holds_comments) or (
+            line.kind == "property" and line.keyword in self.dispatch
+        )
+
+    def feed(self, line):
+        """
+        Parameters:
+            line (Line): The next line (whole, for a description or a property with rules).
+
+        Returns:
+            list: The lines to write instead of the line: the descriptions held before it,
+                  then the line, its rewritten version or the replacement of its block.
+        """
+        if self.indent is not None:
+            if line.kind in ("blank", "expression") or line.indent > self.indent:
+                return []
+            self.indent = None
+        if self.in_expression:
+            if line.kind in ("blank", "expression"):
+                return []
+            self.in_expression = False
+
+        if self.keep is not None and not (
+                line.kind in ("object", "property")
+                and any(match_names(names, line) for names in self.keep.get(line.keyword, ()))):
+            return []
+        if line.kind == "comment" and self.holds_comments:
+            self.held.append(line)
+            return []
+
+        if line.kind in ("object", "property"):
+            for index in self.dispatch.get(line.keyword, ()):
+                rule = self.rule_set.rules[index]
+                if not match_names(rule["names"], line):
+                    continue
+                if rule["action"] == "rewrite":
+                    line = self.rewrite(line, rule, self.rule_set.patterns[index])
+                elif line.kind == "object":
+                    # The block is left out, with its description
+                    self.held = []
+                    self.indent = line.indent
+                    if rule["action"] == "replace":
+                        return self.rule_set.get_replacement(index, line.indent)
+                    return []
+                elif rule["action"] == "drop":
+                    # With its multi-line expression, if it has one
+                    released, self.held = self.held, []
+                    self.in_expression = line.value == "" and line.text.rstrip().endswith("=") or (
+                        line.value or "").startswith("```")
+                    return released
+
+        released, self.held = self.held, []
+        return released + [line]
+
+    def rewrite(self, line, rule, pattern):
+        value = line.value
+        if line.kind != "property" or not value or value.startswith("```"):
+            return line
+        new_value = rule["replacement"] if pattern is None else pattern.sub(rule["replacement"], value)
+        if new_value == value:
+            return line
+        start = line.text.index(value, line.text.index(line.keyword) + len(line.keyword))
+        text = line.text[:start] + new_value + line.text[start + len(value):]
+        return Line(text, line.indent, "property", line.keyword, value=new_value)
+
+    def flush(self):
+        """
+        Returns:
+            list: The lines still held, at the end of the lines.
+        """
+        released, self.held = self.held, []
+        return released
+
+
+def apply_rules(content, rule_filter):
+    """
+    Applies the rules of a file to its content.
+
+    Parameters:
+        content (str or Document): The content of the file, or its parsed document.
+        rule_filter (RuleFilter): The rules of the file.
+
+    Returns:
+        str: The new content.
+    """
+    lines = []
+    for line in as_document(content).lines:
+        lines.extend(rule_filter.feed(line))
+    lines.extend(rule_filter.flush())
+    return render_lines(lines)
@@ -0,0 +1,187 @@
+# Requires Python 3.8 or later
+from functools import cached_property
+
+from tmdl import parse_tmdl, as_document
+from datasources import parse_data_sources
+from filesystem import find_file
+
+MODEL_FILE = "definition/model.tmdl"
+DATABASE_FILE = "definition/database.tmdl"
+DATA_SOURCES_FILE = "definition/dataSources.tmdl"
+
+
+def is_table_file(relative_path):
+    """
+    Checks if a path relative to the semantic model directory is a table definition file.
+
+    Parameters:
+        relative_path (str): Path relative to the semantic model directory, with '/' separators.
+
+    Returns:
+        bool: True for the .tmdl files directly inside 'definition/tables'.
+    """
+    folder, _, name = relative_path.rpartition("/")
+    return folder == "definition/tables" and name.endswith(".tmdl")
+
+
+def is_tabular_editor_content(content):
+    """
+    Checks if the content of a model.tmdl file belongs to a Tabular Editor model.
+
+    Parameters:
+        content (str or Document): Content of the model.tmdl file, or its parsed document.
+
+    Returns:
+        bool: True if the model has the "__TEdtr" annotation.
+    """
+    return any(
+        annotation.name.startswith("__TEdtr")
+        for annotation in as_document(content).iter_nodes("annotation") if annotation.name
+    )
+
+
+class SemanticModel:
+    """
+    The files of one semantic model, shared by every step of its conversion.
+
+    Each definition file is read and parsed at most once, when first needed, and what is
+    detected from them (Tabular Editor flag, compatibility level, data sources, tables) is
+    kept as attributes. The converted files are staged with the writing interface of
+    LocalFileSystem and written to the destination in one batch by flush(). Staged files
+    do not change what is read from the model.
+    """
+
+    def __init__(self, source):
+        """
+        Parameters:
+            source (LocalFileSystem or MemoryFileSystem): The files of the semantic model.
+        """
+        self.source = source
+        # Content of the text files already read, by relative path
+        self.texts = {}
+        # The staged changes by relative path: ("text", str), ("bytes", bytes), ("copy", file system) or ("remove", None)
+        self.changes = {}
+
+    def path(self, relative_path):
+        return self.source.path(relative_path)
+
+    def list_files(self, folder=""):
+        if not folder:
+            return list(self.files)
+        return self.source.list_files(folder)
+
+    def exists(self, relative_path):
+        return relative_path in self.texts or self.source.exists(relative_path)
+
+    def read_text(self, relative_path):
+        """
+        Returns:
+            str: The content of a text file, read from the source on the first call only.
+        """
+        text = self.texts.get(relative_path)
+        if text is None:
+            text = self.texts[relative_path] = self.source.read_text(relative_path)
+        return text
+
+    def read_bytes(self, relative_path):
+        return self.source.read_bytes(relative_path)
+
+    @cached_property
+    def files(self):
+        """
+        The sorted relative paths of all the files of the model.
+        """
+        return self.source.list_files()
+
+    @cached_property
+    def table_files(self):
+        """
+        The sorted relative paths of the table files.
+        """
+        return [relative_path for relative_path in self.files if is_table_file(relative_path)]
+
+    @cached_property
+    def model_document(self):
+        """
+        The parsed model.tmdl (an empty document if the model has none).
+        """
+        return parse_tmdl(self.read_text(MODEL_FILE) if self.exists(MODEL_FILE) else "")
+
+    @cached_property
+    def tabular_editor(self):
+        """
+        True if the model was saved by Tabular Editor (see is_tabular_editor_content()).
+        """
+        return is_tabular_editor_content(self.model_document)
+
+    @cached_property
+    def database_document(self):
+        """
+        The parsed database.tmdl (an empty document if the model has none).
+        """
+        return parse_tmdl(self.read_text(DATABASE_FILE) if self.exists(DATABASE_FILE) else "")
+
+    @cached_property
+    def compatibility_level(self):
+        """
+        The compatibilityLevel of the database (int), or None if it is not declared.
+        """
+        database = self.database_document.find("database")
+        value = database.properties.get("compatibilityLevel") if database is not None else None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @cached_property
+    def data_sources_file(self):
+        """
+        The relative path of the dataSources.tmdl file, whatever its case, or None.
+        """
+        return find_file(self.source, DATA_SOURCES_FILE)
+
+    @cached_property
+    def data_sources(self):
+        """
+        The index of the dataSources.tmdl file (see datasources.py). Empty if the model has
+        no dataSources.tmdl; Tabular Editor models keep their connections in the tables.
+        """
+        if self.tabular_editor or self.data_sources_file is None:
+            return {}
+        return parse_data_sources(self.read_text(self.data_sources_file))
+
+    def write_text(self, relative_path, content):
+        self.changes[relative_path] = ("text", content)
+
+    def write_bytes(self, relative_path, content):
+        self.changes[relative_path] = ("bytes", content)
+
+    def remove(self, relative_path):
+        self.changes[relative_path] = ("remove", None)
+
+    def copy_from(self, source, relative_path):
+        # Copy from the files of the model, so that they can be hard-linked into the destination
+        self.changes[relative_path] = ("copy", source.source if isinstance(source, SemanticModel) else source)
+
+    def flush(self, dest):
+        """
+        Writes the staged changes into the destination, in the order of their paths.
+
+        Parameters:
+            dest (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the output.
+
+        Returns:
+            int: The number of changes written.
+        """
+        changes, self.changes = self.changes, {}
+        for relative_path in sorted(changes):
+            action, value = changes[relative_path]
+            if action == "text":
+                dest.write_text(relative_path, value)
+            elif action == "bytes":
+                dest.write_bytes(relative_path, value)
+            elif action == "copy":
+                dest.copy_from(value, relative_path)
+            else:
+                dest.remove(relative_path)
+        return len(changes)
@@ -0,0 +1,240 @@
+# Requires Python 3.8 or later
+"""
+Sharding of a run across several machines (--shard i/N) and merge of the shards (--merge).
+
+Every shard sees the whole input and assigns the semantic models to the N shards the same way
+(see assign_shards()), so each runner converts only its own models, without coordination:
+
+    python src/process.py --shard 1/4 --output output_pbip    (on each of the 4 runners)
+    python src/process.py --merge shard-1 shard-2 shard-3 shard-4 --output output_pbip
+
+The manifest of a shard only records its own models, and the shard itself. merge_shards()
+checks that the shards are complete and of the same converter, copies the models and reports
+of each shard into the output, and writes the union of their manifests.
+"""
+import os
+import json
+import hashlib
+
+from manifest import MANIFEST_FILE_NAME, save_manifest
+from filesystem import LocalFileSystem
+from catalog import count_table_files, get_report_path
+from metrics import log, ERROR, DEBUG
+
+
+class ShardError(Exception):
+    """
+    Raised when the outputs of the shards cannot be merged.
+    """
+
+
+def parse_shard(text):
+    """
+    Parses a shard given as "i/N", e.g. "2/4" for the second of four shards.
+
+    Parameters:
+        text (str): The shard.
+
+    Returns:
+        tuple: (index, count), with 1 <= index <= count.
+
+    Raises:
+        ValueError: If the shard is not valid.
+    """
+    index, separator, shard_count = text.partition("/")
+    try:
+        index, shard_count = int(index), int(shard_count)
+    except ValueError:
+        index = shard_count = 0
+    if not separator or shard_count < 1 or not 1 <= index <= shard_count:
+        raise ValueError(f"Invalid shard '{text}': expected i/N with 1 <= i <= N, e.g. 1/4")
+    return index, shard_count
+
+
+def get_stable_hash(name):
+    """
+    Returns:
+        int: A hash of a model name that is the same on every machine and Python process
+             (the built-in hash() of strings is randomized).
+    """
+    return int.from_bytes(hashlib.sha256(name.replace(os.sep, "/").encode("utf-8")).digest()[:8], "big")
+
+
+def assign_shards(weights, shard_count):
+    """
+    Assigns the semantic models to the shards, balancing their number of tables: the models
+    are taken from the largest to the smallest (models of the same size in the order of a
+    stable hash of their name), each by the shard with the fewest tables so far.
+
+    The assignment only depends on the names and sizes of the models, so every runner
+    computes the same one.
+
+    Parameters:
+        weights (dict): The weight of each model (its number of tables plus one), by name.
+        shard_count (int): The number of shards.
+
+    Returns:
+        dict: The shard (1 to shard_count) of each model, by name.
+    """
+    loads = [0] * shard_count
+    shards = {}
+    for name in sorted(weights, key=lambda name: (-weights[name], get_stable_hash(name), name)):
+        index = min(range(shard_count), key=lambda i: (loads[i], i))
+        loads[index] += weights[name]
+        shards[name] = index + 1
+    return shards
+
+
+def select_shard(entries, shard):
+    """
+    Keeps the semantic models of a shard.
+
+    Parameters:
+        entries (list): The catalog entries of all the semantic models (see catalog.scan_models()).
+        shard (tuple): (index, count) as returned by parse_shard().
+
+    Returns:
+        list: The entries of the models assigned to the shard, in their original order.
+    """
+    index, shard_count = shard
+    shards = assign_shards({entry["name"]: count_table_files(entry["files"]) + 1 for entry in entries}, shard_count)
+    selected = [entry for entry in entries if shards[entry["name"]] == index]
+    log(f"Shard {index}/{shard_count}: {len(selected)} of {len(entries)} semantic models", DEBUG)
+    return selected
+
+
+def read_json_file(file_path):
+    """
+    Returns:
+        dict or None: The content of a JSON file, None if it does not exist.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (IOError, ValueError) as e:
+        raise ShardError(f"Cannot read {file_path}: {e}") from None
+
+
+def mirror_folder(source_path, dest_path, link=False):
+    """
+    Makes dest_path a copy of source_path: the files are copied (hard-linked on request)
+    unless unchanged, and the files that are not in source_path are removed.
+    """
+    source = LocalFileSystem(source_path)
+    dest = LocalFileSystem(dest_path, link)
+    files = source.list_files()
+    for relative_path in files:
+        dest.copy_from(source, relative_path)
+    if os.path.isdir(dest_path):
+        for relative_path in set(dest.list_files()) - set(files):
+            dest.remove(relative_path)
+
+
+def merge_run_reports(reports):
+    """
+    Combines the run reports of the shards (see RunMetrics.to_dict()). The shards run at the
+    same time, so the duration of the run and of each stage is the one of the slowest shard;
+    the counters are added.
+
+    Parameters:
+        reports (dict): The run report of each shard, by shard ("i/N").
+
+    Returns:
+        dict: The combined report, with the report of each shard under "shards".
+    """
+    merged = {"started": None, "seconds": 0, "stages": {}, "counters": {}, "shards": reports}
+    for report in reports.values():
+        if report.get("started") and (merged["started"] is None or report["started"] < merged["started"]):
+            merged["started"] = report["started"]
+        merged["seconds"] = max(merged["seconds"], report.get("seconds", 0))
+        for name, stage in report.get("stages", {}).items():
+            merged_stage = merged["stages"].setdefault(name, {})
+            for key, value in stage.items():
+                merged_stage[key] = max(merged_stage.get(key, 0), value)
+        for name, value in report.get("counters", {}).items():
+            merged["counters"][name] = merged["counters"].get(name, 0) + value
+    return merged
+
+
+def merge_shards(shard_paths, output_path, report_file_name, link=False):
+    """
+    Merges the output folders of the shards of a run into the output folder: the models of
+    each shard, with their reports, are copied into it, and their manifests merged. Models of
+    the output that no shard converted are left alone, but they are no longer recorded in
+    the manifest.
+
+    Parameters:
+        shard_paths (list): The output folders of the shards, one per shard.
+        output_path (str): The folder to merge them into (it can be the output of a shard).
+        report_file_name (str): Name of the run report in the shard folders.
+        link (bool, optional): Hard-link the files instead of copying them.
+
+    Returns:
+        dict: The combined run reports of the shards (see merge_run_reports()).
+
+    Raises:
+        ShardError: If a shard is missing or repeated, or the shards were not converted
+                    by the same converter and configuration.
+    """
+    manifests = {}
+    for shard_path in shard_paths:
+        manifest = read_json_file(os.path.join(shard_path, MANIFEST_FILE_NAME))
+        if manifest is None or "shard" not in manifest:
+            raise ShardError(f"{shard_path} is not the output of a run with --shard")
+        manifests[shard_path] = manifest
+
+    shard_counts = {manifest["shard"][1] for manifest in manifests.values()}
+    fingerprints = {manifest["converter_fingerprint"] for manifest in manifests.values()}
+    indexes = sorted(manifest["shard"][0] for manifest in manifests.values())
+    if len(shard_counts) > 1 or len(fingerprints) > 1:
+        raise ShardError("The shards were not converted by the same run (shard count, converter or configuration)")
+    shard_count = shard_counts.pop()
+    if indexes != list(range(1, shard_count + 1)):
+        raise ShardError(f"Expected the outputs of the shards 1 to {shard_count}, got {indexes}")
+
+    merged = {
+        "converter_version": next(iter(manifests.values()))["converter_version"],
+        "converter_fingerprint": fingerprints.pop(),
+        "models": {}
+    }
+    reports = {}
+    os.makedirs(output_path, exist_ok=True)
+    for shard_path, manifest in sorted(manifests.items(), key=lambda item: item[1]["shard"][0]):
+        label = "{}/{}".format(*manifest["shard"])
+        for name, entry in sorted(manifest["models"].items()):
+            if name in merged["models"]:
+                raise ShardError(f"{name} was converted by more than one shard")
+            merged["models"][name] = entry
+            source_dir = os.path.join(shard_path, name)
+            if not os.path.isdir(source_dir):
+                log(f"Semantic model {name} missing from the output of shard {label}", ERROR)
+                continue
+            log(f"Merging {name} from shard {label}", DEBUG)
+            if not os.path.samefile(shard_path, output_path):
+                mirror_folder(source_dir, os.path.join(output_path, name), link)
+                report_dir = get_report_path(shard_path, name)
+                if os.path.isdir(report_dir):
+                    mirror_folder(report_dir, get_report_path(output_path, name), link)
+        report = read_json_file(os.path.join(shard_path, report_file_name))
+        if report is not None:
+            reports[label] = report
+
+    save_manifest(output_path, merged)
+    return merge_run_reports(reports)
+
+
+def write_merged_report(report, report_path):
+    """
+    Writes the JSON report of merge_shards().
+
+    Parameters:
+        report (dict): The report.
+        report_path (str): Path of the JSON file.
+    """
+    try:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    except IOError as e:
+        log(f"Error writing the run report {report_path}: {e}", ERROR)
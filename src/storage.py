@@ -0,0 +1,71 @@
+# Requires Python 3.8 or later
+"""
+Storage mode of the converted tables.
+
+By default every converted partition is imported. With a "storageModes" section in the
+configuration (see config.py), each table gets the mode of the first rule matching its
+name, or else the mode of its partitions in the original model, or else the default of
+the section. DirectQuery and dual partitions read the table through the SQL navigation
+instead of a native query, so Power BI can fold the report queries into the source.
+"""
+from config import STORAGE_MODES, match_table
+
+# The mode of the partitions generated without a configuration
+DEFAULT_STORAGE_MODE = "import"
+
+
+def find_storage_mode(config, table_name, source_mode=None):
+    """
+    Chooses the storage mode of the partition of a table.
+
+    Parameters:
+        config (dict): The configuration (see config.py), or None.
+        table_name (str): The name of the table declaration.
+        source_mode (str, optional): The mode of the partitions of the table in the original model.
+
+    Returns:
+        str: One of STORAGE_MODES.
+    """
+    section = (config or {}).get("storageModes")
+    if not section:
+        return DEFAULT_STORAGE_MODE
+    for rule in section["rules"]:
+        if table_name and match_table(rule["tables"], table_name):
+            return rule["mode"]
+    # The 'default' mode of the original partitions follows the model, i.e. import
+    for mode in STORAGE_MODES:
+        if source_mode and source_mode.strip().lower() == mode.lower():
+            return mode
+    return section["default"] or DEFAULT_STORAGE_MODE
+
+
+def format_navigation_source(server, database, schema, table, column_mappings, indent):
+    """
+    Formats the steps of an M expression reading a table through the SQL navigation,
+    keeping and renaming its source columns.
+
+    Parameters:
+        server (str): The SQL Server, as an M expression (a text literal or a parameter).
+        database (str): The database, as an M expression.
+        schema (str): The schema of the table in the database.
+        table (str): The table in the database.
+        column_mappings (list): The (sourceColumn, columnName) tuples of the columns.
+        indent (str): The indentation of the steps.
+
+    Returns:
+        tuple: (steps, result) where steps are the lines of the 'let' block, joined with
+               line breaks, and result is the name of the last step.
+    """
+    columns = ", ".join(f'"{src}"' for src, _ in column_mappings)
+    renames = ", ".join(f'{{"{src}", "{col}"}}' for src, col in column_mappings if src != col)
+    steps = [
+        f'Source = Sql.Database({server}, {database}),',
+        f'Data = Source{{[Schema="{schema}", Item="{table}"]}}[Data],',
+        f'Columns = Table.SelectColumns(Data, {{{columns}}})'
+    ]
+    result = "Columns"
+    if renames:
+        steps[-1] += ","
+        steps.append(f"Renamed = Table.RenameColumns(Columns, {{{renames}}})")
+        result = "Renamed"
+    return ("\n" + indent).join(steps), result
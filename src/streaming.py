@@ -0,0 +1,271 @@
+# Requires Python 3.8 or later
+import re
+import json
+
+# Size of the blocks in which very long lines are read
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class LineRest:
+    """
+    The rest of a line longer than STREAM_CHUNK_SIZE, read in blocks on demand.
+    It remembers the last characters of the line, needed to tokenize the next one.
+    """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.end = ""
+        self.done = False
+
+    def __iter__(self):
+        while not self.done:
+            chunk = self.f.readline(self.chunk_size)
+            if not chunk or chunk.endswith("\n"):
+                self.done = True
+            if chunk:
+                self.end = (self.end + chunk)[-16:]
+                yield chunk
+
+    def drain(self):
+        """
+        Skips the part of the line that was not read.
+
+        Returns:
+            str: The last characters of the line.
+        """
+        for _ in self:
+            pass
+        return self.end
+
+
+def iter_line_parts(f, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Reads the lines of a text file, never holding more than chunk_size characters of a line.
+
+    Parameters:
+        f (file): The file, opened in text mode.
+        chunk_size (int, optional): Maximum number of characters read at once.
+
+    Yields:
+        tuple: (head, rest) where head is the line (or its first chunk_size characters) and
+               rest is None for a complete line, or a LineRest with the remaining blocks.
+               The rest must be read or drained before the next line.
+    """
+    while True:
+        head = f.readline(chunk_size)
+        if not head:
+            return
+        if head.endswith("\n") or len(head) < chunk_size:
+            yield head, None
+        else:
+            yield head, LineRest(f, chunk_size)
+
+
+class RollingSearch:
+    """
+    Searches a pattern in a text received in pieces, keeping only the last characters
+    of the previous pieces, so a match spanning two pieces is still found. Short pieces
+    are searched together, so no character is searched more than about twice.
+    """
+
+    def __init__(self, pattern, overlap=1024):
+        """
+        Parameters:
+            pattern (re.Pattern): The compiled pattern.
+            overlap (int, optional): Characters kept from the previous pieces (longest expected match).
+        """
+        self.pattern = pattern
+        self.overlap = overlap
+        self.carry = ""
+        self.pending = []
+        self.pending_size = 0
+        self.found = None
+        self.empty = True
+
+    @property
+    def match(self):
+        """
+        The first match in the text received, or None.
+        """
+        if self.pending:
+            self.search()
+        return self.found
+
+    def feed(self, text):
+        """
+        Receives the next piece of text, until the first match is found.
+        """
+        if text:
+            self.empty = False
+        if self.found is not None:
+            return
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.overlap:
+            self.search()
+
+    def search(self):
+        window = self.carry + "".join(self.pending)
+        self.pending = []
+        self.pending_size = 0
+        self.found = self.pattern.search(window)
+        self.carry = window[-self.overlap:]
+
+
+# Characters that change the state of JsonFieldExtractor, outside and inside strings
+JSON_STRUCTURE_PATTERN = re.compile(r'["{}\[\],:]')
+JSON_STRING_END_PATTERN = re.compile(r'["\\]')
+# Text without brackets, with complete strings, skipped at once inside a value that is not extracted
+JSON_SKIP_PATTERN = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+
+
+class JsonFieldExtractor:
+    """
+    Extracts some fields of a JSON object received in pieces, without building the rest
+    of the object (e.g. the "Columns" of a TabularEditor_TableSchema annotation). Only the
+    raw text of the requested top level fields is kept.
+    """
+
+    def __init__(self, keys):
+        """
+        Parameters:
+            keys (iterable): The top level keys to extract.
+        """
+        self.keys = set(keys)
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        # Text of the string being read at depth 1 (a key or a value)
+        self.token = None
+        self.key = None
+        self.expect_value = False
+        self.value = None
+        self.values = {}
+        self.started = False
+        self.received = False
+
+    def feed(self, text):
+        """
+        Reads the next piece of the JSON text.
+        """
+        if text:
+            self.received = True
+        position = 0
+        length = len(text)
+        while position < length:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                    self.append(text[position])
+                    position += 1
+                    continue
+                match = JSON_STRING_END_PATTERN.search(text, position)
+                end = match.start() if match else length
+                self.append(text[position:end])
+                if match is None:
+                    return
+                self.append(match.group())
+                if match.group() == "\\":
+                    self.escape = True
+                else:
+                    self.in_string = False
+                    self.end_string()
+                position = end + 1
+                continue
+
+            if self.depth > 1 and self.value is None:
+                # Inside a nested value that is not extracted: only the brackets matter
+                position = JSON_SKIP_PATTERN.match(text, position).end()
+                if position < length:
+                    self.structure(text[position])
+                    position += 1
+                continue
+
+            match = JSON_STRUCTURE_PATTERN.search(text, position)
+            end = match.start() if match else length
+            self.append(text[position:end])
+            if match is None:
+                return
+            self.structure(match.group())
+            position = end + 1
+
+    def append(self, text):
+        if self.value is not None:
+            self.value.append(text)
+        elif self.token is not None:
+            self.token.append(text)
+
+    def end_string(self):
+        if self.depth == 1 and self.token is not None and not self.expect_value:
+            self.key = json.loads("".join(self.token))
+            self.token = None
+
+    def structure(self, char):
+        if char == '"':
+            self.in_string = True
+            if self.depth == 1 and not self.expect_value and self.value is None:
+                self.token = [char]
+            else:
+                self.append(char)
+            return
+
+        if char in "{[":
+            if self.depth == 0:
+                self.started = char == "{"
+            else:
+                self.append(char)
+            self.depth += 1
+        elif char in "}]":
+            self.depth -= 1
+            if self.depth == 0:
+                self.end_value()
+            else:
+                self.append(char)
+        elif self.depth == 1 and char == ":":
+            self.expect_value = True
+            if self.key in self.keys:
+                self.value = []
+        elif self.depth == 1 and char == ",":
+            self.end_value()
+        else:
+            self.append(char)
+
+    def end_value(self):
+        if self.value is not None:
+            self.values[self.key] = "".join(self.value)
+        self.value = None
+        self.key = None
+        self.expect_value = False
+
+    def result(self):
+        """
+        Returns:
+            dict: The decoded value of each requested key found in the object.
+
+        Raises:
+            ValueError: If the text is not a complete JSON object, or a value is not valid JSON.
+        """
+        if not self.started or self.depth != 0 or self.in_string:
+            raise ValueError("Expecting a complete JSON object")
+        return {key: json.loads(value) for key, value in self.values.items()}
+
+
+class TrimmedWriter:
+    """
+    Writes text to a file, leaving out the whitespace at the very end of the file
+    (as str.rstrip() would), while keeping only that trailing whitespace in memory.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.pending = ""
+
+    def write(self, text):
+        content = text.rstrip()
+        if content:
+            self.f.write(self.pending)
+            self.f.write(content)
+            self.pending = text[len(content):]
+        else:
+            self.pending += text
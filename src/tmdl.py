@@ -0,0 +1,375 @@
+# Requires Python 3.8 or later
+import re
+
+# Keywords that declare an object (with its own properties and children).
+# Any other keyword declares a property of the enclosing object.
+OBJECT_KEYWORDS = {
+    "database", "model", "table", "column", "measure", "partition", "hierarchy", "level",
+    "annotation", "extendedProperty", "changedProperty", "calculationGroup", "calculationItem",
+    "formatStringDefinition", "detailRowsDefinition", "relationship", "role", "tablePermission",
+    "columnPermission", "member", "perspective", "perspectiveTable", "perspectiveColumn",
+    "perspectiveMeasure", "perspectiveHierarchy", "cultureInfo", "linguisticMetadata",
+    "translation", "expression", "dataSource", "queryGroup", "variation", "ref",
+    "dataAccessOptions", "refreshPolicy", "alternateOf"
+}
+
+# Number of spaces that count as one indentation level (TMDL is indented with tabs)
+INDENT_WIDTH = 4
+
+# "keyword: value"
+PROPERTY_PATTERN = re.compile(r"([A-Za-z_]\w*)\s*:(.*)$")
+# "keyword = value" (a property whose value is an expression)
+EXPRESSION_PROPERTY_PATTERN = re.compile(r"([A-Za-z_]\w*)\s*=(.*)$")
+# "keyword name", "keyword name = value" or "keyword" (the name may be quoted with single quotes)
+OBJECT_PATTERN = re.compile(r"([A-Za-z_]\w*)(?:\s+('(?:[^']|'')*'|[^\s=']+))?\s*(?:=(.*))?$")
+
+
+class Line:
+    """
+    A line of a TMDL document, classified by tokenize_tmdl().
+
+    Attributes:
+        text (str): The original line, including its line break.
+        indent (int): The indentation level.
+        kind (str): "object", "property", "expression", "comment", "blank" or "text".
+        keyword (str): The keyword of an object or property line.
+        name (str): The (unquoted) name of an object line.
+        value (str): The text after ':' or '=' (stripped), None if there is none.
+        node (Node): The object the line belongs to, set by parse_tmdl().
+    """
+    __slots__ = ("text", "indent", "kind", "keyword", "name", "value", "node")
+
+    def __init__(self, text, indent, kind, keyword=None, name=None, value=None):
+        self.text = text
+        self.indent = indent
+        self.kind = kind
+        self.keyword = keyword
+        self.name = name
+        self.value = value
+        self.node = None
+
+
+class Node:
+    """
+    An object of a TMDL document (table, column, measure, partition, annotation, ...).
+
+    Attributes:
+        keyword (str): The keyword that declared the object.
+        name (str): The unquoted name of the object, None for unnamed objects.
+        value (str): The value after '=' (e.g. the expression of a measure), None if there is none.
+        indent (int): The indentation level of the declaration.
+        parent (Node): The enclosing object.
+        children (list): The objects declared inside this one.
+        properties (dict): The values of the properties by keyword. Flags have an empty value
+                           and multi-line expressions hold all their lines.
+        line (Line): The line that declared the object.
+    """
+    __slots__ = ("keyword", "name", "value", "indent", "parent", "children", "properties", "line")
+
+    def __init__(self, keyword, name=None, value=None, indent=-1, parent=None, line=None):
+        self.keyword = keyword
+        self.name = name
+        self.value = value
+        self.indent = indent
+        self.parent = parent
+        self.children = []
+        self.properties = {}
+        self.line = line
+
+    def iter_nodes(self, keyword=None):
+        """
+        Iterates over the descendants of this object in document order.
+
+        Parameters:
+            keyword (str, optional): Only the objects declared with this keyword.
+
+        Yields:
+            Node: The matching objects.
+        """
+        pending = list(reversed(self.children))
+        while pending:
+            node = pending.pop()
+            if keyword is None or node.keyword == keyword:
+                yield node
+            pending.extend(reversed(node.children))
+
+    def find(self, keyword):
+        """
+        Returns the first descendant declared with the keyword, or None.
+        """
+        return next(self.iter_nodes(keyword), None)
+
+
+class Document(Node):
+    """
+    A parsed TMDL file: the root of the object tree, plus all its lines in order,
+    so the file can be written back without changing the lines that are kept.
+    """
+    __slots__ = ("lines",)
+
+    def __init__(self):
+        super().__init__(None)
+        self.lines = []
+
+
+def unquote_name(name):
+    """
+    Removes the single quotes around a TMDL object name, e.g. 'Sales Data' -> Sales Data.
+
+    Parameters:
+        name (str): The name, quoted or not.
+
+    Returns:
+        str: The name without quotes.
+    """
+    name = name.strip()
+    if len(name) >= 2 and name[0] == "'" and name[-1] == "'":
+        return name[1:-1].replace("''", "'")
+    return name
+
+
+def quote_name(name):
+    """
+    Quotes a TMDL object name if it is not a plain identifier, e.g. Sales Data -> 'Sales Data'.
+
+    Parameters:
+        name (str): The unquoted name.
+
+    Returns:
+        str: The name as written in a declaration.
+    """
+    if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+        return name
+    return "'" + name.replace("'", "''") + "'"
+
+
+def get_indent(text):
+    """
+    Calculates the indentation level of a line. A tab is one level and so are INDENT_WIDTH spaces.
+
+    Parameters:
+        text (str): The line.
+
+    Returns:
+        int: The indentation level.
+    """
+    width = 0
+    for char in text:
+        if char == "\t":
+            width += INDENT_WIDTH
+        elif char == " ":
+            width += 1
+        else:
+            break
+    return width // INDENT_WIDTH
+
+
+def classify_line(text, stripped, indent):
+    """
+    Classifies a line that is not part of an expression.
+
+    Parameters:
+        text (str): The line.
+        stripped (str): The line without surrounding whitespace.
+        indent (int): The indentation level of the line.
+
+    Returns:
+        Line: The classified line.
+    """
+    if stripped.startswith("///"):
+        return Line(text, indent, "comment")
+
+    match = PROPERTY_PATTERN.match(stripped)
+    if match:
+        return Line(text, indent, "property", match.group(1), value=match.group(2).strip())
+
+    match = EXPRESSION_PROPERTY_PATTERN.match(stripped)
+    if match and match.group(1) not in OBJECT_KEYWORDS:
+        return Line(text, indent, "property", match.group(1), value=match.group(2).strip())
+
+    keyword = stripped.split(None, 1)[0]
+    if keyword == "ref":
+        # "ref table 'Sales'": the name is everything after the keyword
+        return Line(text, indent, "object", keyword, stripped[len(keyword):].strip())
+
+    match = OBJECT_PATTERN.match(stripped)
+    if match is None:
+        return Line(text, indent, "text")
+
+    keyword, name, value = match.groups()
+    if keyword in OBJECT_KEYWORDS:
+        return Line(text, indent, "object", keyword,
+                    unquote_name(name) if name else None,
+                    value.strip() if value is not None else None)
+    if name is None:
+        # A flag, e.g. "isHidden"
+        return Line(text, indent, "property", keyword, value="")
+    return Line(text, indent, "text")
+
+
+class Tokenizer:
+    """
+    The state of the tokenizer between two lines: the open multi-line expression, if any.
+
+    Lines are classified with classify() and then closed with end_line(), which needs the end
+    of the line. A very long line can thus be classified from its beginning and closed with
+    its end, without holding it whole in memory (see streaming.py).
+    """
+    __slots__ = ("expression_indent", "fenced")
+
+    def __init__(self):
+        # Lines indented deeper than this level belong to the open expression
+        self.expression_indent = None
+        self.fenced = False
+
+    def classify(self, text):
+        """
+        Classifies the next line of the document.
+
+        Parameters:
+            text (str): The line, or its beginning for a very long line.
+
+        Returns:
+            Line: The classified line.
+        """
+        if self.fenced:
+            return Line(text, get_indent(text), "expression")
+
+        stripped = text.strip()
+        if not stripped:
+            return Line(text, 0, "blank")
+
+        indent = get_indent(text)
+        if self.expression_indent is not None and indent > self.expression_indent:
+            return Line(text, indent, "expression")
+        self.expression_indent = None
+
+        return classify_line(text, stripped, indent)
+
+    def end_line(self, line, end=None):
+        """
+        Updates the state after a line, opening or closing multi-line expressions.
+
+        Parameters:
+            line (Line): The line returned by classify().
+            end (str, optional): The end of the line, when line.text is only its beginning.
+        """
+        stripped_end = (line.text if end is None else end).rstrip()
+
+        if line.kind == "expression":
+            if self.fenced and stripped_end.endswith("```"):
+                self.fenced = False
+            return
+
+        value = line.value
+        if value is not None and value.startswith("```"):
+            # The expression is enclosed in ``` and ends at the closing ```
+            self.fenced = (end is None and len(value) < 6) or not stripped_end.endswith("```")
+        elif value == "" and stripped_end.endswith("="):
+            # The expression starts on the next line. The properties of an object are one
+            # level deeper than it, so its expression is at least two levels deeper.
+            self.expression_indent = line.indent + 1 if line.kind == "object" else line.indent
+
+
+def tokenize_tmdl(lines):
+    """
+    Tokenizes a TMDL document in a single streaming pass, one line at a time.
+
+    Multi-line expressions (a declaration ending with '=' followed by deeper indented lines,
+    or an expression enclosed in ```) are recognized, so their lines are never taken
+    for properties or objects.
+
+    Parameters:
+        lines (iterable): The lines of the document, with their line breaks (e.g. an open file).
+
+    Yields:
+        Line: The classified lines, in order.
+    """
+    tokenizer = Tokenizer()
+    for text in lines:
+        line = tokenizer.classify(text)
+        tokenizer.end_line(line)
+        yield line
+
+
+def parse_tmdl(lines):
+    """
+    Parses a TMDL document into a lightweight object tree in a single pass.
+
+    Parameters:
+        lines (iterable or str): The lines of the document, or its whole content.
+
+    Returns:
+        Document: The root of the tree.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines(keepends=True)
+
+    document = Document()
+    stack = [document]
+    # The object (and property) that receives the lines of the open expression
+    expression_node = None
+    expression_key = None
+
+    for line in tokenize_tmdl(lines):
+        document.lines.append(line)
+        kind = line.kind
+
+        if kind == "expression":
+            line.node = expression_node
+            if expression_node is None:
+                continue
+            if expression_key is None:
+                expression_node.value = (expression_node.value or "") + line.text
+            else:
+                expression_node.properties[expression_key] += line.text
+            continue
+
+        if kind not in ("object", "property"):
+            line.node = stack[-1]
+            continue
+
+        while stack[-1].indent >= line.indent:
+            stack.pop()
+
+        if kind == "object":
+            node = Node(line.keyword, line.name, line.value, line.indent, stack[-1], line)
+            stack[-1].children.append(node)
+            stack.append(node)
+            line.node = node
+            expression_node, expression_key = node, None
+        else:
+            owner = stack[-1]
+            owner.properties[line.keyword] = line.value
+            line.node = owner
+            expression_node, expression_key = owner, line.keyword
+
+    return document
+
+
+def as_document(content):
+    """
+    Parses the content of a TMDL file, unless it is already parsed.
+
+    Parameters:
+        content (str or Document): The content of the file, or its parsed document.
+
+    Returns:
+        Document: The parsed document.
+    """
+    if isinstance(content, Document):
+        return content
+    return parse_tmdl(content)
+
+
+def render_lines(lines):
+    """
+    Joins lines back into the text of a document.
+
+    Parameters:
+        lines (iterable): Line objects.
+
+    Returns:
+        str: The text.
+    """
+    return "".join(line.text for line in lines)
@@ -1,113 +1,409 @@
 # Requires Python 3.8 or later
+import io
 import re
 import os
+import copy
 import json
-import glob
 import shutil
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 
-def update_database_tmdl(file_path):
+from manifest import hash_files, compare_file_hashes
+from datasources import parse_data_sources, get_data_source
+from tmdl import parse_tmdl, as_document, render_lines, unquote_name, quote_name, Tokenizer
+from streaming import iter_line_parts, RollingSearch, JsonFieldExtractor, TrimmedWriter
+from connections import get_model_connections, get_connection_parameters
+from storage import find_storage_mode, format_navigation_source, DEFAULT_STORAGE_MODE
+from refresh import find_refresh_policy, get_range_parameters, format_range_filter, format_refresh_policy
+from pruning import ReferenceGraph, ColumnPruner, get_pruning_scope
+from hints import find_column_hints, get_hint_settings, ColumnHintWriter
+from rules import get_rule_set, apply_rules, MODEL_ALLOWED_KEYWORDS
+from shards import select_shard
+from catalog import scan_models, scan_files, get_report_path
+from semantic_model import (
+    SemanticModel, is_table_file, is_tabular_editor_content, MODEL_FILE, DATABASE_FILE, DATA_SOURCES_FILE
+)
+from filesystem import (
+    read_text_file, write_text_file, write_bytes_file, has_same_content, link_or_copy_file, LocalFileSystem,
+    MemoryFileSystem, find_file
+)
+from metrics import log, count, get_metrics, set_metrics, init_worker, RunMetrics, ERROR, INFO, DEBUG
+
+# Definition files that affect the conversion of every table of a semantic model.
+# When one of them changes, the whole model is converted again.
+MODEL_LEVEL_FILES = (
+    "definition/model.tmdl",
+    "definition/datasources.tmdl"
+)
+
+# The shared M expressions (parameters and queries) of a semantic model
+EXPRESSIONS_FILE = "definition/expressions.tmdl"
+
+# Schema and table in the FROM clause of a partition query: FROM [schema].[table]
+QUERY_FROM_PATTERN = re.compile(r'FROM\s+\[([^]]+)\]\.\[([^]]+)\]', re.IGNORECASE)
+
+# Properties of the columns read by the incremental refresh and the column hints
+COLUMN_METADATA_PROPERTIES = ("dataType", "summarizeBy", "sourceProviderType", "encodingHint")
+
+# Table files from this size on are converted line by line (see stream_table_file())
+STREAMING_THRESHOLD = 16 * 1024 * 1024
+
+
+def update_database_content(content, config=None):
     """
-    Updates the value of compatibilityLevel from 1500 to 1550 in the specified file.
+    Applies the transform rules of database.tmdl to its content (see rules.py), which by default
+    update the value of compatibilityLevel from 1500 or 1600 to 1605.
     
     Parameters:
-        file_path (str): Path to the database.tmdl file.
+        content (str or Document): Content of the database.tmdl file, or its parsed document.
+        config (dict, optional): The configuration (see config.py).
         
     Returns:
-        str: Updated content of the file.
+        str: The updated content.
     """
-    # Reads the content of the file
-    try:
-        with open(f"{file_path}/definition/database.tmdl", "r", encoding="utf-8") as f:
-            content = f.read()
-    except IOError as e:
-        print(f"Error reading the file: {e}")
-        return None
+    rule_filter = get_rule_set(config).for_file(DATABASE_FILE)
+    if rule_filter is None:
+        return render_lines(as_document(content).lines)
+    return apply_rules(content, rule_filter)
 
-    # Performs the substitution using a regular expression
-    new_content = re.sub(r'(compatibilityLevel:\s*)(1500|1600)', r'\g<1>1605', content)
+
+def is_table_reference(line, table_names):
+    """
+    Checks if a line of model.tmdl is a "ref table" to one of the tables.
     
-    # Saves the modifications back to the same file
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(new_content)
-        print("File updated successfully.")
-    except IOError as e:
-        print(f"Error writing to the file: {e}")
-        return None
+    Parameters:
+        line (Line): The line.
+        table_names (set): The lower case names of the tables.
+        
+    Returns:
+        bool: True for "ref table <name>" lines with one of the names.
+    """
+    if line.kind != "object" or line.keyword != "ref" or not line.name:
+        return False
+    parts = line.name.split(None, 1)
+    return len(parts) == 2 and parts[0] == "table" and unquote_name(parts[1]).lower() in table_names
+
+
+def clean_model_content(content, pruned_tables=(), config=None):
+    """
+    Applies the transform rules of model.tmdl to its content (see rules.py), which by default
+    keep only the objects and properties declared with the keywords in MODEL_ALLOWED_KEYWORDS.
     
-    return new_content
+    Parameters:
+        content (str or Document): Content of the model.tmdl file, or its parsed document.
+        pruned_tables (iterable, optional): Names of the tables left out of the model, whose
+                                            "ref table" lines are removed.
+        config (dict, optional): The configuration (see config.py).
+        
+    Returns:
+        str: The filtered content.
+    """
+    pruned_tables = {name.lower() for name in pruned_tables}
+    rule_filter = get_rule_set(config).for_file(MODEL_FILE)
+    new_lines = []
+    for line in as_document(content).lines:
+        if is_table_reference(line, pruned_tables):
+            continue
+        new_lines.extend([line] if rule_filter is None else rule_filter.feed(line))
+    if rule_filter is not None:
+        new_lines.extend(rule_filter.flush())
+    return render_lines(new_lines)
 
 
-def delete_definition_datasources(file_path):
+def split_table_header(document, pruned_columns=None, column_hints=None, rule_filter=None):
     """
-    Deletes the specified file.
+    Splits a parsed .tmdl table file at its first partition block.
     
     Parameters:
-        file_path (str): Path of the file to delete.
+        document (Document): The parsed table file.
+        pruned_columns (set, optional): Lower case names of the columns to leave out (see pruning.py).
+        column_hints (dict, optional): The hints to write into the columns (see plan_column_hints()).
+        rule_filter (RuleFilter, optional): The transform rules of the table (see rules.py).
+        
+    Returns:
+        tuple: (header_lines, column_mappings) where header_lines are the lines before the first
+               partition block without the pruned columns and with the transform rules applied
+               (by default, without the "sourceProviderType" properties), and column_mappings are
+               the (sourceColumn, columnName) tuples of the other columns with a sourceColumn.
     """
-    try:
-        os.remove(f"{file_path}/definition/datasources.tmdl")
-        print(f"File '{file_path}/definition/datasources.tmdl' successfully deleted.")
-    except FileNotFoundError:
-        print(f"File '{file_path}/definition/datasources.tmdl' not found.")
-    except Exception as e:
-        print(f"An error occurred while deleting the file: {e}")
+    pruner = ColumnPruner(pruned_columns) if pruned_columns else None
+    hinter = ColumnHintWriter(column_hints) if column_hints else None
+    header_lines = []
+    for line in document.lines:
+        # Stop at the partition block
+        if line.kind == "object" and line.keyword == "partition":
+            break
+        header_lines.extend(filter_header_line(line, pruner, rule_filter, hinter))
+    header_lines.extend(flush_header_filters(pruner, rule_filter, hinter))
+    
+    column_mappings = [
+        (column["sourceColumn"], column["name"])
+        for column in get_table_columns(document, pruned_columns) if column["sourceColumn"]
+    ]
+    return header_lines, column_mappings
 
 
-def clean_definition_model(file_path):
+def filter_header_line(line, pruner=None, rule_filter=None, hinter=None):
     """
-    Reads a .tmdl file and filters its content to keep only lines that start with the allowed keywords.
-    The allowed keywords are:
-        - model
-        - culture
-        - defaultPowerBIDataSourceVersion
-        - discourageImplicitMeasures
-        - ref
+    Passes a line before the partitions of a table file through its filters, in order: the
+    pruned columns (see pruning.py), the transform rules (see rules.py) and the column hints
+    (see hints.py).
     
     Parameters:
-        file_path (str): Path of the file to filter.
+        line (Line): The line (whole, if needed by one of the filters).
+        pruner (ColumnPruner, optional): The pruned columns.
+        rule_filter (RuleFilter, optional): The transform rules of the table.
+        hinter (ColumnHintWriter, optional): The column hints.
+        
+    Returns:
+        list: The lines to write instead of the line.
+    """
+    lines = [line]
+    if pruner is not None:
+        released, keep = pruner.feed(line)
+        lines = released + lines if keep else released
+    if rule_filter is not None:
+        lines = [kept for fed in lines for kept in rule_filter.feed(fed)]
+    if hinter is not None:
+        lines = [hinted for kept in lines for hinted in hinter.feed(kept)]
+    return lines
+
+
+def flush_header_filters(pruner=None, rule_filter=None, hinter=None):
+    """
+    Returns:
+        list: The lines still held by the filters of filter_header_line() at the end of the header,
+              with the hints of the last column if it had no dataType line.
+    """
+    lines = pruner.flush() if pruner is not None else []
+    if rule_filter is not None:
+        lines = [kept for fed in lines for kept in rule_filter.feed(fed)] + rule_filter.flush()
+    if hinter is not None:
+        # The lines the hinter holds come before the ones still held by the other filters
+        lines = hinter.flush() + lines
+    return lines
+
+
+def format_partition_block(table, server, database, schema, column_mappings, partition_options=None):
+    """
+    Formats the import partition block that replaces the partitions of a table.
     
-    The file is overwritten with the filtered content.
+    Parameters:
+        table (str): Name of the table (and of the partition).
+        server (str): The SQL Server.
+        database (str): The database.
+        schema (str): The schema of the table in the database.
+        column_mappings (list): The (sourceColumn, columnName) tuples of the columns.
+        partition_options (dict, optional): What the configuration sets for the table (see plan_partition()).
+        
+    Returns:
+        str: The partition block.
     """
-    allowed_keywords = [
-        "model",
-        "culture",
-        "defaultPowerBIDataSourceVersion",
-        "discourageImplicitMeasures",
-        "ref"
-    ]
+    partition_options = partition_options or {}
+    mode = partition_options.get("mode", DEFAULT_STORAGE_MODE)
+    refresh_policy = partition_options.get("refresh_policy")
     
-    try:
-        # Read all lines from the file.
-        with open(f"{file_path}/definition/model.tmdl", "r", encoding="utf-8") as file:
-            lines = file.readlines()
-    except IOError as e:
-        print(f"Error reading file {file_path}/definition/model.tmdl: {e}")
-        return None
+    # The server and database, as M expressions
+    if partition_options.get("connection_parameters"):
+        server_m, database_m = get_connection_parameters(
+            partition_options["connection_parameters"], server, database,
+            partition_options.get("connections"), partition_options["expressions"]
+        )
+    else:
+        server_m, database_m = f'"{server}"', f'"{database}"'
+    
+    if mode == "import":
+        # Build the SQL columns string in the format: [sourceColumn] AS [columnName]
+        columns_str = ", ".join([f"[{src}] AS [{col}]" for src, col in column_mappings])
+        query = f"SELECT {columns_str} FROM [{schema}].[{table}]"
+        if refresh_policy:
+            # Each partition of the policy loads only the rows of its range
+            query += format_range_filter(refresh_policy["column"])
+        steps = f'Source = Sql.Database({server_m}, {database_m}, [Query = "{query}", CreateNavigationProperties=false])'
+        result = "Source"
+    else:
+        # Queried at the source: the navigation lets Power BI fold the report queries
+        steps, result = format_navigation_source(server_m, database_m, schema, table, column_mappings, " " * 16)
     
-    # Filter lines: keep lines that start with any of the allowed keywords after stripping leading whitespace.
-    filtered_lines = [
-        line for line in lines
-        if any(line.lstrip().startswith(keyword) for keyword in allowed_keywords)
+    block = f"""
+    partition '{table}' = m
+        mode: {mode}
+        source =
+            let
+                {steps}
+            in
+                {result}
+    """
+    if refresh_policy:
+        block = block.rstrip(" ") + format_refresh_policy(refresh_policy, steps, result)
+    return block
+
+
+def get_source_mode(document):
+    """
+    Returns:
+        str or None: The mode of the first partition of a parsed table file that declares one.
+    """
+    return next(
+        (partition.properties["mode"] for partition in document.iter_nodes("partition")
+         if partition.properties.get("mode")), None
+    )
+
+
+def get_table_columns(document, pruned_columns=None):
+    """
+    Returns:
+        list: The columns of a parsed table file, as dicts with the keys name, sourceColumn and the
+              COLUMN_METADATA_PROPERTIES, without the pruned columns (lower case names).
+    """
+    pruned_columns = pruned_columns or ()
+    return [
+        {
+            "name": column.name,
+            "sourceColumn": (column.properties.get("sourceColumn") or "").strip() or None,
+            **{key: column.properties.get(key) for key in COLUMN_METADATA_PROPERTIES}
+        }
+        for column in document.iter_nodes("column") if column.name and column.name.lower() not in pruned_columns
     ]
+
+
+def get_schema_columns(document):
+    """
+    Returns:
+        list or None: The "Columns" of the last TabularEditor_TableSchema annotation of a parsed
+                      table file, None if it has none.
+    """
+    schema_columns = None
+    for annotation in document.iter_nodes("annotation"):
+        if annotation.name == "TabularEditor_TableSchema" and annotation.value:
+            try:
+                schema_columns = json.loads(annotation.value).get("Columns")
+            except (ValueError, AttributeError):
+                # Reported when the partition is built
+                pass
+    return schema_columns
+
+
+def plan_column_hints(config, table_name, columns, source_mode=None, schema_columns=None, file_path=""):
+    """
+    Chooses the encoding and data type hints of the columns of a table converted to an
+    import partition (see hints.py).
     
-    try:
-        # Write the filtered lines back to the file.
-        with open(f"{file_path}/definition/model.tmdl", "w", encoding="utf-8") as file:
-            file.writelines(filtered_lines)
-        print(f"File '{file_path}/definition/model.tmdl' successfully updated with filtered content.")
-    except IOError as e:
-        print(f"Error writing to file {file_path}/definiton/model.tmdl: {e}")
+    Parameters:
+        config (dict): The configuration (see config.py), or None.
+        table_name (str): The name of the table declaration.
+        columns (list): The columns of the table (see get_table_columns()).
+        source_mode (str, optional): The mode of the partitions in the original model (see get_source_mode()).
+        schema_columns (list, optional): The "Columns" of the TabularEditor_TableSchema annotation.
+        file_path (str, optional): Path of the table file, used in the messages.
+        
+    Returns:
+        dict: The hints by lower case column name, empty if the table is not imported.
+    """
+    if get_hint_settings(config) is None or find_storage_mode(config, table_name, source_mode) != "import":
+        return {}
+    return find_column_hints(config, columns, schema_columns, file_path)
+
+
+def plan_partition(config, table_name, columns, expressions, file_path="", source_mode=None, data_sources=None):
+    """
+    Decides what the configuration changes in the partition of a table, and collects the
+    model expressions this needs.
+    
+    Parameters:
+        config (dict): The configuration (see config.py), or None.
+        table_name (str): The name of the table declaration.
+        columns (list): The columns of the table (see get_table_columns()).
+        expressions (dict): Receives the M expression of each parameter the partition uses, by name.
+        file_path (str, optional): Path of the table file, used in the messages.
+        source_mode (str, optional): The mode of the partitions in the original model (see get_source_mode()).
+        data_sources (dict, optional): Index of the dataSources.tmdl file of the model.
+        
+    Returns:
+        dict: The options of format_partition_block(): mode (see find_storage_mode()), refresh_policy
+              (see find_refresh_policy()) and, to use shared connection parameters, connection_parameters
+              (their names), connections and expressions (see get_connection_parameters()).
+    """
+    partition_options = {"mode": find_storage_mode(config, table_name, source_mode)}
+    if (config or {}).get("connectionParameters"):
+        partition_options["connection_parameters"] = config["connectionParameters"]
+        partition_options["connections"] = get_model_connections(data_sources)
+        partition_options["expressions"] = expressions
+    refresh_policy = find_refresh_policy(config, table_name, columns, file_path)
+    if refresh_policy and partition_options["mode"] != "import":
+        log(f"'{table_name}' is not imported ({partition_options['mode']}), ignoring its incremental refresh", INFO)
+    elif refresh_policy:
+        log(f"Incremental refresh of '{table_name}' on [{refresh_policy['column']}]", DEBUG)
+        partition_options["refresh_policy"] = refresh_policy
+        expressions.update(get_range_parameters(config))
+    return partition_options
+
+
+def build_partition_block_tab_edtr(server, table, schema, database, column_mappings, partition_options=None):
+    """
+    Builds the new partition block of a table of a Tabular Editor model from the metadata
+    extracted from its partitions and its TabularEditor_TableSchema annotation
+    (see format_partition_block() for partition_options).
+    
+    Returns:
+        str or None: The partition block, or None if some metadata is missing.
+    """
+    if not (server and table and schema and database):
+        log("Error: Failed to extract all required metadata from partition block.", ERROR)
         return None
+    return format_partition_block(table, server, database, schema, column_mappings, partition_options)
+
+
+def build_partition_block(table_name, ds_identifier, schema, table_from_query, column_mappings,
+                          data_sources, default_database=None, partition_options=None):
+    """
+    Builds the new partition block of a table from the metadata extracted from its partitions
+    (see transform_table_content()).
+    
+    Parameters:
+        table_name (str): Name of the table declaration, None if not found.
+        ds_identifier (str): The dataSource of the first partition that has one, None if not found.
+        schema (str): The schema in the FROM clause of the partition query, None if not found.
+        table_from_query (str): The table in the FROM clause of the partition query, None if not found.
+        column_mappings (list): The (sourceColumn, columnName) tuples of the columns.
+        data_sources (dict): Index of the dataSources.tmdl file (see load_data_sources()).
+        default_database (str, optional): Default database name if not obtained from the connection string.
+        partition_options (dict, optional): What the configuration sets for the table (see plan_partition()).
+        
+    Returns:
+        str: The partition block.
+    """
+    # Retrieve connection info from the dataSources file using the extracted dataSource identifier
+    server = None
+    database = None
+    if ds_identifier:
+        server, database, _ = get_data_source(data_sources, ds_identifier)
+    
+    # If default_database is provided and database was not found, use default_database
+    if default_database and not database:
+        database = default_database
+    # If database is still not set, fallback to server (or handle accordingly)
+    if not database:
+        database = server
+    
+    # If table name was not extracted from the table declaration, use the one from the query
+    if not table_name:
+        table_name = table_from_query if table_from_query else "UnknownTable"
+    
+    # Use "dbo" as default schema if not found
+    if not schema:
+        schema = "dbo"
     
-    return filtered_lines
+    return format_partition_block(table_name, server, database, schema, column_mappings, partition_options)
 
 
-def transform_table_file_tab_edtr(file_path):
+def transform_table_content_tab_edtr(content, config=None, expressions=None, file_path="", pruned_columns=None,
+                                     data_sources=None):
     """
-    Transforms the .tmdl file by:
+    Transforms the content of a .tmdl table file of a Tabular Editor model by:
     
-    1. Removing lines that start with "sourceProviderType".
+    1. Applying the transform rules of the table (see rules.py), which by default remove
+       the lines that start with "sourceProviderType".
     2. For each column, capturing the corresponding sourceColumn to create an SQL query columns string.
        Format: "[sourceColumn] AS [column]" for each column.
     3. Capturing in the dataSource line the text before the first space as the variable 'server'.
@@ -126,52 +422,32 @@ def transform_table_file_tab_edtr(file_path):
                in
                    Source
     
+    The configuration can change the partition block (see plan_partition()) and the columns
+    (see plan_column_hints()).
+    
     Parameters:
-        file_path (str): Path to the .tmdl file.
+        content (str or Document): Content of the .tmdl file, or its parsed document.
+        config (dict, optional): The configuration (see config.py).
+        expressions (dict, optional): Receives the model expressions the new partition uses, by name.
+        file_path (str, optional): Path of the .tmdl file, used in the messages.
+        pruned_columns (set, optional): Lower case names of the columns to leave out (see pruning.py).
+        data_sources (dict, optional): The connections of the tables of the model (see get_model_data_sources()).
     
     Returns:
-        The new content of the file as a string.
+        The new content of the file as a string, or None if the metadata could not be extracted.
     """
-    # Read the file content
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+    document = as_document(content)
+    declaration = document.find("table")
+    table_name = declaration.name if declaration is not None else None
+    columns = get_table_columns(document, pruned_columns)
+    column_hints = plan_column_hints(
+        config, table_name, columns, get_source_mode(document), get_schema_columns(document), file_path
+    )
     
-    # Initialize variables to collect column mappings and header lines
-    column_mappings = []  # Each element will be (sourceColumn, columnName)
-    new_lines = []        # Lines to keep (everything before the partition block)
-    current_column = None
-    partition_start_index = None  # Index where the partition block starts
-
-    # Process the file until the partition block is encountered
-    for i, line in enumerate(lines):
-        stripped = line.lstrip()
-        # Check if we have reached the partition block; if so, stop processing further
-        if stripped.startswith("partition "):
-            partition_start_index = i
-            break
-        
-        # Delete lines starting with "sourceProviderType"
-        if stripped.startswith("sourceProviderType"):
-            continue
-        
-        # Capture column definitions
-        if stripped.startswith("column "):
-            # Expecting: "column ColumnName"
-            parts = stripped.split()
-            if len(parts) >= 2:
-                current_column = parts[1].strip()
-            else:
-                current_column = None
-        
-        # Capture the sourceColumn for the current column block
-        if stripped.startswith("sourceColumn:") and current_column:
-            match = re.search(r'sourceColumn:\s*(\S+)', stripped)
-            if match:
-                source_col = match.group(1).strip()
-                column_mappings.append((source_col, current_column))
-        
-        # Keep the current line (if it wasn’t filtered)
-        new_lines.append(line)
+    # Keep everything before the partition block, capturing the column mappings
+    new_lines, column_mappings = split_table_header(
+        document, pruned_columns, column_hints, get_rule_set(config).for_table(table_name)
+    )
     
     # Variables to capture server and table metadata from the partition block
     server = None
@@ -179,477 +455,1568 @@ def transform_table_file_tab_edtr(file_path):
     schema = None
     database = None
     
-    # Process the partition block (if present)
-    if partition_start_index is not None:
-        partition_block = lines[partition_start_index:]
-        for line in partition_block:
-            # Look for the dataSource line and extract text between quotes
-            if "dataSource:" in line:
-                ds_match = re.search(r"dataSource:\s*'([^']+)'", line)
-                if ds_match:
-                    ds_value = ds_match.group(1)
-                    # Get the text before the first space as server
-                    server = ds_value.split()[0]
-            # Look for the annotation for table schema
-            if "annotation TabularEditor_TableSchema" in line:
-                # Extract the JSON part (anything between the first '{' and the last '}')
-                json_match = re.search(r'annotation TabularEditor_TableSchema\s*=\s*(\{.*\})', line)
-                if json_match:
-                    json_str = json_match.group(1)
-                    try:
-                        table_schema = json.loads(json_str)
-                        table = table_schema.get("Name")
-                        schema = table_schema.get("Schema")
-                        database = table_schema.get("Database")
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing JSON in TableSchema: {e}")
-    
-    # Build the SQL columns string using the captured column mappings
-    # Format each mapping as: [sourceColumn] AS [columnName]
-    columns_parts = [f'[{src}] AS [{col}]' for src, col in column_mappings]
-    columns_str = ", ".join(columns_parts)
+    # Look for the dataSource property of the partition and get the text before the first space as server
+    for partition in document.iter_nodes("partition"):
+        ds_value = partition.properties.get("dataSource")
+        if ds_value and ds_value.startswith("'"):
+            server = unquote_name(ds_value).split()[0]
+    
+    # Look for the annotation for table schema (the last one wins)
+    for annotation in document.iter_nodes("annotation"):
+        if annotation.name == "TabularEditor_TableSchema" and annotation.value:
+            try:
+                table_schema = json.loads(annotation.value)
+                table = table_schema.get("Name")
+                schema = table_schema.get("Schema")
+                database = table_schema.get("Database")
+            except json.JSONDecodeError as e:
+                log(f"Error parsing JSON in TableSchema: {e}", ERROR)
     
     # At this point, new_lines holds all the lines before the partition block.
     # We now prepare the new partition block string.
-    if not (server and table and schema and database):
-        print("Error: Failed to extract all required metadata from partition block.")
+    table_expressions = {}
+    partition_options = plan_partition(
+        config, table_name, columns, table_expressions, file_path, get_source_mode(document), data_sources
+    )
+    new_partition_block = build_partition_block_tab_edtr(
+        server, table, schema, database, column_mappings, partition_options
+    )
+    if new_partition_block is None:
         return None
+    if expressions is not None:
+        expressions.update(table_expressions)
     
-    new_partition_block = f"""
-    partition '{table}' = m
-        mode: import
-        source =
-            let
-                Source = Sql.Database("{server}", "{database}", [Query = "SELECT {columns_str} FROM [{schema}].[{table}]", CreateNavigationProperties=false])
-            in
-                Source
-    """
     # Combine the header part (with columns, etc.) with the new partition block.
-    header_content = "".join(new_lines).rstrip()  # Remove trailing whitespace/newlines
+    header_content = render_lines(new_lines).rstrip()  # Remove trailing whitespace/newlines
     new_content = header_content + "\n\n" + new_partition_block
     
-    # Write the updated content back to the file
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(new_content)
-    
-    print("File transformed successfully.")
     return new_content
 
 
-def process_all_table_files_tab_edtr(base_path):
-    """
-    Processes all .tmdl files in the 'tables' subfolder located at base_path.
-    
-    Parameters:
-        base_path (str): The base directory containing the 'tables' subfolder.
+def is_calculation_group_content(content):
     """
-    # Construct the full path to the 'tables' folder.
-    tables_folder = os.path.join(base_path, "definition", "tables")
+    Checks if the content of a .tmdl table file declares a calculationGroup table.
     
-    # Find all .tmdl files in the tables folder.
-    tmdl_files = glob.glob(os.path.join(tables_folder, "*.tmdl"))
-    
-    # Process each .tmdl file.
-    for file_path in tmdl_files:
-        print(f"Processing file: {file_path}")
-        transform_table_file_tab_edtr(file_path)  
-
-
-def get_connection_info(output_path, data_source_id):
-    """
-    Extracts the connection information (server and database) for the specified data source
-    from the dataSources file.
-
     Parameters:
-        data_sources_path (str): Path to the dataSources.tmdl file.
-        data_source_id (str): Data source identifier (e.g., "DemoSAP").
-
+        content (str or Document): Content of the .tmdl file, or its parsed document.
+        
     Returns:
-        tuple: (server, database) if found, otherwise (None, None).
+        bool: True if the table has a calculationGroup.
     """
-    with open(f"{output_path}/definition/dataSources.tmdl", "r", encoding="utf-8") as f:
-        text = f.read()
-    
-    # Regular expression pattern to capture the Data Source and Initial Catalog values
-    pattern = (r"dataSource\s+" + re.escape(data_source_id) +
-               r"\s*=\s*provider\s*.*?connectionString:\s*Data Source=([^;]+);Initial Catalog=([^;]+);")
-    match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-    if match:
-        server = match.group(1).strip()
-        database = match.group(2).strip()
-        return server, database
-    return None, None
+    return as_document(content).find("calculationGroup") is not None
 
 
-def transform_table_file(output_path, file_path, default_database=None):
+def transform_table_content(content, data_sources, default_database=None, file_path="", config=None, expressions=None,
+                            pruned_columns=None):
     """
-    Transforms a .tmdl table file with the new format.
+    Transforms the content of a .tmdl table file with the new format.
 
     Operations performed:
-      1. Removes lines starting with "sourceProviderType" (if any).
-      2. Captures the table declaration line to extract the table name, handling quotes and spaces.
-      3. For each column block, captures the column name and the corresponding sourceColumn
+      1. Applies the transform rules of the table (see rules.py), which by default remove
+         the "sourceProviderType" properties (if any).
+      2. Captures the table declaration to extract the table name, handling quotes and spaces.
+      3. For each column, captures the column name and the corresponding sourceColumn
          to create the SQL query columns string in the format: "[sourceColumn] AS [columnName]".
-      4. Processes the file until the partition block is encountered, and stops processing further lines.
-      5. In the partition block, extracts the dataSource identifier from the "dataSource:" line.
+      4. Keeps everything before the partition block and drops the partition block and everything after it.
+      5. In the partition block, extracts the dataSource identifier from the "dataSource" property.
          This identifier is then used to obtain the connection info (server and database)
-         from the dataSources file.
-      6. Attempts to extract the schema and table name from the query's FROM clause (pattern: FROM [schema].[table]).
+         from the index of the dataSources file.
+      6. Attempts to extract the schema and table name from the partition query's FROM clause
+         (pattern: FROM [schema].[table]).
       7. If the table name is not found in the table declaration, it will use the one extracted from the query.
       8. If the schema is not found, "dbo" is used as the default.
-      9. Constructs a new partition block with import mode using the extracted values.
-      10. Combines the header content (everything before the partition block) with the new partition block
-          and writes the changes back to the file.
+      9. Constructs a new partition block using the extracted values (import mode by default).
+      10. Combines the header content (everything before the partition block) with the new partition block.
+    The configuration can change the partition block (see plan_partition()) and the columns
+    (see plan_column_hints()).
 
     Parameters:
-        file_path (str): Path to the .tmdl file to be transformed.
-        data_sources_path (str): Path to the dataSources.tmdl file containing the connection info.
+        content (str or Document): Content of the .tmdl file to be transformed, or its parsed document.
+        data_sources (dict): Index of the dataSources.tmdl file (see load_data_sources()).
         default_database (str, optional): Default database name if not obtained from the connection string.
+        file_path (str, optional): Path of the .tmdl file, used in the messages.
+        config (dict, optional): The configuration (see config.py).
+        expressions (dict, optional): Receives the model expressions the new partition uses, by name.
+        pruned_columns (set, optional): Lower case names of the columns to leave out (see pruning.py).
 
     Returns:
         str: The new content of the transformed file.
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+    document = as_document(content)
     
     # Check if the file is a calculationGroup table and skip processing if so
-    if any(line.strip().startswith("calculationGroup") for line in lines):
-        print(f"'{file_path}' is a calculationGroup table. Skipping...")
-        return "".join(lines)
+    if is_calculation_group_content(document):
+        log(f"'{file_path}' is a calculationGroup table. Skipping...", DEBUG)
+        return render_lines(document.lines)
 
-    header_lines = []
-    column_mappings = []   # List of tuples (sourceColumn, columnName)
-    current_column = None
-    partition_index = None
-    table_name = None
-
-    # Process lines until the partition block is encountered
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        # Stop processing if partition block is encountered
-        if stripped.startswith("partition "):
-            partition_index = i
-            break
-
-        # Capture the table declaration to extract table name (handling possible quotes)
-        if stripped.startswith("table "):
-            match = re.match(r"table\s+['\"]?([^'\"]+)['\"]?", stripped)
-            if match:
-                table_name = match.group(1).strip()
-        
-        # Remove lines starting with "sourceProviderType"
-        if stripped.startswith("sourceProviderType"):
-            continue
-        
-        # Process column declaration lines (ignoring comments starting with "///")
-        if stripped.startswith("column ") and not stripped.startswith("///"):
-            parts = stripped.split()
-            if len(parts) >= 2:
-                current_column = parts[1].strip()
-            else:
-                current_column = None
-        
-        # Capture the sourceColumn property within a column block
-        if "sourceColumn:" in stripped and current_column:
-            match = re.search(r'sourceColumn:\s*([\w\[\]]+)', stripped)
-            if match:
-                src_col = match.group(1).strip()
-                column_mappings.append((src_col, current_column))
-        
-        header_lines.append(line)
+    # Capture the table declaration to extract table name
+    table = document.find("table")
+    table_name = table.name if table is not None else None
+    columns = get_table_columns(document, pruned_columns)
+    column_hints = plan_column_hints(config, table_name, columns, get_source_mode(document), file_path=file_path)
+    
+    # Keep everything before the partition block, capturing the column mappings
+    header_lines, column_mappings = split_table_header(
+        document, pruned_columns, column_hints, get_rule_set(config).for_table(table_name)
+    )
     
-    # Process the partition block, if it exists
+    # Process the partition blocks, if they exist
     ds_identifier = None
     schema = None
     table_from_query = None
     
-    if partition_index is not None:
-        partition_lines = lines[partition_index:]
-        partition_text = "".join(partition_lines)
-        # Extract the dataSource identifier (it may be unquoted)
-        ds_match = re.search(r"dataSource:\s*'?([^'\s]+)'?", partition_text)
-        if ds_match:
-            ds_identifier = ds_match.group(1).strip()
+    for partition in document.iter_nodes("partition"):
+        # Extract the dataSource identifier (it may be quoted and contain spaces)
+        if not ds_identifier and partition.properties.get("dataSource"):
+            ds_identifier = partition.properties["dataSource"].strip()
         # Attempt to extract the schema and table from the query's FROM clause (pattern: FROM [schema].[table])
-        query_match = re.search(r'FROM\s+\[([^]]+)\]\.\[([^]]+)\]', partition_text, re.IGNORECASE)
-        if query_match:
+        query = partition.properties.get("query") or partition.properties.get("source") or ""
+        query_match = QUERY_FROM_PATTERN.search(query)
+        if query_match and not schema:
             schema = query_match.group(1).strip()
             table_from_query = query_match.group(2).strip()
     
-    # Retrieve connection info from the dataSources file using the extracted dataSource identifier
-    server = None
-    database = None
-    if ds_identifier:
-        server, database = get_connection_info(output_path, ds_identifier)
-    
-    # If default_database is provided and database was not found, use default_database
-    if default_database and not database:
-        database = default_database
-    # If database is still not set, fallback to server (or handle accordingly)
-    if not database:
-        database = server
-    
-    # Construct the SQL columns string in the format: [sourceColumn] AS [columnName]
-    columns_str = ", ".join([f"[{src}] AS [{col}]" for src, col in column_mappings])
-    
-    # If table name was not extracted from the table declaration, use the one from the query
-    if not table_name:
-        table_name = table_from_query if table_from_query else "UnknownTable"
-    
-    # Use "dbo" as default schema if not found
-    if not schema:
-        schema = "dbo"
-    
-    # Construct the new partition block in import mode using the extracted values
-    new_partition_block = f"""
-    partition '{table_name}' = m
-        mode: import
-        source =
-            let
-                Source = Sql.Database("{server}", "{database}", [Query = "SELECT {columns_str} FROM [{schema}].[{table_name}]", CreateNavigationProperties=false])
-            in
-                Source
-    """
+    partition_options = plan_partition(
+        config, table_name, columns, {} if expressions is None else expressions, file_path,
+        get_source_mode(document), data_sources
+    )
+    new_partition_block = build_partition_block(
+        table_name, ds_identifier, schema, table_from_query, column_mappings, data_sources, default_database,
+        partition_options
+    )
     
     # Combine the header content (everything before the partition block) with the new partition block
-    header_content = "".join(header_lines).rstrip()
+    header_content = render_lines(header_lines).rstrip()
     new_content = header_content + "\n\n" + new_partition_block
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(new_content)
-    
-    print("File transformed successfully.")
     return new_content
 
 
-def process_all_table_files(base_path):
+def find_semantic_models(input_path, output_path, manifest=None, config=None, shard=None, catalog=None):
     """
-    Processes all .tmdl files in the 'tables' subfolder located at base_path.
+    Finds all directories ending with '.SemanticModel' in the input_path (recursively)
+    and decides which of their files must be converted into the output_path.
+    The input is walked once (see catalog.scan_models()), and every later stage uses the
+    files, sizes and modification times found by this walk instead of listing the folders again.
+    
+    When a manifest is given, the input files are hashed and compared with the hashes
+    recorded by the previous run (files that kept their size and modification time are
+    not hashed again, see manifest.hash_files()):
+        - Unchanged models are skipped.
+        - If model.tmdl or dataSources.tmdl changed, the whole model is converted. With pruning
+          (see pruning.py), any change can change what is referenced, so the whole model is converted,
+          and so is a Tabular Editor model with a changed table and shared connection parameters
+          (see is_model_wide_change()).
+        - Otherwise only the changed files are converted, and the files removed from
+          the input are deleted from the output.
+    Models that no longer exist in the input_path are removed from the manifest.
+    With a shard, only the models of the shard are kept (see shards.py), and so is the manifest.
     
     Parameters:
-        base_path (str): The base directory containing the 'tables' subfolder.
+        input_path (str): Source directory.
+        output_path (str): Destination directory.
+        manifest (dict, optional): The manifest of the previous run (see manifest.py).
+        config (dict, optional): The configuration (see config.py).
+        shard (tuple, optional): (index, count) of the shard of the run (see shards.parse_shard()).
+        catalog (list, optional): Receives the catalog entry of every model found (see catalog.scan_models()),
+                                  including the unchanged ones.
+        
+    Returns:
+        List[dict]: The semantic models to convert. Each item has the keys:
+            - name: relative path of the model inside input_path
+            - source: the model directory inside input_path
+            - destination: the model directory inside output_path
+            - catalog: the FileInfo of the model files by relative path (see catalog.scan_files())
+            - files: hashes of the model files (None without a manifest)
+            - changed: relative paths of the files to convert, or None to convert the whole model
+            - expressions: the model expressions used by each table converted by the previous run,
+              by relative path, when only the changed files are converted
     """
-    # Construct the full path to the 'tables' folder.
-    tables_folder = os.path.join(base_path, "definition", "tables")
+    # The models are found while the tree is walked, one at a time
+    entries = scan_models(input_path)
+    if shard is not None:
+        entries = select_shard(list(entries), shard)
+    
+    models = []
+    found_models = set()
+    for entry in entries:
+        if catalog is not None:
+            catalog.append(entry)
+        directory = entry["source"]
+        # Relative path of the model inside input_path
+        relative_path = entry["name"]
+        # Construct the destination path preserving the structure
+        dest_dir = os.path.join(output_path, relative_path)
+        model = {
+            "name": relative_path,
+            "source": directory,
+            "destination": dest_dir,
+            "catalog": entry["files"],
+            "files": None,
+            "changed": None,
+            "expressions": {}
+        }
+        models.append(model)
+        
+        if manifest is None:
+            continue
+        
+        found_models.add(relative_path)
+        previous = manifest["models"].get(relative_path)
+        model["files"] = hash_files(directory, entry["files"], previous)
+        if previous is None or not os.path.isdir(dest_dir):
+            continue
+        
+        changed, removed = compare_file_hashes(previous["files"], model["files"])
+        # The output of the model is scanned once, instead of checking each file
+        dest_files = scan_files(dest_dir)
+        # A table that is missing from the output must be converted again
+        changed += [
+            path for path in model["files"]
+            if path.startswith("definition/tables/") and path not in changed and path not in dest_files
+        ]
+        
+        # Files removed from the input must not survive in the output
+        for path in removed:
+            if path in dest_files:
+                os.remove(os.path.join(dest_dir, path))
+        
+        if not changed and not removed:
+            log(f"Semantic model unchanged, skipping: {directory}", DEBUG)
+            count("files_skipped", len(model["files"]))
+            models.pop()
+        elif not is_model_wide_change(directory, changed + removed, config):
+            model["changed"] = changed
+            model["expressions"] = dict(previous.get("expressions", {}))
+            count("files_skipped", len(model["files"]) - len(changed))
     
-    # Find all .tmdl files in the tables folder.
-    tmdl_files = glob.glob(os.path.join(tables_folder, "*.tmdl"))
+    if manifest is not None:
+        # Forget the models that no longer exist in the input
+        for name in list(manifest["models"]):
+            if name not in found_models:
+                del manifest["models"][name]
     
-    # Process each .tmdl file.
-    for file_path in tmdl_files:
-        print(f"Processing file: {file_path}")
-        transform_table_file(base_path, file_path, "None")
+    return models
 
 
-def copy_semanticmodel_directories(input_path, output_path):
+def scan_table_columns(source_file, tabular_editor):
     """
-    Copies all directories ending with '.SemanticModel' from the input_path 
-    to the output_path while preserving the relative directory structure.
+    Reads the columns of a .tmdl table file line by line, before it is converted by
+    stream_table_file(), since the column hints must be known before the columns are written.
     
     Parameters:
-        input_path (str): Source directory.
-        output_path (str): Destination directory.
+        source_file (str): The .tmdl table file.
+        tabular_editor (bool): True if the model was saved by Tabular Editor.
+        
+    Returns:
+        tuple: (table_name, columns, source_mode, schema_columns) as needed by plan_column_hints().
     """
-    # Pattern to match any folder that ends with '.SemanticModel' (recursively)
-    pattern = os.path.join(input_path, '**', '*.SemanticModel')
-    # Retrieve all matching directories
-    directories = glob.glob(pattern, recursive=True)
+    tokenizer = Tokenizer()
+    # The open objects as (indent, keyword, state)
+    stack = []
+    sink = None
+    table_name = None
+    columns = []
+    modes = []
+    table_schemas = []
+    
+    with open(source_file, "r", encoding="utf-8") as source:
+        for head, rest in iter_line_parts(source):
+            line = tokenizer.classify(head)
+            if line.kind in ("object", "property"):
+                while stack and stack[-1][0] >= line.indent:
+                    stack.pop()
+                owner, state = stack[-1][1:] if stack else (None, None)
+                sink = None
+                if line.kind == "object":
+                    state = None
+                    if line.keyword == "table" and table_name is None:
+                        table_name = line.name
+                    elif line.keyword == "column" and line.name:
+                        state = {"name": line.name}
+                        columns.append(state)
+                    elif line.keyword == "annotation" and line.name == "TabularEditor_TableSchema" and tabular_editor:
+                        extractor = JsonFieldExtractor(("Columns",))
+                        table_schemas.append(extractor)
+                        sink = extractor.feed
+                    stack.append((line.indent, line.keyword, state))
+                elif owner == "column" and state is not None and (
+                        line.keyword == "sourceColumn" or line.keyword in COLUMN_METADATA_PROPERTIES):
+                    state[line.keyword] = []
+                    sink = state[line.keyword].append
+                elif owner == "partition" and line.keyword == "mode":
+                    modes.append([])
+                    sink = modes[-1].append
+                if sink is not None:
+                    sink((line.value or "") + (head[len(head.rstrip()):] if rest is not None else ""))
+            elif line.kind == "expression" and sink is not None:
+                sink(head)
+            
+            end = None
+            if rest is not None:
+                for chunk in rest:
+                    if sink is not None and line.kind in ("object", "property", "expression"):
+                        sink(chunk)
+                end = rest.drain()
+            tokenizer.end_line(line, end)
     
-    for directory in directories:
-        # Ensure it is a directory
-        if os.path.isdir(directory):
-            # Compute the relative directory path from input_path
-            relative_path = os.path.relpath(directory, input_path)
-            # Construct the destination path preserving the structure
-            dest_dir = os.path.join(output_path, relative_path)
-            # Create destination directory if needed and copy the entire folder
-            # Note: 'dirs_exist_ok=True' requires Python 3.8 or later
-            shutil.copytree(directory, dest_dir, dirs_exist_ok=True)
-            print(f"Copied directory: {directory} to {dest_dir}")
+    columns = [
+        {key: "".join(value).strip() or None if isinstance(value, list) else value for key, value in column.items()}
+        for column in columns
+    ]
+    source_mode = next((mode for mode in ("".join(parts).strip() for parts in modes) if mode), None)
+    schema_columns = None
+    for extractor in table_schemas:
+        try:
+            schema_columns = extractor.result().get("Columns")
+        except ValueError:
+            # Reported when the partition is built
+            pass
+    return table_name, columns, source_mode, schema_columns
 
 
-def copy_and_rename_reports(output_path, default_report_path):
+def scan_table_connection_tab_edtr(source):
     """
-    For each directory in the output_path that ends with '.SemanticModel',
-    capture the base name (i.e., the directory name before '.SemanticModel') and store it.
-    Then copy the folder named 'Default.Report' from default_report_path and paste it into
-    output_path with the new name '<base_name>.Report'.
-
+    Reads the connection of a .tmdl table file of a Tabular Editor model line by line, as
+    transform_table_content_tab_edtr() finds it: the server is the text of the dataSource of
+    the partitions before the first space, and the database the one of the last
+    TabularEditor_TableSchema annotation.
+    
     Parameters:
-        output_path (str): Directory where the SemanticModel directories are located.
-        default_report_path (str): Directory containing the 'Default.Report' folder.
-
+        source (file): The table file, opened in text mode.
+        
     Returns:
-        List[str]: The list of captured base names.
+        tuple: (server, database), None for the values that are not found.
     """
-    base_names = []
-    # Construct the full path for the default report folder.
-    default_report_dir = default_report_path
-    
-    if not os.path.isdir(default_report_dir):
-        print(f"Default report folder not found at: {default_report_dir}")
-        return base_names
+    tokenizer = Tokenizer()
+    # The open objects as (indent, keyword)
+    stack = []
+    sink = None
+    data_sources = []
+    table_schemas = []
     
-    # Iterate over all items in the output_path.
-    for item in os.listdir(output_path):
-        item_path = os.path.join(output_path, item)
-        # Check if the item is a directory and its name ends with '.SemanticModel'.
-        if os.path.isdir(item_path) and item.endswith(".SemanticModel"):
-            # Capture the base name (the part before '.SemanticModel').
-            base_name = item[:-len(".SemanticModel")]
-            base_names.append(base_name)
-            
-            # Define the destination report folder name.
-            dest_report_dir = os.path.join(output_path, f"{base_name}.Report")
-            
-            # If the destination already exists, remove it to allow copying.
-            if os.path.exists(dest_report_dir):
-                shutil.rmtree(dest_report_dir)
-            
-            # Copy the entire default report folder to the destination folder.
-            shutil.copytree(default_report_dir, dest_report_dir)
-            print(f"Copied report folder from '{default_report_dir}' to '{dest_report_dir}'")
+    for head, rest in iter_line_parts(source):
+        line = tokenizer.classify(head)
+        if line.kind in ("object", "property"):
+            while stack and stack[-1][0] >= line.indent:
+                stack.pop()
+            owner = stack[-1][1] if stack else None
+            sink = None
+            if line.kind == "object":
+                if line.keyword == "annotation" and line.name == "TabularEditor_TableSchema":
+                    extractor = JsonFieldExtractor(("Database",))
+                    table_schemas.append(extractor)
+                    sink = extractor.feed
+                stack.append((line.indent, line.keyword))
+            elif owner == "partition" and line.keyword == "dataSource":
+                data_sources.append([])
+                sink = data_sources[-1].append
+            if sink is not None:
+                sink((line.value or "") + (head[len(head.rstrip()):] if rest is not None else ""))
+        elif line.kind == "expression" and sink is not None:
+            sink(head)
+        
+        end = None
+        if rest is not None:
+            for chunk in rest:
+                if sink is not None and line.kind in ("object", "property", "expression"):
+                    sink(chunk)
+            end = rest.drain()
+        tokenizer.end_line(line, end)
     
-    return base_names
+    server = database = None
+    for parts in data_sources:
+        ds_value = "".join(parts).strip()
+        if ds_value.startswith("'"):
+            server = unquote_name(ds_value).split()[0]
+    for extractor in table_schemas:
+        if not extractor.received:
+            continue
+        try:
+            database = extractor.result().get("Database")
+        except ValueError:
+            # Reported when the partition is built
+            pass
+    return server, database
 
 
-def update_definition_and_platform_in_reports(output_path):
+def open_text(source, relative_path):
     """
-    For each directory in output_path that ends with '.Report',
-    update the following:
-    
-    1. In 'definition.pbir', update the "datasetReference.byPath.path" property by replacing the placeholder
-       with the actual semantic model name. The new path will be in the format:
-       "../<semantic_model_name>.SemanticModel"
-       
-    2. In '.platform', update the "metadata.displayName" property with the semantic model name.
+    Opens a text file of a file system for reading. Files of STREAMING_THRESHOLD bytes or
+    more on disk are read from the disk as needed instead of being read into memory.
     
-    Parameters:
-        output_path (str): The folder containing subdirectories ending with '.Report'.
+    Returns:
+        file: The file, to be closed by the caller.
     """
-    # Iterate over each item in the output folder.
-    for item in os.listdir(output_path):
-        item_path = os.path.join(output_path, item)
-        # Process only directories that end with ".Report"
-        if os.path.isdir(item_path) and item.endswith(".Report"):
-            # Extract the semantic model name by removing the ".Report" suffix.
-            semantic_model_name = item[:-len(".Report")]
-            
-            # Update definition.pbir
-            pbir_file = os.path.join(item_path, "definition.pbir")
-            if os.path.isfile(pbir_file):
-                try:
-                    with open(pbir_file, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    # Construct the new path using the semantic model name
-                    new_path = f"../{semantic_model_name}.SemanticModel"
-                    
-                    # Update the path in the nested structure if keys exist
-                    if ("datasetReference" in data and 
-                        "byPath" in data["datasetReference"] and 
-                        "path" in data["datasetReference"]["byPath"]):
-                        data["datasetReference"]["byPath"]["path"] = new_path
-                    else:
-                        print(f"Warning: Expected keys not found in {pbir_file}")
-                    
-                    with open(pbir_file, "w", encoding="utf-8") as f:
-                        json.dump(data, f, indent=2)
-                    
-                    print(f"Updated {pbir_file} with semantic model name '{semantic_model_name}'")
-                except Exception as e:
-                    print(f"Error updating {pbir_file}: {e}")
-            else:
-                print(f"'definition.pbir' not found in {item_path}")
-            
-            # Update .platform
-            platform_file = os.path.join(item_path, ".platform")
-            if os.path.isfile(platform_file):
-                try:
-                    with open(platform_file, "r", encoding="utf-8") as f:
-                        platform_data = json.load(f)
-                    
-                    # Update the displayName in the metadata if present
-                    if "metadata" in platform_data and "displayName" in platform_data["metadata"]:
-                        platform_data["metadata"]["displayName"] = semantic_model_name
-                    else:
-                        print(f"Warning: Expected keys not found in {platform_file}")
-                    
-                    with open(platform_file, "w", encoding="utf-8") as f:
-                        json.dump(platform_data, f, indent=2)
-                    
-                    print(f"Updated {platform_file} with displayName '{semantic_model_name}'")
-                except Exception as e:
-                    print(f"Error updating {platform_file}: {e}")
-            else:
-                print(f"'.platform' not found in {item_path}")
+    if isinstance(source, LocalFileSystem) and source.get_size(relative_path) >= STREAMING_THRESHOLD:
+        count("files_read")
+        count("bytes_in", source.get_size(relative_path))
+        return open(source.path(relative_path), "r", encoding="utf-8")
+    return io.StringIO(source.read_text(relative_path))
 
 
-def get_compatibility_level(item_path):
+def load_tabular_editor_connections(source, table_files):
     """
-    Extracts the compatibility level value from the database.tmdl file.
-    
-    The function reads the file located at "{item_path}/definition/database.tmdl" and uses a 
-    regular expression to search for the pattern "compatibilityLevel:" followed by a numeric value.
+    Builds the connection index of a Tabular Editor model, which has no dataSources.tmdl,
+    from the connections of its tables (see scan_table_connection_tab_edtr()).
     
     Parameters:
-        item_path (str): The base directory path where the 'definition/database.tmdl' file exists.
+        source (LocalFileSystem or MemoryFileSystem): The files of the semantic model.
+        table_files (list): Relative paths of the table files of the model.
         
     Returns:
-        int or None: The extracted compatibility level as an integer if found; otherwise, None.
+        dict: The (server, database, None) of each table by relative path, in the order of the
+              paths, as parse_data_sources() indexes the data sources.
     """
-    file_path = f"{item_path}/definition/database.tmdl"
-    
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-    except FileNotFoundError:
-        print(f"File not found: {file_path}")
-        return None
+    connections = {}
+    for relative_path in sorted(table_files):
+        with open_text(source, relative_path) as f:
+            server, database = scan_table_connection_tab_edtr(f)
+        connections[relative_path] = (server, database, None)
+    return connections
+
+
+def get_model_data_sources(model, config=None):
+    """
+    Returns the index of the data sources of a semantic model shared by the conversion of its
+    tables: the one of its dataSources.tmdl, or for a Tabular Editor model with shared connection
+    parameters in the configuration (see connections.py), the one of its tables.
+    
+    Parameters:
+        model (SemanticModel): The semantic model.
+        config (dict, optional): The configuration (see config.py).
+        
+    Returns:
+        dict: The index (see parse_data_sources() and load_tabular_editor_connections()).
+    """
+    if model.tabular_editor and (config or {}).get("connectionParameters"):
+        return load_tabular_editor_connections(model.source, model.table_files)
+    return model.data_sources
+
+
+def is_model_wide_change(model_source, relative_paths, config=None):
+    """
+    Checks if changed files of a semantic model can change the conversion of its other files,
+    so that the whole model must be converted again: a model level file (see MODEL_LEVEL_FILES),
+    any file with pruning (see pruning.py), or a table of a Tabular Editor model with shared
+    connection parameters (see get_model_data_sources()).
+    
+    Parameters:
+        model_source (str): The semantic model directory.
+        relative_paths (list): Relative paths of the changed (or removed) files.
+        config (dict, optional): The configuration (see config.py).
+        
+    Returns:
+        bool: True if the whole model must be converted.
+    """
+    if get_pruning_scope(config) is not None or any(path.lower() in MODEL_LEVEL_FILES for path in relative_paths):
+        return True
+    if (config or {}).get("connectionParameters") and any(is_table_file(path) for path in relative_paths):
+        return SemanticModel(LocalFileSystem(model_source)).tabular_editor
+    return False
+
+
+def stream_table_file(source_file, dest_file, tabular_editor, data_sources, default_database=None,
+                      config=None, expressions=None, pruned_columns=None):
+    """
+    Converts a .tmdl table file line by line, with the same result as convert_table() but
+    a peak memory that does not depend on the size of the file:
+        - The lines before the partition block are written to the output as they are read.
+        - The partitions are never buffered: only their dataSource is kept, and their queries
+          are searched for the FROM clause as they are read.
+        - Only the Name, Schema and Database fields are extracted from the
+          TabularEditor_TableSchema annotations, even from a huge single line.
+    Calculation groups, and tables of Tabular Editor models without the required metadata,
+    are copied unchanged. With column hints in the configuration, the columns are read first
+    (see scan_table_columns()), so the file is read twice.
+    
+    Parameters:
+        source_file (str): The .tmdl table file inside the input folder.
+        dest_file (str): The .tmdl table file inside the output folder.
+        tabular_editor (bool): True if the model was saved by Tabular Editor.
+        data_sources (dict): Index of the dataSources.tmdl file of the model.
+        default_database (str, optional): Default database name if not obtained from the connection string.
+        config (dict, optional): The configuration (see config.py).
+        expressions (dict, optional): Receives the model expressions the new partition uses, by name.
+        pruned_columns (set, optional): Lower case names of the columns to leave out (see pruning.py).
+        
+    Returns:
+        str or None: The error message if the table could not be transformed; otherwise, None.
+    """
+    tokenizer = Tokenizer()
+    pruner = ColumnPruner(pruned_columns) if pruned_columns else None
+    rule_set = get_rule_set(config)
+    # The transform rules of the table, chosen from its name
+    rule_filter = None
+    hinter = None
+    if get_hint_settings(config) is not None:
+        # The hints are needed before the columns are written: the file is read twice
+        table_name, columns, source_mode, schema_columns = scan_table_columns(source_file, tabular_editor)
+        columns = [column for column in columns if column["name"].lower() not in (pruned_columns or ())]
+        column_hints = plan_column_hints(config, table_name, columns, source_mode, schema_columns, source_file)
+        hinter = ColumnHintWriter(column_hints) if column_hints else None
+    # The open objects as (indent, keyword, state), state being the dict of a column or partition
+    stack = []
+    # Receives the text of the open multi-line expression, if needed
+    expression_sink = None
+    in_header = True
+    calculation_group = False
+    table_name = None
+    columns = []
+    partitions = []
+    table_schemas = []
+    error = None
+    
+    temp_file = dest_file + ".tmp"
+    os.makedirs(os.path.dirname(dest_file) or ".", exist_ok=True)
+    try:
+        with open(source_file, "r", encoding="utf-8") as source, open(temp_file, "w", encoding="utf-8") as dest:
+            writer = TrimmedWriter(dest)
+        
+            for head, rest in iter_line_parts(source):
+                line = tokenizer.classify(head)
+                if rest is not None and in_header and (
+                        (pruner is not None and line.kind == "comment")
+                        or (rule_filter is not None and rule_filter.needs_whole_line(line))
+                        or (hinter is not None and hinter.needs_whole_line(line))):
+                    # A description is held whole until the next object shows if it is kept,
+                    # and the properties with rules or hints are rewritten whole
+                    line = tokenizer.classify(head + "".join(rest))
+                    head, rest = line.text, None
+                kind = line.kind
+                sink = None
+            
+                if kind == "expression":
+                    sink = expression_sink
+                elif kind == "object":
+                    while stack and stack[-1][0] >= line.indent:
+                        stack.pop()
+                    state = None
+                    if line.keyword == "calculationGroup":
+                        calculation_group = True
+                        break
+                    elif line.keyword == "table" and table_name is None:
+                        table_name = line.name
+                        if in_header:
+                            rule_filter = rule_set.for_table(table_name)
+                    elif line.keyword == "partition":
+                        # Everything from the first partition block is replaced
+                        in_header = False
+                        state = {"dataSource": None, "query": None, "source": None, "mode": None}
+                        partitions.append(state)
+                    elif line.keyword == "column" and line.name and line.name.lower() not in (pruned_columns or ()):
+                        state = {"name": line.name, "sourceColumn": None, "dataType": None}
+                        columns.append(state)
+                    elif line.keyword == "annotation" and line.name == "TabularEditor_TableSchema" and tabular_editor:
+                        extractor = JsonFieldExtractor(("Name", "Schema", "Database"))
+                        table_schemas.append(extractor)
+                        sink = extractor.feed
+                    stack.append((line.indent, line.keyword, state))
+                    expression_sink = sink
+                elif kind == "property":
+                    while stack and stack[-1][0] >= line.indent:
+                        stack.pop()
+                    owner = stack[-1][1] if stack else None
+                    state = stack[-1][2] if stack else None
+                    if owner == "partition" and line.keyword in ("dataSource", "mode"):
+                        state[line.keyword] = []
+                        sink = state[line.keyword].append
+                    elif owner == "partition" and line.keyword in ("query", "source"):
+                        state[line.keyword] = RollingSearch(QUERY_FROM_PATTERN)
+                        sink = state[line.keyword].feed
+                    elif owner == "column" and state is not None and line.keyword in ("sourceColumn", "dataType"):
+                        state[line.keyword] = []
+                        sink = state[line.keyword].append
+                    expression_sink = sink
+            
+                keep = False
+                if in_header:
+                    for kept in filter_header_line(line, pruner, rule_filter, hinter):
+                        if kept is line:
+                            keep = True
+                            writer.write(head)
+                        else:
+                            writer.write(kept.text)
+                if sink is not None:
+                    if kind == "expression":
+                        sink(head)
+                    else:
+                        # The whitespace cut from the end of the first block of a long line is part of the value
+                        sink((line.value or "") + (head[len(head.rstrip()):] if rest is not None else ""))
+            
+                end = None
+                if rest is not None:
+                    for chunk in rest:
+                        if keep:
+                            writer.write(chunk)
+                        if sink is not None:
+                            sink(chunk)
+                    end = rest.drain()
+                tokenizer.end_line(line, end)
+        
+            # The descriptions still held, e.g. of the first partition
+            for held in flush_header_filters(pruner, rule_filter, hinter):
+                writer.write(held.text)
+            new_partition_block = None
+            if calculation_group:
+                log(f"'{source_file}' is a calculationGroup table. Skipping...", DEBUG)
+            else:
+                columns = [
+                    {key: "".join(value).strip() or None if isinstance(value, list) else value
+                     for key, value in column.items()}
+                    for column in columns
+                ]
+                column_mappings = [
+                    (column["sourceColumn"], column["name"]) for column in columns if column["sourceColumn"]
+                ]
+                source_mode = next(
+                    (mode for mode in ("".join(partition["mode"] or []).strip() for partition in partitions) if mode),
+                    None
+                )
+                table_expressions = {}
+                partition_options = plan_partition(
+                    config, table_name, columns, table_expressions, source_file, source_mode, data_sources
+                )
+                data_source_values = ["".join(partition["dataSource"] or []) for partition in partitions]
+            
+                if tabular_editor:
+                    server = table = schema = database = None
+                    for ds_value in data_source_values:
+                        if ds_value and ds_value.startswith("'"):
+                            server = unquote_name(ds_value).split()[0]
+                    # The last annotation wins
+                    for extractor in table_schemas:
+                        if not extractor.received:
+                            continue
+                        try:
+                            table_schema = extractor.result()
+                            table = table_schema.get("Name")
+                            schema = table_schema.get("Schema")
+                            database = table_schema.get("Database")
+                        except ValueError as e:
+                            log(f"Error parsing JSON in TableSchema: {e}", ERROR)
+                    new_partition_block = build_partition_block_tab_edtr(
+                        server, table, schema, database, column_mappings, partition_options
+                    )
+                    if new_partition_block is None:
+                        error = "Failed to extract all required metadata from partition block."
+                else:
+                    ds_identifier = schema = table_from_query = None
+                    for ds_value, partition in zip(data_source_values, partitions):
+                        if not ds_identifier and ds_value:
+                            ds_identifier = ds_value.strip()
+                        # The query, or the source expression if there is no query
+                        search = partition["query"]
+                        if search is None or search.empty:
+                            search = partition["source"]
+                        if search is not None and search.match and not schema:
+                            schema = search.match.group(1).strip()
+                            table_from_query = search.match.group(2).strip()
+                    new_partition_block = build_partition_block(
+                        table_name, ds_identifier, schema, table_from_query, column_mappings, data_sources,
+                        default_database, partition_options
+                    )
+        
+            if new_partition_block is None:
+                # The table is copied unchanged
+                source.seek(0)
+                dest.seek(0)
+                dest.truncate()
+                shutil.copyfileobj(source, dest)
+            else:
+                dest.write("\n\n" + new_partition_block)
+                if expressions is not None:
+                    expressions.update(table_expressions)
+    
+        count("files_read")
+        count("bytes_in", os.path.getsize(source_file))
+        if has_same_content(temp_file, dest_file):
+            # The output is left alone, with its modification time
+            os.remove(temp_file)
+            count("files_unchanged")
+        else:
+            count("files_written")
+            count("bytes_out", os.path.getsize(temp_file))
+            os.replace(temp_file, dest_file)
+    except BaseException:
+        # Never leave a partial file behind in the output folder
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return error
+
+
+def convert_table(source, dest, relative_path, tabular_editor, data_sources, config=None, expressions=None,
+                  pruned_columns=None):
+    """
+    Converts a single table file from the source file system into the destination.
+    If the table cannot be transformed, its content is copied unchanged.
+    
+    Parameters:
+        source (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the input.
+        dest (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the output.
+        relative_path (str): Relative path of the .tmdl table file.
+        tabular_editor (bool): True if the model was saved by Tabular Editor.
+        data_sources (dict): Index of the dataSources.tmdl file of the model (see load_data_sources()).
+        config (dict, optional): The configuration (see config.py).
+        expressions (dict, optional): Receives the model expressions the new partition uses, by name.
+        pruned_columns (set, optional): Lower case names of the columns to leave out (see pruning.py).
+        
+    Returns:
+        str or None: The error message if the table could not be transformed; otherwise, None.
+    """
+    file_path = source.path(relative_path)
+    log(f"Processing file: {file_path}", DEBUG)
+    if (isinstance(source, LocalFileSystem) and isinstance(dest, LocalFileSystem)
+            and source.get_size(relative_path) >= STREAMING_THRESHOLD):
+        # Huge tables are converted line by line, never holding the whole file in memory
+        return stream_table_file(
+            file_path, dest.path(relative_path), tabular_editor, data_sources, "None", config, expressions,
+            pruned_columns
+        )
     
-    # Use a regular expression to find the compatibilityLevel value.
-    match = re.search(r"compatibilityLevel:\s*(\d+)", content)
-    if match:
-        return int(match.group(1))
+    content = source.read_text(relative_path)
+    # The file is parsed once and every transform runs on the same tree
+    document = parse_tmdl(content)
+    error = None
+    
+    if is_calculation_group_content(document):
+        log(f"'{file_path}' is a calculationGroup table. Skipping...", DEBUG)
+        new_content = content
+    elif tabular_editor:
+        new_content = transform_table_content_tab_edtr(
+            document, config, expressions, file_path, pruned_columns, data_sources
+        )
+        if new_content is None:
+            error = "Failed to extract all required metadata from partition block."
     else:
-        print("compatibilityLevel not found in the file.")
-        return None
+        new_content = transform_table_content(
+            document, data_sources, "None", file_path, config, expressions, pruned_columns
+        )
+    
+    dest.write_text(relative_path, content if new_content is None else new_content)
+    return error
 
 
-def is_tabular_editor(item_path):
+def convert_tables(source, dest, relative_paths, tabular_editor, data_sources, config=None, table_expressions=None,
+                   pruned_columns=None):
+    """
+    Converts table files of one semantic model. Every file is converted independently
+    and its errors are collected instead of stopping the others.
+    
+    Parameters:
+        source (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the input.
+        dest (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the output.
+        relative_paths (list): Relative paths of the table files to convert.
+        tabular_editor (bool): True if the model was saved by Tabular Editor.
+        data_sources (dict): Index of the dataSources.tmdl file of the model.
+        config (dict, optional): The configuration (see config.py).
+        table_expressions (dict, optional): Receives the model expressions used by each converted table,
+                                            by relative path (see write_model_expressions()).
+        pruned_columns (dict, optional): The lower case names of the columns to leave out of each table,
+                                         by relative path (see pruning.py).
+        
+    Returns:
+        list: (relative_path, error message) for each table that could not be transformed.
     """
+    errors = []
+    for relative_path in relative_paths:
+        expressions = {}
+        try:
+            error = convert_table(
+                source, dest, relative_path, tabular_editor, data_sources, config, expressions,
+                (pruned_columns or {}).get(relative_path)
+            )
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            expressions = {}
+        if table_expressions is not None:
+            table_expressions[relative_path] = expressions
+        if error is not None:
+            errors.append((relative_path, error))
+    return errors
+
+
+def convert_model_file(source, dest, relative_path, model_document, pruned_tables=(), config=None):
     """
-    with open(f"{item_path}/definition/model.tmdl", "r", encoding="utf-8") as f:
-        lines = f.readlines()
+    Converts a file of a semantic model that is not a table:
+        - definition/database.tmdl is written with the updated compatibilityLevel.
+        - definition/model.tmdl is written with the filtered content, without the pruned tables.
+        - definition/dataSources.tmdl is not part of the converted model and is removed.
+        - definition/expressions.tmdl is left to write_model_expressions().
+        - Any other file is written with the transform rules that apply to it (see rules.py), or
+          copied (hard-linked on request) without being parsed if there are none.
     
-    # Check if some row starts with "annotation __TEdtr"
-    if any(line.strip().startswith("annotation __TEdtr") for line in lines):
-        print(f"'{item_path}' is a Tabular Editor model.")
-        return True
+    Parameters:
+        source (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the input.
+        dest (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the output.
+        relative_path (str): Relative path of the file.
+        model_document (Document): The parsed model.tmdl of the semantic model.
+        pruned_tables (iterable, optional): Names of the tables left out of the model (see pruning.py).
+        config (dict, optional): The configuration (see config.py).
+    """
+    lower_path = relative_path.lower()
+    
+    if lower_path == "definition/datasources.tmdl":
+        # The data sources are not part of the converted model
+        dest.remove(relative_path)
+    elif lower_path == "definition/database.tmdl":
+        dest.write_text(relative_path, update_database_content(source.read_text(relative_path), config))
+    elif lower_path == "definition/model.tmdl":
+        dest.write_text(relative_path, clean_model_content(model_document, pruned_tables, config))
+    elif lower_path == EXPRESSIONS_FILE.lower():
+        # Written once the tables are converted, with the expressions they need
+        pass
     else:
-        print(f"'{item_path}' is not a Tabular Editor model.")
+        rule_filter = get_rule_set(config).for_file(relative_path) if relative_path.endswith(".tmdl") else None
+        if rule_filter is None:
+            dest.copy_from(source, relative_path)
+        else:
+            dest.write_text(relative_path, apply_rules(source.read_text(relative_path), rule_filter))
+
+
+def merge_expressions(content, expressions):
+    """
+    Adds expressions to the content of an expressions.tmdl file. The expressions the file
+    already declares are kept as they are.
+    
+    Parameters:
+        content (str): Content of the expressions.tmdl file, empty if the model has none.
+        expressions (dict): The M expression of each parameter or query to declare, by name.
+        
+    Returns:
+        str: The new content.
+    """
+    declared = {node.name.lower() for node in as_document(content).iter_nodes("expression") if node.name}
+    blocks = [
+        f"expression {quote_name(name)} = {definition}\n"
+        for name, definition in sorted(expressions.items()) if name.lower() not in declared
+    ]
+    if content.strip():
+        blocks.insert(0, content.rstrip() + "\n")
+    return "\n".join(blocks)
+
+
+def write_model_expressions(source, dest, table_expressions):
+    """
+    Writes the expressions.tmdl file of a converted semantic model: the one of the input,
+    with the expressions used by the converted tables added (see merge_expressions()).
+    
+    Parameters:
+        source (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the input.
+        dest (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the output.
+        table_expressions (dict): The expressions used by each table of the model, by relative path
+                                  (see convert_tables()).
+    """
+    expressions = {}
+    for relative_path in sorted(table_expressions):
+        expressions.update(table_expressions[relative_path])
+    
+    relative_path = find_file(source, EXPRESSIONS_FILE)
+    if expressions:
+        content = source.read_text(relative_path) if relative_path else ""
+        dest.write_text(relative_path or EXPRESSIONS_FILE, merge_expressions(content, expressions))
+    elif relative_path:
+        dest.copy_from(source, relative_path)
+    else:
+        dest.remove(EXPRESSIONS_FILE)
+
+
+def plan_pruning(model, config):
+    """
+    Builds the reference graph of a semantic model and chooses the unreferenced tables and
+    columns to leave out of it (see pruning.py).
+    
+    Parameters:
+        model (SemanticModel): The semantic model.
+        config (dict): The configuration (see config.py), or None.
+        
+    Returns:
+        tuple: (pruned_tables, pruned_columns) as returned by ReferenceGraph.plan(), both empty
+               without a "pruning" section in the configuration.
+    """
+    scope = get_pruning_scope(config)
+    if scope is None:
+        return {}, {}
+    
+    graph = ReferenceGraph()
+    for relative_path in model.files:
+        if not relative_path.startswith("definition/") or not relative_path.endswith(".tmdl"):
+            continue
+        # The tables are read again when converted, so their content is not kept
+        reader = model.source if is_table_file(relative_path) else model
+        graph.add_file(relative_path, reader.read_text(relative_path))
+    return graph.plan(scope)
+
+
+def prepare_semantic_model(source, dest, changed_files=None, config=None):
+    """
+    Converts the files of a semantic model that are not tables from the source file system
+    into the destination (see convert_model_file()), and returns what is needed to convert
+    its tables.
+    
+    The model is loaded into a SemanticModel, so each definition file is read once, and the
+    converted files are written to the destination in one batch at the end. With a "pruning"
+    section in the configuration, the unreferenced tables are left out (see plan_pruning()).
+    
+    Parameters:
+        source (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the input.
+        dest (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the output.
+        changed_files (list, optional): Relative paths of the files to convert. Defaults to every file.
+        config (dict, optional): The configuration (see config.py).
+        
+    Returns:
+        tuple: (table_files, tabular_editor, data_sources, pruned_columns) where table_files are the
+               relative paths of the tables to convert, and pruned_columns the columns to leave out
+               of each table (see convert_tables()).
+    """
+    log(f"Processing semantic model: {source.path('')}", DEBUG)
+    model = SemanticModel(source)
+    
+    if changed_files is None:
+        changed_files = model.files
+    pruned_tables, pruned_columns = plan_pruning(model, config)
+    
+    table_files = []
+    for relative_path in changed_files:
+        if relative_path in pruned_tables:
+            # The table may be left in the output by a run without pruning
+            model.remove(relative_path)
+        elif is_table_file(relative_path):
+            table_files.append(relative_path)
+        else:
+            convert_model_file(model, model, relative_path, model.model_document, pruned_tables.values(), config)
+    model.flush(dest)
+    
+    # The dataSources.tmdl is parsed once and shared by all the tables
+    data_sources = get_model_data_sources(model, config) if table_files else {}
+    return sorted(table_files), model.tabular_editor, data_sources, pruned_columns
+
+
+def convert_semantic_model_files(source, dest, changed_files=None, config=None, table_expressions=None):
+    """
+    Converts a semantic model from the source file system into the destination in a single pass.
+    Each input file is read once and only the final output is written
+    (see prepare_semantic_model(), convert_table() and write_model_expressions()).
+    
+    Parameters:
+        source (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the input.
+        dest (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the output.
+        changed_files (list, optional): Relative paths of the files to convert. Defaults to every file.
+        config (dict, optional): The configuration (see config.py).
+        table_expressions (dict, optional): The expressions used by the tables converted before, by
+                                            relative path, updated with the tables converted now.
+        
+    Returns:
+        dict: The error message of each table file that could not be transformed, by relative path.
+              Their content is copied unchanged.
+    """
+    if table_expressions is None:
+        table_expressions = {}
+    table_files, tabular_editor, data_sources, pruned_columns = prepare_semantic_model(
+        source, dest, changed_files, config
+    )
+    errors = convert_tables(
+        source, dest, table_files, tabular_editor, data_sources, config, table_expressions, pruned_columns
+    )
+    finish_semantic_model(source, dest, table_expressions)
+    return dict(errors)
+
+
+def finish_semantic_model(source, dest, table_expressions):
+    """
+    Last step of the conversion of a semantic model, once its tables are converted: writes
+    the expressions.tmdl file with the expressions used by the tables that still exist.
+    
+    Parameters:
+        source (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the input.
+        dest (LocalFileSystem or MemoryFileSystem): The files of the semantic model in the output.
+        table_expressions (dict): The expressions used by each table, by relative path. The tables
+                                  removed from the input are dropped from it.
+    """
+    for relative_path in list(table_expressions):
+        if not source.exists(relative_path):
+            del table_expressions[relative_path]
+    write_model_expressions(source, dest, table_expressions)
+
+
+def convert_table_file(source_file, dest_file, tabular_editor, data_sources, config=None, expressions=None):
+    """
+    Converts a single table file from source_file into dest_file, a file with the same name
+    in another folder (see convert_table()).
+    
+    Returns:
+        str or None: The error message if the table could not be transformed; otherwise, None.
+    """
+    source = LocalFileSystem(os.path.dirname(source_file))
+    dest = LocalFileSystem(os.path.dirname(dest_file))
+    return convert_table(
+        source, dest, os.path.basename(source_file), tabular_editor, data_sources, config, expressions
+    )
+
+
+def convert_table_batch(source_path, dest_path, relative_paths, tabular_editor, data_sources,
+                        config=None, table_expressions=None, pruned_columns=None):
+    """
+    Converts a batch of table files of one semantic model folder (see convert_tables()).
+    This is the unit of work sent to the worker processes.
+    
+    Parameters:
+        source_path (str): The semantic model directory inside the input folder.
+        dest_path (str): The semantic model directory inside the output folder.
+        relative_paths (list): Relative paths of the table files to convert.
+        tabular_editor (bool): True if the model was saved by Tabular Editor.
+        data_sources (dict): Index of the dataSources.tmdl file of the model.
+        config (dict, optional): The configuration (see config.py).
+        table_expressions (dict, optional): Receives the model expressions used by each table, by relative path.
+        pruned_columns (dict, optional): The columns to leave out of each table, by relative path.
+        
+    Returns:
+        list: (relative_path, error message) for each table that could not be transformed.
+    """
+    return convert_tables(
+        LocalFileSystem(source_path), LocalFileSystem(dest_path), relative_paths, tabular_editor, data_sources,
+        config, table_expressions, pruned_columns
+    )
+
+
+def convert_table_batch_in_worker(source_path, dest_path, relative_paths, tabular_editor, data_sources, config=None,
+                                  pruned_columns=None):
+    """
+    Runs convert_table_batch() in a worker process, collecting its counters separately
+    so the main process can add them to the metrics of the run.
+    
+    Returns:
+        tuple: (errors, counters, table_expressions) where errors is the result of convert_table_batch().
+    """
+    previous = set_metrics(RunMetrics(get_metrics().verbosity))
+    try:
+        table_expressions = {}
+        errors = convert_table_batch(
+            source_path, dest_path, relative_paths, tabular_editor, data_sources, config, table_expressions,
+            pruned_columns
+        )
+        return errors, get_metrics().counters, table_expressions
+    finally:
+        set_metrics(previous)
+
+
+def prepare_semantic_model_directory(source_path, dest_path, changed_files=None, link=False, config=None,
+                                     source_files=None):
+    """
+    Converts the model level files of a semantic model straight from source_path into
+    dest_path (see prepare_semantic_model()). The files copied unchanged are hard-linked if link is True.
+    source_files are the files of source_path found by the catalog, if scanned (see catalog.py).
+    
+    Returns:
+        tuple: (table_files, tabular_editor, data_sources, pruned_columns), see prepare_semantic_model().
+    """
+    return prepare_semantic_model(
+        LocalFileSystem(source_path, files=source_files), LocalFileSystem(dest_path, link), changed_files, config
+    )
+
+
+def convert_semantic_model_directory(source_path, dest_path, changed_files=None, link=False,
+                                     config=None, table_expressions=None, source_files=None):
+    """
+    Converts a semantic model straight from source_path into dest_path in a single pass,
+    without copying it first (see convert_semantic_model_files()).
+    
+    Parameters:
+        source_path (str): The semantic model directory inside the input folder.
+        dest_path (str): The semantic model directory inside the output folder.
+        changed_files (list, optional): Relative paths of the files to convert. Defaults to every file.
+        link (bool, optional): Hard-link the files copied unchanged instead of copying them.
+        config (dict, optional): The configuration (see config.py).
+        table_expressions (dict, optional): The expressions used by the tables converted before, by
+                                            relative path, updated with the tables converted now.
+        source_files (dict, optional): The FileInfo of the files of source_path by relative path, when
+                                       scanned by the catalog (see catalog.py).
+        
+    Returns:
+        dict: The error message of each table file that could not be transformed, by relative path.
+              Their content is copied unchanged.
+    """
+    return convert_semantic_model_files(
+        LocalFileSystem(source_path, files=source_files), LocalFileSystem(dest_path, link), changed_files, config,
+        table_expressions
+    )
+
+
+def convert_all_semantic_models(models, jobs=1, link=False, config=None):
+    """
+    Converts the semantic models found by find_semantic_models().
+    
+    The model level files are converted in the main process. With more than one job, the
+    table files of all the models are then converted in parallel by a pool of worker processes,
+    in batches of tables of the same model. Each output file is written by exactly one worker,
+    so the result does not depend on the scheduling, and the errors are reported per file in
+    the order of the models and tables. The expressions.tmdl of each model is written last,
+    from the "expressions" of the model updated with the tables converted now.
+    
+    Parameters:
+        models (list): The semantic models to convert.
+        jobs (int, optional): Number of worker processes. 1 converts everything in the main process.
+        link (bool, optional): Hard-link the input files that need no conversion instead of copying them.
+        config (dict, optional): The configuration (see config.py).
+        
+    Returns:
+        dict: For each model name, the error message of each table that could not be transformed.
+    """
+    failures = {model["name"]: {} for model in models}
+    
+    if jobs <= 1:
+        for model in models:
+            failures[model["name"]] = convert_semantic_model_directory(
+                model["source"], model["destination"], model["changed"], link,
+                config, model.setdefault("expressions", {}), model.get("catalog")
+            )
+        return failures
+    
+    # The workers print with the verbosity of the main process and send their counters back
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(get_metrics().verbosity,)) as executor:
+        batches = []
+        for model in models:
+            table_files, tabular_editor, data_sources, pruned_columns = prepare_semantic_model_directory(
+                model["source"], model["destination"], model["changed"], link, config, model.get("catalog")
+            )
+            # Split the tables in a few batches per worker to balance the load
+            # without sending the data source index with every single table
+            batch_size = max(1, min(64, len(table_files) // (jobs * 4)))
+            for start in range(0, len(table_files), batch_size):
+                batch = table_files[start:start + batch_size]
+                future = executor.submit(
+                    convert_table_batch_in_worker, model["source"], model["destination"],
+                    batch, tabular_editor, data_sources, config,
+                    {path: pruned_columns[path] for path in batch if path in pruned_columns}
+                )
+                batches.append((model, future))
+        
+        for model, future in batches:
+            errors, counters, table_expressions = future.result()
+            get_metrics().merge(counters)
+            model.setdefault("expressions", {}).update(table_expressions)
+            for relative_path, error in errors:
+                failures[model["name"]][relative_path] = error
+    
+    for model in models:
+        finish_semantic_model(
+            LocalFileSystem(model["source"], files=model.get("catalog")), LocalFileSystem(model["destination"], link),
+            model.setdefault("expressions", {})
+        )
+    return failures
+
+
+def load_report_template(default_report_path):
+    """
+    Loads the 'Default.Report' folder into memory, so that it is read once per run
+    instead of once per report. definition.pbir and .platform are kept parsed,
+    to be rendered with the name of each semantic model.
+    
+    Parameters:
+        default_report_path (str): Directory containing the 'Default.Report' folder.
+        
+    Returns:
+        dict or None: The template, or None if the folder does not exist. It has the keys:
+            - path: the template directory
+            - files: the content (bytes) of each file, by relative path
+            - pbir: the parsed definition.pbir, or None
+            - platform: the parsed .platform, or None
+    """
+    if not os.path.isdir(default_report_path):
+        return None
+    
+    files = {}
+    for root, _, names in os.walk(default_report_path):
+        for name in names:
+            file_path = os.path.join(root, name)
+            relative_path = os.path.relpath(file_path, default_report_path).replace(os.sep, "/")
+            with open(file_path, "rb") as f:
+                files[relative_path] = f.read()
+            count("files_read")
+            count("bytes_in", len(files[relative_path]))
+    
+    template = {"path": default_report_path, "files": files, "pbir": None, "platform": None}
+    for key, relative_path in (("pbir", "definition.pbir"), ("platform", ".platform")):
+        if relative_path not in files:
+            continue
+        try:
+            template[key] = json.loads(files[relative_path].decode("utf-8"))
+        except ValueError as e:
+            log(f"Error parsing {relative_path} of the default report: {e}", ERROR)
+    return template
+
+
+def render_report_files(template, semantic_model_name):
+    """
+    Renders the files of the report of a semantic model from the template:
+        - "datasetReference.byPath.path" of 'definition.pbir' points to "../<semantic_model_name>.SemanticModel".
+        - "metadata.displayName" of '.platform' is the semantic model name.
+    
+    Parameters:
+        template (dict): The template returned by load_report_template().
+        semantic_model_name (str): Name of the semantic model.
+        
+    Returns:
+        dict: The rendered content (str) of the files that differ from the template, by relative path.
+    """
+    rendered = {}
+    
+    # The template is shared by all the reports (and threads), so it is rendered on copies
+    data = copy.deepcopy(template["pbir"])
+    if data is not None:
+        if ("datasetReference" in data and
+            "byPath" in data["datasetReference"] and
+            "path" in data["datasetReference"]["byPath"]):
+            data["datasetReference"]["byPath"]["path"] = f"../{semantic_model_name}.SemanticModel"
+        else:
+            log("Warning: Expected keys not found in the definition.pbir of the default report", INFO)
+        rendered["definition.pbir"] = json.dumps(data, indent=2)
+    
+    platform_data = copy.deepcopy(template["platform"])
+    if platform_data is not None:
+        if "metadata" in platform_data and "displayName" in platform_data["metadata"]:
+            platform_data["metadata"]["displayName"] = semantic_model_name
+        else:
+            log("Warning: Expected keys not found in the .platform of the default report", INFO)
+        rendered[".platform"] = json.dumps(platform_data, indent=2)
+    
+    return rendered
+
+
+def is_template_link(dest_file, template_file):
+    """
+    Checks if a file of a report is a hard link of the file of the template.
+    
+    Parameters:
+        dest_file (str): The file of the report.
+        template_file (str): The same file in the template directory.
+        
+    Returns:
+        bool: True if both files exist and are the same file on disk.
+    """
+    if os.path.islink(dest_file) or not os.path.isfile(dest_file) or not os.path.isfile(template_file):
         return False
+    return os.stat(dest_file).st_nlink > 1 and os.path.samefile(dest_file, template_file)
 
 
-def process_all_semantic_models(output_path):
+def write_report_directory(template, dest_report_dir, semantic_model_name):
     """
-    Iterates over every directory in output_path that ends with '.SemanticModel'
-    and processes it using process_semantic_model().
+    Writes the report of a semantic model from the template. Files that already have the
+    expected content are left alone (see write_bytes_file()), the other template files are
+    copied (never linked, so editing a report cannot change the template) and files that
+    are not part of the template are removed.
     
     Parameters:
-        output_path (str): The base folder that contains semantic model directories.
+        template (dict): The template returned by load_report_template().
+        dest_report_dir (str): The '<semantic_model_name>.Report' directory.
+        semantic_model_name (str): Name of the semantic model.
+        
+    Returns:
+        bool: True if any file of the report was written or removed.
     """
-    for item in os.listdir(output_path):
-        item_path = os.path.join(output_path, item)
-        # Check if it is a directory and its name ends with '.SemanticModel'
-        if os.path.isdir(item_path) and item.endswith(".SemanticModel"):
-            print(f"Processing semantic model: {item_path}")
+    rendered = render_report_files(template, semantic_model_name)
+    changed = False
+    
+    for relative_path, template_content in template["files"].items():
+        dest_file = os.path.join(dest_report_dir, relative_path)
+        
+        # Files hard-linked to the template by earlier versions are copied again
+        if is_template_link(dest_file, os.path.join(template["path"], relative_path)):
+            os.remove(dest_file)
+        
+        if relative_path in rendered:
+            changed = write_text_file(dest_file, rendered[relative_path]) or changed
+        else:
+            changed = write_bytes_file(dest_file, template_content) or changed
+    
+    # Files that are not part of the template do not survive, as with a fresh copy
+    if os.path.isdir(dest_report_dir):
+        for root, _, names in os.walk(dest_report_dir):
+            for name in names:
+                file_path = os.path.join(root, name)
+                relative_path = os.path.relpath(file_path, dest_report_dir).replace(os.sep, "/")
+                if relative_path not in template["files"]:
+                    os.remove(file_path)
+                    changed = True
+    
+    return changed
 
-            if is_tabular_editor(item_path) == True:
-                process_all_table_files_tab_edtr(item_path)
-            else:
-                process_all_table_files(item_path)
 
-            update_database_tmdl(item_path) 
-            clean_definition_model(item_path)  
-            delete_definition_datasources(item_path)
+def list_report_models(output_path, model_names=None):
+    """
+    Lists the semantic models that get a report.
+    
+    Parameters:
+        output_path (str): Directory where the SemanticModel directories are located.
+        model_names (list, optional): The models of the run, by relative path (see catalog.scan_models()),
+                                      nested ones included. Defaults to the '.SemanticModel' directories
+                                      at the top of output_path.
+        
+    Returns:
+        list: The sorted relative paths of the semantic model directories.
+    """
+    if model_names is not None:
+        return sorted(model_names)
+    return [
+        item for item in sorted(os.listdir(output_path))
+        if item.endswith(".SemanticModel") and os.path.isdir(os.path.join(output_path, item))
+    ]
+
+
+def copy_and_rename_reports(output_path, default_report_path, model_names=None):
+    """
+    For each semantic model directory in the output_path (see list_report_models()),
+    capture the base name (i.e., the directory name before '.SemanticModel') and store it.
+    Then render the folder named 'Default.Report' from default_report_path next to the
+    model with the new name '<base_name>.Report', with its 'definition.pbir' and
+    '.platform' files already pointing to the semantic model (see write_report_directory()).
+    
+    The template is loaded once, and reports that are already up to date are left alone.
+
+    Parameters:
+        output_path (str): Directory where the SemanticModel directories are located.
+        default_report_path (str): Directory containing the 'Default.Report' folder.
+        model_names (list, optional): The models found by the catalog of the run, by relative path.
+
+    Returns:
+        List[str]: The list of captured base names.
+    """
+    base_names = []
+    
+    template = load_report_template(default_report_path)
+    if template is None:
+        log(f"Default report folder not found at: {default_report_path}", ERROR)
+        return base_names
+    
+    for model_name in list_report_models(output_path, model_names):
+        # Capture the base name (the part before '.SemanticModel').
+        base_name = os.path.basename(model_name)[:-len(".SemanticModel")]
+        base_names.append(base_name)
+        
+        # Define the destination report folder, next to the semantic model.
+        dest_report_dir = get_report_path(output_path, model_name)
+        
+        if write_report_directory(template, dest_report_dir, base_name):
+            log(f"Rendered report folder '{dest_report_dir}' from '{default_report_path}'", DEBUG)
+        else:
+            log(f"Report folder unchanged, skipping: {dest_report_dir}", DEBUG)
+    
+    return base_names
+
+
+# Deprecated in-place API
+#
+# Before the single-pass pipeline, the semantic models were copied into the output folder and
+# then converted in place, file by file. The functions below keep the names and parameters of
+# that API for the scripts written against it: they run the transforms of the pipeline on the
+# files of a model folder, and warn that they will be removed.
+
+def warn_deprecated(name, replacement):
+    warnings.warn(
+        f"{name}() is deprecated and will be removed, use {replacement} instead", DeprecationWarning, stacklevel=3
+    )
+
+
+def convert_in_place(item_path, relative_paths=None):
+    """
+    Converts files of a semantic model directory in place (see convert_semantic_model_files()).
+    The files are read into memory first, so each one is converted from its original content.
+    
+    Parameters:
+        item_path (str): The semantic model directory.
+        relative_paths (list, optional): Relative paths of the files to convert. Defaults to every file.
+        
+    Returns:
+        dict: The error message of each table file that could not be transformed, by relative path.
+    """
+    files = LocalFileSystem(item_path)
+    source = MemoryFileSystem({relative_path: files.read_bytes(relative_path) for relative_path in files.list_files()})
+    return convert_semantic_model_files(source, files, relative_paths)
+
+
+def read_converted_file(item_path, relative_path, errors=None):
+    """
+    Returns:
+        str or None: The content of a file converted by convert_in_place(), None if it does not
+                     exist or could not be transformed.
+    """
+    file_path = os.path.join(item_path, relative_path)
+    if relative_path in (errors or {}) or not os.path.isfile(file_path):
+        return None
+    return read_text_file(file_path)
+
+
+def update_database_tmdl(file_path):
+    """
+    Deprecated: see update_database_content().
+    Updates the compatibilityLevel of the database.tmdl file of a semantic model directory, in place.
+    
+    Returns:
+        str: Updated content of the file, or None if the model has no database.tmdl.
+    """
+    warn_deprecated("update_database_tmdl", "update_database_content()")
+    convert_in_place(file_path, [DATABASE_FILE])
+    return read_converted_file(file_path, DATABASE_FILE)
+
+
+def delete_definition_datasources(file_path):
+    """
+    Deprecated: the converted models have no dataSources.tmdl (see convert_model_file()).
+    Deletes the dataSources.tmdl file of a semantic model directory.
+    """
+    warn_deprecated("delete_definition_datasources", "convert_semantic_model_directory()")
+    relative_path = find_file(LocalFileSystem(file_path), DATA_SOURCES_FILE)
+    if relative_path is not None:
+        os.remove(os.path.join(file_path, relative_path))
+
+
+def clean_definition_model(file_path):
+    """
+    Deprecated: see clean_model_content().
+    Filters the model.tmdl file of a semantic model directory, in place.
+    
+    Returns:
+        list: The lines kept, or None if the model has no model.tmdl.
+    """
+    warn_deprecated("clean_definition_model", "clean_model_content()")
+    convert_in_place(file_path, [MODEL_FILE])
+    content = read_converted_file(file_path, MODEL_FILE)
+    return None if content is None else content.splitlines(keepends=True)
+
+
+def transform_table_file(output_path, file_path, default_database=None):
+    """
+    Deprecated: see convert_table().
+    Transforms a .tmdl table file of the semantic model directory output_path, in place.
+    
+    Returns:
+        str or None: The new content of the file, or None if it could not be transformed.
+    """
+    warn_deprecated("transform_table_file", "convert_table()")
+    relative_path = os.path.relpath(file_path, output_path).replace(os.sep, "/")
+    return read_converted_file(output_path, relative_path, convert_in_place(output_path, [relative_path]))
+
+
+def transform_table_file_tab_edtr(file_path):
+    """
+    Deprecated: see convert_table().
+    Transforms a .tmdl table file of a Tabular Editor model ('<model>/definition/tables/<table>.tmdl'), in place.
+    
+    Returns:
+        str or None: The new content of the file, or None if it could not be transformed.
+    """
+    warn_deprecated("transform_table_file_tab_edtr", "convert_table()")
+    item_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(file_path))))
+    relative_path = os.path.relpath(os.path.abspath(file_path), item_path).replace(os.sep, "/")
+    return read_converted_file(item_path, relative_path, convert_in_place(item_path, [relative_path]))
+
+
+def process_all_table_files(base_path):
+    """
+    Deprecated: see convert_tables().
+    Transforms all the table files of the semantic model directory base_path, in place.
+    
+    Returns:
+        list: The table files that could not be transformed.
+    """
+    warn_deprecated("process_all_table_files", "convert_tables()")
+    table_files = [path for path in LocalFileSystem(base_path).list_files() if is_table_file(path)]
+    return [os.path.join(base_path, path) for path in sorted(convert_in_place(base_path, table_files))]
+
+
+def process_all_table_files_tab_edtr(base_path):
+    """
+    Deprecated: see convert_tables().
+    Transforms all the table files of the Tabular Editor model directory base_path, in place.
+    
+    Returns:
+        list: The table files that could not be transformed.
+    """
+    warn_deprecated("process_all_table_files_tab_edtr", "convert_tables()")
+    table_files = [path for path in LocalFileSystem(base_path).list_files() if is_table_file(path)]
+    return [os.path.join(base_path, path) for path in sorted(convert_in_place(base_path, table_files))]
+
+
+def get_connection_info(output_path, data_source_id):
+    """
+    Deprecated: see SemanticModel.data_sources and get_data_source().
+    
+    Returns:
+        tuple: (server, database) of a data source of the semantic model directory output_path,
+               otherwise (None, None).
+    """
+    warn_deprecated("get_connection_info", "SemanticModel.data_sources")
+    server, database, _ = get_data_source(SemanticModel(LocalFileSystem(output_path)).data_sources, data_source_id)
+    return server, database
+
+
+def get_compatibility_level(item_path):
+    """
+    Deprecated: see SemanticModel.compatibility_level.
+    
+    Returns:
+        int or None: The compatibilityLevel of the semantic model directory item_path.
+    """
+    warn_deprecated("get_compatibility_level", "SemanticModel.compatibility_level")
+    return SemanticModel(LocalFileSystem(item_path)).compatibility_level
+
+
+def is_tabular_editor(item_path):
+    """
+    Deprecated: see SemanticModel.tabular_editor.
+    
+    Returns:
+        bool: True if the semantic model directory item_path was saved by Tabular Editor.
+    """
+    warn_deprecated("is_tabular_editor", "SemanticModel.tabular_editor")
+    return SemanticModel(LocalFileSystem(item_path)).tabular_editor
+
 
+def copy_semanticmodel_directories(input_path, output_path):
+    """
+    Deprecated: see convert_semantic_model_directory(), which converts the models without copying them first.
+    Copies the semantic models of input_path into output_path, unchanged, to be converted in place
+    by process_all_semantic_models().
+    
+    Returns:
+        List[dict]: The copied semantic models, as returned by find_semantic_models().
+    """
+    warn_deprecated("copy_semanticmodel_directories", "convert_semantic_model_directory()")
+    models = find_semantic_models(input_path, output_path)
+    for model in models:
+        shutil.copytree(model["source"], model["destination"], dirs_exist_ok=True)
+        log(f"Copied directory: {model['source']} to {model['destination']}", DEBUG)
+    return models
+
+
+def update_definition_and_platform_in_reports(output_path):
+    """
+    Deprecated: copy_and_rename_reports() renders the reports already pointing to their semantic model.
+    Points the definition.pbir and .platform files of each '.Report' directory of output_path
+    to its semantic model, in place.
+    """
+    warn_deprecated("update_definition_and_platform_in_reports", "copy_and_rename_reports()")
+    for item in sorted(os.listdir(output_path)):
+        item_path = os.path.join(output_path, item)
+        if os.path.isdir(item_path) and item.endswith(".Report"):
+            write_report_directory(load_report_template(item_path), item_path, item[:-len(".Report")])
+
+
+def process_all_semantic_models(output_path):
+    """
+    Deprecated: see convert_all_semantic_models().
+    Converts in place every directory of output_path that ends with '.SemanticModel'
+    (e.g. copied by copy_semanticmodel_directories()).
+    
+    Returns:
+        dict: The table files that could not be transformed, by model name.
+    """
+    warn_deprecated("process_all_semantic_models", "convert_all_semantic_models()")
+    failures = {}
+    for item in sorted(os.listdir(output_path)):
+        item_path = os.path.join(output_path, item)
+        if os.path.isdir(item_path) and item.endswith(".SemanticModel"):
+            failures[item] = sorted(convert_in_place(item_path))
+    return failures
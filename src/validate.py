@@ -0,0 +1,207 @@
+# Requires Python 3.8 or later
+"""
+Validation of the converted semantic models.
+
+The conversion rewrites model.tmdl, drops dataSources.tmdl and replaces the partitions,
+prunes tables and columns on request: nothing of this may leave a dangling reference.
+The output is read once, file by file, into a symbol index per model (tables, columns,
+measures and relationships), and every reference is then checked with a set lookup:
+
+    - ref-table: the "ref table" lines of model.tmdl name an existing table.
+    - relationship-column: the fromColumn and toColumn of the relationships are existing columns.
+    - sort-by-column: the sortByColumn of a column is a column of the same table.
+    - level-column: the levels of the hierarchies are columns of the same table.
+    - empty-query: the M partitions select at least one column.
+
+The issues are returned as dicts, written as JSON by write_validation_report().
+"""
+import re
+import json
+
+from tmdl import parse_tmdl, unquote_name
+from pruning import split_qualified_name
+from archives import ArchiveInput, split_entry_name
+from metrics import log, count, ERROR, DEBUG
+
+# A generated query without columns: "SELECT  FROM ..." or Table.SelectColumns(Data, {})
+EMPTY_QUERY_PATTERN = re.compile(r"\bSELECT\s+FROM\b|Table\.SelectColumns\(\s*[^,()]+,\s*\{\s*\}\s*\)", re.IGNORECASE)
+
+
+class ModelIndex:
+    """
+    The symbols of a converted semantic model and the references to check, built one file
+    at a time with add_file().
+    """
+
+    def __init__(self, name):
+        """
+        Parameters:
+            name (str): The name of the model, used in the issues.
+        """
+        self.name = name
+        # Lower case names of the tables, their columns and measures as (table, name)
+        self.tables = set()
+        self.columns = set()
+        self.measures = set()
+        self.relationships = 0
+        # The references to check as (check, relative path, kind of symbol, key, message)
+        self.references = []
+        self.issues = []
+
+    def add_issue(self, check, relative_path, message):
+        self.issues.append({"model": self.name, "file": relative_path, "check": check, "message": message})
+
+    def add_file(self, relative_path, content):
+        """
+        Indexes the symbols of a definition file and records its references.
+
+        Parameters:
+            relative_path (str): Path relative to the semantic model directory.
+            content (str): Content of the file.
+        """
+        if not relative_path.startswith("definition/") or not relative_path.endswith(".tmdl"):
+            return
+        document = parse_tmdl(content)
+
+        if relative_path.lower() == "definition/model.tmdl":
+            for line in document.lines:
+                if line.kind == "object" and line.keyword == "ref" and line.name:
+                    parts = line.name.split(None, 1)
+                    if len(parts) == 2 and parts[0] == "table":
+                        table_name = unquote_name(parts[1])
+                        self.references.append((
+                            "ref-table", relative_path, self.tables, table_name.lower(),
+                            f"ref table '{table_name}' has no table file"
+                        ))
+            return
+
+        for node in document.iter_nodes():
+            if node.keyword == "table" and node.name:
+                table_name = node.name
+                self.tables.add(table_name.lower())
+                for child in node.children:
+                    if child.keyword == "column" and child.name:
+                        self.columns.add((table_name.lower(), child.name.lower()))
+                        self.add_column_references(relative_path, table_name, child)
+                    elif child.keyword == "measure" and child.name:
+                        self.measures.add((table_name.lower(), child.name.lower()))
+                    elif child.keyword == "hierarchy":
+                        self.add_level_references(relative_path, table_name, child)
+                    elif child.keyword == "partition":
+                        self.check_partition(relative_path, table_name, child)
+            elif node.keyword == "relationship":
+                self.relationships += 1
+                for key in ("fromColumn", "toColumn"):
+                    value = node.properties.get(key)
+                    if not value:
+                        continue
+                    table_name, column_name = split_qualified_name(value)
+                    self.references.append((
+                        "relationship-column", relative_path, self.columns,
+                        (table_name.lower(), (column_name or "").lower()),
+                        f"{key} of relationship '{node.name}' is not a column: {value.strip()}"
+                    ))
+
+    def add_column_references(self, relative_path, table_name, column):
+        sort_by = column.properties.get("sortByColumn")
+        if sort_by:
+            sort_by = unquote_name(sort_by)
+            self.references.append((
+                "sort-by-column", relative_path, self.columns, (table_name.lower(), sort_by.lower()),
+                f"column '{column.name}' of '{table_name}' is sorted by a missing column: {sort_by}"
+            ))
+
+    def add_level_references(self, relative_path, table_name, hierarchy):
+        for level in hierarchy.iter_nodes("level"):
+            column_name = level.properties.get("column")
+            if column_name:
+                column_name = unquote_name(column_name)
+                self.references.append((
+                    "level-column", relative_path, self.columns, (table_name.lower(), column_name.lower()),
+                    f"level '{level.name}' of hierarchy '{hierarchy.name}' in '{table_name}' "
+                    f"uses a missing column: {column_name}"
+                ))
+
+    def check_partition(self, relative_path, table_name, partition):
+        if (partition.value or "").strip().lower() != "m":
+            return
+        source = partition.properties.get("source") or ""
+        if EMPTY_QUERY_PATTERN.search(source):
+            self.add_issue(
+                "empty-query", relative_path, f"partition '{partition.name}' of '{table_name}' selects no columns"
+            )
+
+    def validate(self):
+        """
+        Checks the recorded references against the index.
+
+        Returns:
+            list: The issues of the model, as dicts with the keys model, file, check and message.
+        """
+        for check, relative_path, symbols, key, message in self.references:
+            if key not in symbols:
+                self.add_issue(check, relative_path, message)
+        self.references = []
+        return self.issues
+
+    def summary(self):
+        """
+        Returns:
+            dict: The number of objects of each kind in the index.
+        """
+        return {
+            "tables": len(self.tables),
+            "columns": len(self.columns),
+            "measures": len(self.measures),
+            "relationships": self.relationships
+        }
+
+
+def validate_output(output_path):
+    """
+    Validates every semantic model of the output, reading each file once (see ModelIndex).
+
+    Parameters:
+        output_path (str): The folder (or zip/tar archive) with the converted models.
+
+    Returns:
+        dict: The report, with the keys models (the objects of each model, by name) and issues.
+    """
+    indexes = {}
+    for name, content in ArchiveInput(output_path).iter_entries(
+            lambda name: (split_entry_name(name)[1] or "").endswith(".tmdl")):
+        model_name, relative_path = split_entry_name(name)
+        if model_name is None or content is None:
+            continue
+        index = indexes.get(model_name)
+        if index is None:
+            index = indexes[model_name] = ModelIndex(model_name)
+        index.add_file(relative_path, content.decode("utf-8"))
+
+    issues = []
+    for model_name in sorted(indexes):
+        model_issues = indexes[model_name].validate()
+        log(f"Validated semantic model {model_name}: {len(model_issues)} issue(s)", DEBUG)
+        issues.extend(model_issues)
+    for issue in issues:
+        log(f"Validation error in {issue['model']}/{issue['file']} ({issue['check']}): {issue['message']}", ERROR)
+    count("validation_issues", len(issues))
+    return {
+        "models": {model_name: indexes[model_name].summary() for model_name in sorted(indexes)},
+        "issues": issues
+    }
+
+
+def write_validation_report(report, report_path):
+    """
+    Writes the JSON report of validate_output().
+
+    Parameters:
+        report (dict): The report.
+        report_path (str): Path of the JSON file.
+    """
+    try:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    except IOError as e:
+        log(f"Error writing the validation report {report_path}: {e}", ERROR)
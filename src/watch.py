@@ -0,0 +1,485 @@
+# Requires Python 3.8 or later
+import os
+import sys
+import time
+import errno
+import shutil
+import select
+import struct
+import ctypes
+import ctypes.util
+
+from utils import *
+from manifest import load_manifest, save_manifest, record_model, hash_file, hash_files
+from metrics import get_metrics
+
+# inotify event flags (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = os.O_CLOEXEC
+
+# Events that change the content of the watched folders
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+
+# Header of an inotify event: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct("iIII")
+
+# Time to wait for more events after the first one, so that a save touching
+# several files (or writing a file in several steps) is converted once
+DEBOUNCE_SECONDS = 0.05
+
+# Temporary files written by editors, never converted
+IGNORED_SUFFIXES = ("~", ".swp", ".swx", ".tmp")
+
+
+class InotifyWatcher:
+    """
+    Watches a folder recursively with the Linux inotify API (through ctypes, without
+    third-party packages). New subfolders are watched as soon as they are created.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): The folder to watch.
+
+        Raises:
+            OSError: If inotify is not available on this system.
+        """
+        library = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or library is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this system")
+        self.libc = ctypes.CDLL(library, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders = {}
+        self.add_folder(path)
+
+    def add_folder(self, path):
+        """
+        Watches a folder and its subfolders.
+
+        Parameters:
+            path (str): The folder to watch.
+
+        Returns:
+            list: The files found inside the folder.
+        """
+        files = []
+        for root, _, names in os.walk(path):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd >= 0:
+                self.folders[wd] = root
+            files += [os.path.join(root, name) for name in names]
+        return files
+
+    def read_changes(self, timeout=None):
+        """
+        Waits for changes and returns them once no more events arrive for DEBOUNCE_SECONDS.
+
+        Parameters:
+            timeout (float, optional): Maximum time to wait for the first change, in seconds.
+
+        Returns:
+            tuple: (paths, rescan) where paths is the set of the changed files and rescan is
+                   True if events were lost and the whole folder must be compared again.
+        """
+        paths = set()
+        rescan = False
+        wait = timeout
+        while select.select([self.fd], [], [], wait)[0]:
+            buffer = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+                name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                folder = self.folders.get(wd)
+                if folder is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self.folders[wd]
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    # A removed or renamed folder changes the models it contains
+                    rescan = True
+                    continue
+
+                path = os.path.join(folder, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        paths.update(self.add_folder(path))
+                    else:
+                        rescan = True
+                elif not mask & IN_CREATE:
+                    # The content of a created file arrives with IN_CLOSE_WRITE
+                    paths.add(path)
+            wait = DEBOUNCE_SECONDS
+        return paths, rescan
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Watches a folder recursively by comparing the modification time and size of its files
+    at a fixed interval. Used when inotify is not available (e.g. on Windows or macOS).
+    """
+
+    def __init__(self, path, interval=0.5):
+        """
+        Parameters:
+            path (str): The folder to watch.
+            interval (float, optional): Seconds between two scans.
+        """
+        self.path = path
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        """
+        Returns:
+            dict: (modification time, size) of every file inside the folder, by path.
+        """
+        snapshot = {}
+        folders = [self.path]
+        while folders:
+            try:
+                entries = list(os.scandir(folders.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read_changes(self, timeout=None):
+        """
+        Waits for changes (see InotifyWatcher.read_changes()).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval)
+            snapshot = self.scan()
+            paths = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+            paths.update(path for path in self.snapshot if path not in snapshot)
+            self.snapshot = snapshot
+            if paths or (deadline is not None and time.monotonic() >= deadline):
+                return paths, False
+
+    def close(self):
+        pass
+
+
+def create_watcher(path, polling=False, interval=0.5):
+    """
+    Creates an inotify watcher, or a polling watcher when inotify is not available.
+
+    Parameters:
+        path (str): The folder to watch.
+        polling (bool, optional): Always use the polling watcher.
+        interval (float, optional): Seconds between two scans of the polling watcher.
+
+    Returns:
+        InotifyWatcher or PollingWatcher: The watcher.
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(path)
+        except (OSError, AttributeError) as e:
+            log(f"inotify is not available ({e}), polling every {interval}s instead.", INFO)
+    return PollingWatcher(path, interval)
+
+
+def split_model_path(input_path, path):
+    """
+    Splits the path of a changed file into its semantic model and its path inside the model.
+
+    Parameters:
+        input_path (str): The watched input folder.
+        path (str): The changed file.
+
+    Returns:
+        tuple: (model name, relative path with '/' separators), or (None, None) if the file
+               is not inside a '.SemanticModel' folder. The relative path is empty when
+               the path is the '.SemanticModel' folder itself (e.g. a folder moved away).
+    """
+    parts = os.path.relpath(path, input_path).split(os.sep)
+    for index, part in enumerate(parts):
+        if part.endswith(".SemanticModel"):
+            return os.path.join(*parts[:index + 1]), "/".join(parts[index + 1:])
+    return None, None
+
+
+class WatchSession:
+    """
+    Keeps the output folder in sync with the input folder while it is edited.
+
+    The Tabular Editor flag and the data source index of each model are kept in memory,
+    so saving a table converts only that table. A change to model.tmdl or dataSources.tmdl
+    converts the whole model again and refreshes its cache.
+    """
+
+    def __init__(self, input_path, output_path, default_report_path, config=None):
+        """
+        Parameters:
+            input_path (str): Folder with the Analysis Services semantic models.
+            output_path (str): Folder where the PBIP projects are written.
+            default_report_path (str): The 'Default.Report' folder used as template for the reports.
+            config (dict, optional): The configuration of the conversion (see config.py).
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.default_report_path = default_report_path
+        self.config = config
+        self.manifest = load_manifest(output_path, config)
+        self.models = {}
+
+    def get_model(self, name):
+        """
+        Returns the cached state of a semantic model, loading it on first use.
+
+        Parameters:
+            name (str): Relative path of the model inside the input folder.
+
+        Returns:
+            dict: The keys source, destination, tabular_editor, data_sources and model_document.
+        """
+        model = self.models.get(name)
+        if model is None:
+            source = os.path.join(self.input_path, name)
+            semantic_model = SemanticModel(LocalFileSystem(source))
+            model = {
+                "source": source,
+                "destination": os.path.join(self.output_path, name),
+                "tabular_editor": semantic_model.tabular_editor,
+                "data_sources": get_model_data_sources(semantic_model, self.config),
+                "model_document": semantic_model.model_document
+            }
+            self.models[name] = model
+        return model
+
+    def convert_model(self, name):
+        """
+        Converts a whole semantic model again and refreshes its cache.
+
+        Parameters:
+            name (str): Relative path of the model inside the input folder.
+
+        Returns:
+            dict: The error message of each table that could not be transformed, by relative path.
+        """
+        self.models.pop(name, None)
+        model = self.get_model(name)
+        source_files = scan_files(model["source"])
+        table_expressions = {}
+        errors = convert_semantic_model_directory(
+            model["source"], model["destination"], config=self.config, table_expressions=table_expressions,
+            source_files=source_files
+        )
+        files = hash_files(model["source"], source_files, self.manifest["models"].get(name))
+        record_model(self.manifest, name, files, errors, table_expressions, source_files)
+        return errors
+
+    def convert_files(self, name, relative_paths):
+        """
+        Converts the changed files of a semantic model with its cached state, then its
+        expressions.tmdl. Files that no longer exist in the input are removed from the output.
+
+        Parameters:
+            name (str): Relative path of the model inside the input folder.
+            relative_paths (set): Relative paths of the changed files.
+
+        Returns:
+            dict: The error message of each file that could not be converted, by relative path.
+        """
+        model = self.get_model(name)
+        entry = self.manifest["models"].setdefault(name, {"files": {}})
+        recorded = entry["files"]
+        stats = entry.setdefault("stats", {})
+        table_expressions = entry.pop("expressions", {})
+        errors = {}
+        other_files = []
+
+        for relative_path in sorted(relative_paths):
+            source_file = os.path.join(model["source"], relative_path)
+            dest_file = os.path.join(model["destination"], relative_path)
+            recorded.pop(relative_path, None)
+            stats.pop(relative_path, None)
+
+            if not os.path.isfile(source_file):
+                if os.path.lexists(dest_file):
+                    os.remove(dest_file)
+                continue
+
+            if is_table_file(relative_path):
+                expressions = table_expressions[relative_path] = {}
+                try:
+                    error = convert_table_file(
+                        source_file, dest_file, model["tabular_editor"], model["data_sources"], self.config, expressions
+                    )
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                if error is not None:
+                    errors[relative_path] = error
+            else:
+                other_files.append(relative_path)
+
+        if other_files:
+            # Only files that are not model level files get here (see apply_changes())
+            source, dest = LocalFileSystem(model["source"]), LocalFileSystem(model["destination"])
+            for relative_path in other_files:
+                convert_model_file(source, dest, relative_path, model["model_document"], config=self.config)
+        finish_semantic_model(LocalFileSystem(model["source"]), LocalFileSystem(model["destination"]), table_expressions)
+        table_expressions = {path: names for path, names in table_expressions.items() if names and path not in errors}
+        if table_expressions:
+            entry["expressions"] = table_expressions
+
+        for relative_path in relative_paths:
+            source_file = os.path.join(model["source"], relative_path)
+            if relative_path not in errors and os.path.isfile(source_file):
+                recorded[relative_path] = hash_file(source_file)
+                info = os.stat(source_file)
+                stats[relative_path] = [info.st_size, info.st_mtime_ns]
+        return errors
+
+    def remove_model(self, name):
+        """
+        Removes a semantic model deleted from the input: its output folder, its report
+        and its entry in the manifest.
+
+        Parameters:
+            name (str): Relative path of the model inside the input folder.
+        """
+        self.models.pop(name, None)
+        self.manifest["models"].pop(name, None)
+        for folder in (os.path.join(self.output_path, name), get_report_path(self.output_path, name)):
+            if os.path.isdir(folder):
+                shutil.rmtree(folder)
+        log(f"Removed semantic model deleted from the input: {name}", INFO)
+
+    def apply_changes(self, paths):
+        """
+        Converts the changed files, grouped by semantic model.
+
+        Parameters:
+            paths (set): The changed files inside the input folder.
+
+        Returns:
+            dict: For each model name, the error message of each file that could not be converted.
+        """
+        changes = {}
+        for path in paths:
+            if os.path.basename(path).endswith(IGNORED_SUFFIXES):
+                continue
+            name, relative_path = split_model_path(self.input_path, path)
+            if name is not None:
+                model_changes = changes.setdefault(name, set())
+                if relative_path:
+                    model_changes.add(relative_path)
+
+        failures = {}
+        new_models = []
+        for name, relative_paths in sorted(changes.items()):
+            source = os.path.join(self.input_path, name)
+            if not os.path.isdir(source):
+                if name in self.manifest["models"] or os.path.isdir(os.path.join(self.output_path, name)):
+                    self.remove_model(name)
+                    failures[name] = {}
+                continue
+            is_new = not os.path.isdir(os.path.join(self.output_path, name))
+            if is_new:
+                new_models.append(name)
+            # A change of the folder itself (e.g. moved in) converts the whole model,
+            # and so do the changes that can change the conversion of the other files
+            if is_new or not relative_paths or is_model_wide_change(source, relative_paths, self.config):
+                failures[name] = self.convert_model(name)
+            else:
+                failures[name] = self.convert_files(name, relative_paths)
+
+        if new_models:
+            copy_and_rename_reports(self.output_path, self.default_report_path, new_models)
+        if changes:
+            save_manifest(self.output_path, self.manifest)
+        return failures
+
+    def rescan(self):
+        """
+        Compares the whole input folder with the manifest, as a one-shot incremental run does,
+        removes the models deleted from the input and drops the cached models.
+        """
+        self.models = {}
+        removed = {}
+        for name in sorted(self.manifest["models"]):
+            if not os.path.isdir(os.path.join(self.input_path, name)):
+                self.remove_model(name)
+                removed[name] = {}
+        catalog = []
+        models = find_semantic_models(self.input_path, self.output_path, self.manifest, self.config, catalog=catalog)
+        failures = convert_all_semantic_models(models, config=self.config)
+        copy_and_rename_reports(self.output_path, self.default_report_path, [entry["name"] for entry in catalog])
+        for model in models:
+            record_model(
+                self.manifest, model["name"], model["files"], failures.get(model["name"], {}), model["expressions"],
+                model["catalog"]
+            )
+        save_manifest(self.output_path, self.manifest)
+        failures.update(removed)
+        return failures
+
+
+def watch(input_path, output_path, default_report_path, polling=False, interval=0.5, config=None):
+    """
+    Watches input_path and converts every saved file into output_path until interrupted (Ctrl+C).
+    Run the one-shot conversion first, so the output is up to date when watching starts.
+
+    Parameters:
+        input_path (str): Folder with the Analysis Services semantic models.
+        output_path (str): Folder where the PBIP projects are written.
+        default_report_path (str): The 'Default.Report' folder used as template for the reports.
+        polling (bool, optional): Poll the folder instead of using inotify.
+        interval (float, optional): Seconds between two scans when polling.
+        config (dict, optional): The configuration of the conversion (see config.py).
+    """
+    watcher = create_watcher(input_path, polling, interval)
+    session = WatchSession(input_path, output_path, default_report_path, config)
+    metrics = get_metrics()
+    log(f"Watching {input_path} for changes (Ctrl+C to stop)...", INFO)
+
+    try:
+        while True:
+            paths, rescan = watcher.read_changes()
+            start = time.perf_counter()
+            failures = session.rescan() if rescan else session.apply_changes(paths)
+
+            converted = 0
+            for name, errors in failures.items():
+                converted += 1
+                for relative_path, error in errors.items():
+                    log(f"Error converting {name}/{relative_path}: {error}", ERROR)
+                    metrics.count("files_failed")
+            if converted:
+                milliseconds = (time.perf_counter() - start) * 1000
+                log(f"Updated {converted} semantic model(s) in {milliseconds:.0f} ms.", INFO)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
@@ -0,0 +1,5 @@
+# The scripts in src/ import each other as top level modules, as when running process.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
@@ -0,0 +1,109 @@
+import os
+import io
+import tarfile
+import zipfile
+
+import archives
+from process import run
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\nref table Sales\n",
+    "definition/dataSources.tmdl": (
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    ),
+    "definition/tables/Sales.tmdl": (
+        "table Sales\n"
+        "\tcolumn Amount\n"
+        "\t\tsourceColumn: Amount\n"
+        "\n"
+        "\tpartition Sales = query\n"
+        "\t\tdataSource: SqlDW\n"
+        "\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+    ),
+    "diagramLayout.json": "{}",
+}
+
+
+def write_zip(path, files):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+
+
+def write_tar(path, files):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content.encode("utf-8"))
+            archive.addfile(info, io.BytesIO(content.encode("utf-8")))
+
+
+def model_entries(prefix="Sales.SemanticModel"):
+    return {f"{prefix}/{relative_path}": content for relative_path, content in FILES.items()}
+
+
+def read_zip(path):
+    with zipfile.ZipFile(path) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+def read_folder(path):
+    return {
+        str(file_path.relative_to(path)).replace(os.sep, "/"): file_path.read_bytes()
+        for file_path in path.rglob("*") if file_path.is_file() and not file_path.name.startswith(".conversion")
+    }
+
+
+def test_unsafe_entries_are_skipped(tmp_path, capsys):
+    entries = model_entries()
+    entries["../Evil.SemanticModel/definition/model.tmdl"] = "model Evil\n"
+    entries["Sales.SemanticModel/../../escape.tmdl"] = "x"
+    write_tar(tmp_path / "in.tar.gz", entries)
+
+    metrics = run(str(tmp_path / "in.tar.gz"), str(tmp_path / "out" / "pbip"), DEFAULT_REPORT_PATH)
+
+    assert metrics.counters["files_failed"] == 0
+    assert sorted(os.listdir(tmp_path / "out")) == ["pbip"]
+    assert not (tmp_path / "escape.tmdl").exists()
+    assert capsys.readouterr().err.count("Skipping unsafe archive entry") == 2
+    assert archives.is_safe_entry_name("Sales.SemanticModel/definition/model.tmdl")
+    assert not archives.is_safe_entry_name("C:/Sales.SemanticModel/definition/model.tmdl")
+
+
+def test_folder_output_has_the_files_of_the_archive_only(tmp_path):
+    write_zip(tmp_path / "in.zip", model_entries())
+    run(str(tmp_path / "in.zip"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+    entries = model_entries()
+    del entries["Sales.SemanticModel/diagramLayout.json"]
+    write_zip(tmp_path / "in.zip", entries)
+    run(str(tmp_path / "in.zip"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+    assert not (tmp_path / "out" / "Sales.SemanticModel" / "diagramLayout.json").exists()
+    assert (tmp_path / "out" / "Sales.SemanticModel" / "definition" / "tables" / "Sales.tmdl").is_file()
+
+
+def test_large_tables_are_streamed_with_the_same_output(tmp_path, monkeypatch):
+    write_zip(tmp_path / "in.zip", model_entries())
+    run(str(tmp_path / "in.zip"), str(tmp_path / "expected.zip"), DEFAULT_REPORT_PATH)
+    run(str(tmp_path / "in.zip"), str(tmp_path / "expected"), DEFAULT_REPORT_PATH)
+
+    streamed = []
+    stream_large_table = archives.stream_large_table
+    monkeypatch.setattr(archives, "STREAMING_THRESHOLD", 100)
+    monkeypatch.setattr(
+        archives, "stream_large_table", lambda entry, *args: streamed.append(entry) or stream_large_table(entry, *args)
+    )
+    run(str(tmp_path / "in.zip"), str(tmp_path / "streamed.zip"), DEFAULT_REPORT_PATH)
+    run(str(tmp_path / "in.zip"), str(tmp_path / "streamed"), DEFAULT_REPORT_PATH)
+
+    assert len(streamed) == 2
+    # The temporary copies of the entries are removed
+    assert not any(os.path.exists(entry.path) for entry in streamed)
+    assert read_zip(tmp_path / "streamed.zip") == read_zip(tmp_path / "expected.zip")
+    assert read_folder(tmp_path / "streamed") == read_folder(tmp_path / "expected")
@@ -0,0 +1,94 @@
+import os
+import time
+import threading
+
+import utils
+import async_io
+from async_io import convert_all_semantic_models_async, copy_and_rename_reports_async
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\nref table Sales\n",
+    "definition/dataSources.tmdl": (
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    ),
+    "definition/tables/Sales.tmdl": (
+        "table Sales\n"
+        "\tcolumn Amount\n"
+        "\t\tsourceColumn: Amount\n"
+        "\n"
+        "\tpartition Sales = query\n"
+        "\t\tdataSource: SqlDW\n"
+        "\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+    ),
+}
+
+
+def write_files(folder, files):
+    for relative_path, content in files.items():
+        path = folder / "Model.SemanticModel" / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def convert(tmp_path, name, io, in_flight=4):
+    output_path = tmp_path / name
+    output_path.mkdir()
+    models = utils.find_semantic_models(str(tmp_path / "in"), str(output_path))
+    if io == "async":
+        failures = convert_all_semantic_models_async(models, in_flight=in_flight)
+        copy_and_rename_reports_async(str(output_path), DEFAULT_REPORT_PATH, in_flight)
+    else:
+        failures = utils.convert_all_semantic_models(models)
+        utils.copy_and_rename_reports(str(output_path), DEFAULT_REPORT_PATH)
+    assert failures == {"Model.SemanticModel": {}, "Other.SemanticModel": {}}
+    return {
+        str(path.relative_to(output_path)): path.read_bytes() for path in output_path.rglob("*") if path.is_file()
+    }
+
+
+def test_async_backend_writes_the_same_output(tmp_path, monkeypatch):
+    files = dict(FILES)
+    files["definition/tables/Customer.tmdl"] = "table Customer\n\tcolumn Name\n\t\tsourceColumn: Name\n"
+    files["definition/cultures/en-US.tmdl"] = "cultureInfo en-US\n"
+    write_files(tmp_path / "in", files)
+    (tmp_path / "in" / "Model.SemanticModel").rename(tmp_path / "in" / "Other.SemanticModel")
+    write_files(tmp_path / "in", files)
+    # Every table is huge, so they are streamed instead of read ahead
+    monkeypatch.setattr(async_io, "STREAMING_THRESHOLD", 100)
+    monkeypatch.setattr(utils, "STREAMING_THRESHOLD", 100)
+
+    expected = convert(tmp_path, "sync", "sync")
+    assert convert(tmp_path, "async", "async") == expected
+    assert convert(tmp_path, "async_one", "async", in_flight=1) == expected
+    assert "Model.SemanticModel/definition/tables/Sales.tmdl" in expected
+
+
+def test_in_flight_operations_are_bounded(tmp_path, monkeypatch):
+    files = dict(FILES)
+    for index in range(20):
+        files[f"definition/tables/Table{index}.tmdl"] = f"table Table{index}\n\tcolumn Name\n\t\tsourceColumn: Name\n"
+    write_files(tmp_path / "in", files)
+    models = utils.find_semantic_models(str(tmp_path / "in"), str(tmp_path / "out"))
+
+    lock = threading.Lock()
+    running = [0, 0]
+    read_file_ahead = async_io.read_file_ahead
+
+    def slow_read(file_path):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return read_file_ahead(file_path)
+
+    monkeypatch.setattr(async_io, "read_file_ahead", slow_read)
+    assert convert_all_semantic_models_async(models, in_flight=3) == {"Model.SemanticModel": {}}
+    assert running[1] == 3
+    assert (tmp_path / "out" / "Model.SemanticModel" / "definition" / "tables" / "Table19.tmdl").exists()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import zipfile
+
+import manifest
+from catalog import scan_models, scan_files, count_table_files
+from process import run
+from watch import WatchSession
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n",
+    "definition/tables/Sales.tmdl": "table Sales\n\tcolumn Amount\n\t\tsourceColumn: Amount\n",
+    "definition/tables/Customer.tmdl": "table Customer\n\tcolumn Name\n\t\tsourceColumn: Name\n",
+}
+
+
+def write_model(folder):
+    for relative_path, content in FILES.items():
+        path = folder / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def test_models_are_found_in_a_single_walk_with_their_files(tmp_path):
+    write_model(tmp_path / "in" / "Sales.SemanticModel")
+    write_model(tmp_path / "in" / "finance" / "Budget.SemanticModel")
+    write_model(tmp_path / "in" / ".git" / "Old.SemanticModel")
+    (tmp_path / "in" / "Sales.Report").mkdir()
+
+    models = scan_models(str(tmp_path / "in"))
+    first = next(models)
+
+    assert first["name"] == "Sales.SemanticModel"
+    assert list(first["files"]) == sorted(FILES)
+    assert first["files"]["definition/model.tmdl"].size == len(FILES["definition/model.tmdl"])
+    assert count_table_files(first["files"]) == 2
+    assert [entry["name"] for entry in models] == [os.path.join("finance", "Budget.SemanticModel")]
+    assert scan_files(str(tmp_path / "missing")) == {}
+
+
+def test_nested_models_get_a_report_and_unchanged_files_are_not_hashed_again(tmp_path, monkeypatch):
+    write_model(tmp_path / "in" / "finance" / "Budget.SemanticModel")
+    run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+    report_path = tmp_path / "out" / "finance" / "Budget.Report"
+    assert (report_path / "definition.pbir").read_text(encoding="utf-8").count('"../Budget.SemanticModel"') == 1
+
+    hashed = []
+    hash_file = manifest.hash_file
+    monkeypatch.setattr(manifest, "hash_file", lambda file_path: hashed.append(file_path) or hash_file(file_path))
+    # Same size, but a new modification time
+    table_file = tmp_path / "in" / "finance" / "Budget.SemanticModel" / "definition" / "tables" / "Sales.tmdl"
+    table_file.write_text(FILES["definition/tables/Sales.tmdl"].replace("Amount", "Profit"), encoding="utf-8")
+    os.utime(table_file, ns=(table_file.stat().st_atime_ns, table_file.stat().st_mtime_ns + 10 ** 9))
+
+    metrics = run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+    # The sources of the converter are hashed for its fingerprint
+    assert [file_path for file_path in hashed if file_path.startswith(str(tmp_path))] == [str(table_file)]
+    assert metrics.counters["files_written"] == 1
+    output_file = tmp_path / "out" / "finance" / "Budget.SemanticModel" / "definition" / "tables" / "Sales.tmdl"
+    assert "column Profit" in output_file.read_text(encoding="utf-8")
+
+
+def test_nested_models_get_a_report_in_archives_and_watch_mode(tmp_path):
+    write_model(tmp_path / "in" / "finance" / "Budget.SemanticModel")
+    shutil.make_archive(str(tmp_path / "in"), "zip", str(tmp_path / "in"))
+
+    run(str(tmp_path / "in.zip"), str(tmp_path / "out.zip"), DEFAULT_REPORT_PATH)
+    with zipfile.ZipFile(tmp_path / "out.zip") as archive:
+        assert "finance/Budget.Report/definition.pbir" in archive.namelist()
+
+    run(str(tmp_path / "in.zip"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+    assert (tmp_path / "out" / "finance" / "Budget.Report" / "definition.pbir").is_file()
+
+    session = WatchSession(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+    session.remove_model(os.path.join("finance", "Budget.SemanticModel"))
+    assert not (tmp_path / "out" / "finance" / "Budget.Report").exists()
@@ -0,0 +1,101 @@
+import pytest
+
+import utils
+from config import validate_config, ConfigError
+from connections import get_connection_parameters, format_m_identifier
+from filesystem import MemoryFileSystem
+
+
+CONFIG = validate_config({"connectionParameters": True})
+
+DATA_SOURCES_FILE = (
+    "dataSource SqlDW = provider\n"
+    "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    "\n"
+    "dataSource Other = provider\n"
+    "\tconnectionString: Data Source=srv2;Initial Catalog=\"Other \"\"DB\"\"\"\n"
+)
+
+TABLE = (
+    "table {name}\n"
+    "\tcolumn A\n"
+    "\t\tsourceColumn: A\n"
+    "\n"
+    "\tpartition {name} = query\n"
+    "\t\tdataSource: {data_source}\n"
+    "\t\tquery = SELECT * FROM [dbo].[{name}]\n"
+)
+
+
+def test_main_connection_uses_the_plain_names():
+    names = {"server": "Server", "database": "Database"}
+    expressions = {}
+    connections = [("srv", "DW"), ("srv2", "DW"), ("srv", "Sales")]
+    assert get_connection_parameters(names, "srv", "DW", connections, expressions) == ("Server", "Database")
+    assert get_connection_parameters(names, "srv2", "Sales", connections, expressions) == (
+        '#"Server 2"', '#"Database 2"'
+    )
+    assert expressions["Database 2"].startswith('"Sales" meta [IsParameterQuery=true, Type="Text"')
+    assert get_connection_parameters(names, "srv.3", "None", connections, expressions) == (
+        '#"Server srv_3"', '#"Database None"'
+    )
+    assert get_connection_parameters(names, "srv", "2", connections, {})[1] == '#"Database _2"'
+    assert format_m_identifier('a "b"') == '#"a ""b"""'
+    with pytest.raises(ConfigError):
+        validate_config({"connectionParameters": {"server": "Source", "database": "Source"}})
+
+
+def test_partitions_share_the_parameters_of_the_model():
+    source = MemoryFileSystem({
+        "definition/dataSources.tmdl": DATA_SOURCES_FILE,
+        "definition/tables/Sales.tmdl": TABLE.format(name="Sales", data_source="SqlDW"),
+        "definition/tables/Budget.tmdl": TABLE.format(name="Budget", data_source="SqlDW"),
+        "definition/tables/Other.tmdl": TABLE.format(name="Other", data_source="Other"),
+    })
+    dest = MemoryFileSystem()
+
+    assert utils.convert_semantic_model_files(source, dest, config=CONFIG) == {}
+
+    assert "Sql.Database(Server, Database, [Query" in dest.files["definition/tables/Sales.tmdl"].decode("utf-8")
+    assert 'Sql.Database(#"Server 2", #"Database 2", [Query' in (
+        dest.files["definition/tables/Other.tmdl"].decode("utf-8")
+    )
+    expressions = dest.files["definition/expressions.tmdl"].decode("utf-8")
+    assert [line.split(" = ")[0] for line in expressions.splitlines() if line] == [
+        "expression Database", "expression 'Database 2'", "expression Server", "expression 'Server 2'"
+    ]
+    assert 'expression \'Database 2\' = "Other ""DB""" meta' in expressions
+    assert 'expression Server = "sqlsrv01" meta' in expressions
+
+
+def test_tabular_editor_tables_share_the_parameters_of_the_model():
+    table = (
+        "table {name}\n"
+        "\tcolumn A\n"
+        "\t\tsourceColumn: A\n"
+        "\n"
+        "\tpartition {name} = query\n"
+        "\t\tdataSource: '{server} Shop'\n"
+        "\t\tquery = SELECT * FROM [dbo].[{name}]\n"
+        "\n"
+        "\tannotation TabularEditor_TableSchema = "
+        "{{\"Name\": \"{name}\", \"Schema\": \"dbo\", \"Database\": \"{database}\"}}\n"
+    )
+    source = MemoryFileSystem({
+        "definition/model.tmdl": "model Model\n\tannotation __TEdtr = 1\n",
+        "definition/tables/Budget.tmdl": table.format(name="Budget", server="srv03", database="Shop"),
+        "definition/tables/Orders.tmdl": table.format(name="Orders", server="srv03", database="Shop"),
+        "definition/tables/Stock.tmdl": table.format(name="Stock", server="srv04", database="Depot"),
+    })
+    dest = MemoryFileSystem()
+
+    assert utils.convert_semantic_model_files(source, dest, config=CONFIG) == {}
+
+    for name in ("Budget", "Orders"):
+        assert "Sql.Database(Server, Database, [Query" in dest.files[f"definition/tables/{name}.tmdl"].decode("utf-8")
+    assert 'Sql.Database(#"Server 2", #"Database 2", [Query' in (
+        dest.files["definition/tables/Stock.tmdl"].decode("utf-8")
+    )
+    expressions = dest.files["definition/expressions.tmdl"].decode("utf-8")
+    assert 'expression Server = "srv03" meta' in expressions
+    assert 'expression \'Database 2\' = "Depot" meta' in expressions
@@ -0,0 +1,62 @@
+import pytest
+
+from converter import convert_semantic_model, render_report, load_template
+from filesystem import MemoryFileSystem
+
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\tdataAccessOptions\n\t\tlegacyRedirects\n",
+    "definition\\dataSources.tmdl": (
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    ),
+    "definition/tables/Sales.tmdl": (
+        "table Sales\n"
+        "\tcolumn Amount\n"
+        "\t\tsourceColumn: Amount\n"
+        "\n"
+        "\tpartition Sales = query\n"
+        "\t\tdataSource: SqlDW\n"
+        "\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+    ),
+    "diagramLayout.json": b"{}",
+}
+
+
+def test_memory_file_system():
+    files = MemoryFileSystem({"/a/b.tmdl": "x\r\ny", "c.json": b"{}"})
+
+    assert files.list_files() == ["a/b.tmdl", "c.json"]
+    assert files.list_files("a") == ["a/b.tmdl"]
+    assert files.read_text("a/b.tmdl") == "x\ny"
+    files.write_text("d.tmdl", "z")
+    files.copy_from(MemoryFileSystem({"e.json": b"[]"}), "e.json")
+    files.remove("c.json")
+    files.remove("missing.json")
+    assert files.files == {"a/b.tmdl": b"x\r\ny", "d.tmdl": b"z", "e.json": b"[]"}
+    assert files.exists("d.tmdl") and not files.exists("c.json")
+    with pytest.raises(FileNotFoundError):
+        files.read_bytes("c.json")
+
+
+def test_model_is_converted_in_memory():
+    errors = {}
+    output = convert_semantic_model(FILES, errors)
+
+    assert errors == {}
+    assert sorted(output) == [
+        "definition/database.tmdl", "definition/model.tmdl", "definition/tables/Sales.tmdl", "diagramLayout.json"
+    ]
+    assert b"1605" in output["definition/database.tmdl"]
+    assert b"legacyRedirects" not in output["definition/model.tmdl"]
+    assert b'Sql.Database("sqlsrv01", "DW"' in output["definition/tables/Sales.tmdl"]
+    assert output["diagramLayout.json"] == b"{}"
+
+
+def test_report_is_rendered_from_the_loaded_template():
+    files = render_report("Sales")
+
+    assert b'"../Sales.SemanticModel"' in files["definition.pbir"]
+    assert load_template() is load_template()
+    assert sorted(files) == sorted(load_template()["files"])
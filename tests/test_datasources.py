@@ -0,0 +1,32 @@
+from datasources import parse_connection_string, parse_data_sources, get_data_source
+
+
+def test_connection_string_any_order_and_case():
+    values = parse_connection_string("initial CATALOG=Sales; Provider=SQLNCLI11;DATA SOURCE=srv01")
+    assert values == {"initial catalog": "Sales", "provider": "SQLNCLI11", "data source": "srv01"}
+
+
+def test_connection_string_quoted_values():
+    values = parse_connection_string(
+        "Data Source='srv;01';Initial Catalog=\"My \"\"DB\"\"; 2\";Password='it''s'"
+    )
+    assert values["data source"] == "srv;01"
+    assert values["initial catalog"] == 'My "DB"; 2'
+    assert values["password"] == "it's"
+
+
+def test_data_sources_index():
+    data_sources = parse_data_sources(
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Server=sqlsrv01;Database=DW\n"
+        "\tprovider: System.Data.SqlClient\n"
+        "\n"
+        "dataSource 'Other Source' = provider\n"
+        "\tconnectionString: \"Provider=SQLNCLI11;Initial Catalog=\"\"Other DB\"\";Data Source=srv2\"\n"
+        "\n"
+        "dataSource Web = structured\n"
+        "\tconnectionDetails = {}\n"
+    )
+    assert get_data_source(data_sources, "sqldw") == ("sqlsrv01", "DW", "System.Data.SqlClient")
+    assert get_data_source(data_sources, "'Other Source'") == ("srv2", "Other DB", "SQLNCLI11")
+    assert get_data_source(data_sources, "Web") == (None, None, None)
@@ -0,0 +1,68 @@
+import os
+import warnings
+
+import pytest
+
+import utils
+from catalog import scan_files
+from process import run
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+FILES = {
+    "definition/database.tmdl": "database Sales\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\tdataAccessOptions\n\t\tlegacyRedirects\n\nref table Sales\n",
+    "definition/dataSources.tmdl": "dataSource SqlDW = provider\n\tconnectionString: Data Source=srv;Initial Catalog=DW\n",
+    "definition/tables/Sales.tmdl": (
+        "table Sales\n"
+        "\tcolumn Amount\n\t\tsourceColumn: Amount\n\n"
+        "\tpartition Sales = query\n\t\tdataSource: SqlDW\n\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+    ),
+}
+
+
+def write_model(folder):
+    for relative_path, content in FILES.items():
+        path = folder / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def read_folder(folder):
+    return {path: (folder / path).read_bytes() for path in scan_files(str(folder)) if not path.startswith(".conversion")}
+
+
+def test_old_in_place_pipeline_gives_the_output_of_a_run(tmp_path):
+    write_model(tmp_path / "in" / "Sales.SemanticModel")
+    run(str(tmp_path / "in"), str(tmp_path / "expected"), DEFAULT_REPORT_PATH)
+
+    output_path = str(tmp_path / "out")
+    os.makedirs(output_path)
+    with pytest.warns(DeprecationWarning):
+        utils.copy_semanticmodel_directories(str(tmp_path / "in"), output_path)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        utils.copy_and_rename_reports(output_path, DEFAULT_REPORT_PATH)
+        utils.update_definition_and_platform_in_reports(output_path)
+        assert utils.process_all_semantic_models(output_path) == {"Sales.SemanticModel": []}
+
+    assert read_folder(tmp_path / "out") == read_folder(tmp_path / "expected")
+
+
+def test_old_file_functions_convert_in_place(tmp_path):
+    item_path = tmp_path / "Sales.SemanticModel"
+    write_model(item_path)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        assert utils.is_tabular_editor(str(item_path)) is False
+        assert utils.get_compatibility_level(str(item_path)) == 1500
+        assert utils.get_connection_info(str(item_path), "SqlDW") == ("srv", "DW")
+        assert "1605" in utils.update_database_tmdl(str(item_path))
+        assert utils.clean_definition_model(str(item_path)) == ["model Model\n", "\tculture: en-US\n", "ref table Sales\n"]
+        table_file = str(item_path / "definition" / "tables" / "Sales.tmdl")
+        assert "partition 'Sales' = m" in utils.transform_table_file(str(item_path), table_file)
+        utils.delete_definition_datasources(str(item_path))
+
+    assert not (item_path / "definition" / "dataSources.tmdl").exists()
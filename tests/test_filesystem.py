@@ -0,0 +1,85 @@
+import os
+
+import utils
+from filesystem import write_text_file, link_or_copy_file
+from metrics import RunMetrics, set_metrics
+
+
+TABLE = (
+    "table Sales\n"
+    "\tcolumn Amount\n"
+    "\t\tsourceColumn: Amount\n"
+    "\n"
+    "\tpartition Sales = query\n"
+    "\t\tdataSource: SqlDW\n"
+    "\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+)
+
+
+def run_twice(function):
+    """
+    Calls the function twice and returns the counters of the second call.
+    """
+    function()
+    metrics = RunMetrics()
+    previous_metrics = set_metrics(metrics)
+    try:
+        function()
+    finally:
+        set_metrics(previous_metrics)
+    return metrics.counters
+
+
+def set_old_mtime(*file_paths):
+    for file_path in file_paths:
+        os.utime(file_path, (1000000000, 1000000000))
+
+
+def test_identical_content_is_not_written_again(tmp_path):
+    file_path = str(tmp_path / "out" / "model.tmdl")
+    source_file = str(tmp_path / "source.tmdl")
+    copied_file = str(tmp_path / "out" / "copied.tmdl")
+    write_text_file(source_file, "model Model\n")
+
+    def write():
+        write_text_file(file_path, "model Model\n\tculture: en-US\n")
+        link_or_copy_file(source_file, copied_file)
+        set_old_mtime(file_path, copied_file)
+
+    counters = run_twice(write)
+    assert counters["files_unchanged"] == 2 and counters["files_written"] == 0
+    assert os.path.getmtime(file_path) == os.path.getmtime(copied_file) == 1000000000
+
+    metrics = RunMetrics()
+    previous_metrics = set_metrics(metrics)
+    try:
+        assert write_text_file(file_path, "model Model\n")
+    finally:
+        set_metrics(previous_metrics)
+    assert metrics.counters["files_written"] == 1
+    assert os.path.getmtime(file_path) != 1000000000
+
+
+def test_streamed_table_and_report_are_left_alone(tmp_path):
+    source_file = tmp_path / "Sales.tmdl"
+    source_file.write_text(TABLE, encoding="utf-8")
+    dest_file = str(tmp_path / "out" / "Sales.tmdl")
+    data_sources = {"sqldw": ("sqlsrv01", "DW", None)}
+    template = {
+        "path": "Default.Report", "files": {"definition.pbir": b"{}", "report.json": b"{}"},
+        "pbir": {"datasetReference": {"byPath": {"path": "../Model.SemanticModel"}}}, "platform": None
+    }
+    report_dir = str(tmp_path / "out" / "Sales.Report")
+
+    changed = []
+
+    def convert():
+        utils.stream_table_file(str(source_file), dest_file, False, data_sources, "None")
+        changed.append(utils.write_report_directory(template, report_dir, "Sales"))
+        set_old_mtime(dest_file, os.path.join(report_dir, "definition.pbir"))
+
+    counters = run_twice(convert)
+    assert counters["files_unchanged"] == 3 and counters["files_written"] == 0
+    assert changed == [True, False]
+    assert os.path.getmtime(dest_file) == 1000000000
+    assert not os.path.exists(dest_file + ".tmp")
@@ -0,0 +1,139 @@
+import functools
+
+import pytest
+
+import utils
+from config import validate_config, ConfigError
+from filesystem import MemoryFileSystem
+from hints import tighten_data_type
+from streaming import iter_line_parts
+
+
+CONFIG = validate_config({"columnHints": True})
+
+TABLE = (
+    "table {name}\n"
+    "\tcolumn OrderKey\n"
+    "\t\tdataType: int64\n"
+    "\t\tsummarizeBy: none\n"
+    "\t\tsourceColumn: OrderKey\n"
+    "\n"
+    "\tcolumn Quantity\n"
+    "\t\tdataType: double\n"
+    "\t\tsourceProviderType: int\n"
+    "\t\tsourceColumn: Quantity\n"
+    "\n"
+    "\tcolumn Year\n"
+    "\t\tdataType: int64\n"
+    "\t\tsummarizeBy: none\n"
+    "\t\tsourceColumn: Year\n"
+    "\n"
+    "\tcolumn Price\n"
+    "\t\tdataType: double\n"
+    "\t\tencodingHint: Hash\n"
+    "\t\tsourceColumn: Price\n"
+    "\n"
+    "\tcolumn Discount\n"
+    "\t\tdataType: double\n"
+    "\t\tsourceColumn: Discount\n"
+    "\n"
+    "\tcolumn Name\n"
+    "\t\tdataType: string\n"
+    "\t\tsourceColumn: Name\n"
+    "\n"
+    "\tpartition {name} = query\n"
+    "{mode}"
+    "\t\tdataSource: 'srv01 Shop'\n"
+    "\t\tquery = SELECT * FROM [dbo].[Orders]\n"
+    "\n"
+    "\tannotation TabularEditor_TableSchema = "
+    '{{"Name":"Orders","Schema":"dbo","Database":"Shop","Columns":[{{"Name":"Discount","DataType":"decimal(9, 2)"}}]}}\n'
+)
+
+
+def convert(name="Orders", mode="", config=CONFIG):
+    dest = MemoryFileSystem()
+    source = MemoryFileSystem({"T.tmdl": TABLE.format(name=name, mode=mode)})
+    utils.convert_table(source, dest, "T.tmdl", True, {}, config)
+    return dest.files["T.tmdl"].decode("utf-8")
+
+
+def get_column(content, name):
+    return content.split(f"\tcolumn {name}\n")[1].split("\n\n")[0]
+
+
+def test_tighter_data_types_from_the_source_type():
+    assert tighten_data_type("double", "int") == "int64"
+    assert tighten_data_type("double", "money") == "decimal"
+    assert tighten_data_type("double", "decimal(18, 2)") == "decimal"
+    assert tighten_data_type("double", "decimal(18, 6)") is None
+    assert tighten_data_type("double", "decimal") is None
+    assert tighten_data_type("int64", "bit") == "boolean"
+    assert tighten_data_type("string", "nvarchar(50)") is None
+    with pytest.raises(ConfigError):
+        validate_config({"columnHints": {"encoding": "yes"}})
+
+
+def test_hints_are_written_into_the_imported_columns():
+    content = convert()
+    # Integer key, tightened and aggregated columns get value encoding
+    assert get_column(content, "OrderKey") == "\t\tdataType: int64\n\t\tencodingHint: Value\n\t\tsummarizeBy: none\n" \
+                                             "\t\tsourceColumn: OrderKey"
+    assert get_column(content, "Quantity") == "\t\tdataType: int64\n\t\tencodingHint: Value\n\t\tsourceColumn: Quantity"
+    # The type of the Tabular Editor schema
+    assert get_column(content, "Discount").startswith("\t\tdataType: decimal\n\t\tencodingHint: Value\n")
+    # Group-by attributes, strings and explicit hints are left alone
+    assert "encodingHint" not in get_column(content, "Year") + get_column(content, "Name")
+    assert get_column(content, "Price") == "\t\tdataType: double\n\t\tencodingHint: Hash\n\t\tsourceColumn: Price"
+
+
+def test_no_hints_without_the_section_or_an_import_partition():
+    assert "encodingHint: Value" not in convert(config=None)
+    config = validate_config({"columnHints": True, "storageModes": {"default": "directQuery"}})
+    assert "encodingHint: Value" not in convert(config=config)
+
+
+@pytest.mark.parametrize("mode", ["", "\t\tmode: directQuery\n"])
+def test_stream_table_file_writes_the_same_hints(tmp_path, monkeypatch, mode):
+    # The original mode of the partition is kept
+    config = validate_config({"columnHints": True, "storageModes": {}})
+    monkeypatch.setattr(utils, "iter_line_parts", functools.partial(iter_line_parts, chunk_size=48))
+    source_file = tmp_path / "T.tmdl"
+    source_file.write_text(TABLE.format(name="Orders", mode=mode), encoding="utf-8")
+    dest_file = tmp_path / "out" / "T.tmdl"
+
+    utils.stream_table_file(str(source_file), str(dest_file), True, {}, "None", config, {}, {"name"})
+
+    dest = MemoryFileSystem()
+    utils.convert_table(
+        MemoryFileSystem({"T.tmdl": TABLE.format(name="Orders", mode=mode)}), dest, "T.tmdl", True, {}, config, {},
+        {"name"}
+    )
+    content = dest_file.read_text(encoding="utf-8")
+    assert content == dest.files["T.tmdl"].decode("utf-8")
+    assert ("encodingHint: Value" in content) == (mode == "")
+
+
+def test_hints_of_a_column_without_a_data_type_line(tmp_path, monkeypatch):
+    # The dataType lines are dropped by a rule: the hints go at the end of each column block
+    config = validate_config({
+        "columnHints": True,
+        "transformRules": [{"keyword": "dataType", "action": "drop"}]
+    })
+    table = TABLE.replace("\tcolumn Name\n", "\t/// The customer\n\tcolumn Name\n")
+    content = convert(config=config)
+    assert get_column(content, "Quantity") == "\t\tsourceColumn: Quantity\n\t\tdataType: int64\n\t\tencodingHint: Value"
+    assert get_column(content, "Year") == "\t\tsummarizeBy: none\n\t\tsourceColumn: Year"
+
+    monkeypatch.setattr(utils, "iter_line_parts", functools.partial(iter_line_parts, chunk_size=48))
+    source_file = tmp_path / "T.tmdl"
+    source_file.write_text(table.format(name="Orders", mode=""), encoding="utf-8")
+    dest_file = tmp_path / "out" / "T.tmdl"
+    utils.stream_table_file(str(source_file), str(dest_file), True, {}, "None", config, {})
+
+    dest = MemoryFileSystem()
+    utils.convert_table(MemoryFileSystem({"T.tmdl": table.format(name="Orders", mode="")}), dest, "T.tmdl", True,
+                        {}, config, {})
+    content = dest_file.read_text(encoding="utf-8")
+    assert content == dest.files["T.tmdl"].decode("utf-8")
+    assert "\t\tsourceColumn: Discount\n\t\tdataType: decimal\n\t\tencodingHint: Value\n\n\t/// The customer\n" in content
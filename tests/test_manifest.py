@@ -0,0 +1,90 @@
+import os
+import shutil
+
+from manifest import load_manifest, compare_file_hashes
+from utils import find_semantic_models
+from process import run
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\nref table Sales\nref table Customer\n",
+    "definition/dataSources.tmdl": (
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    ),
+    "definition/tables/Sales.tmdl": (
+        "table Sales\n"
+        "\tcolumn Amount\n"
+        "\t\tsourceColumn: Amount\n"
+        "\n"
+        "\tpartition Sales = query\n"
+        "\t\tdataSource: SqlDW\n"
+        "\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+    ),
+    "definition/tables/Customer.tmdl": (
+        "table Customer\n"
+        "\tcolumn Name\n"
+        "\t\tsourceColumn: Name\n"
+        "\n"
+        "\tpartition Customer = query\n"
+        "\t\tdataSource: SqlDW\n"
+        "\t\tquery = SELECT * FROM [dbo].[Customer]\n"
+    ),
+}
+
+
+def write_model(folder):
+    for relative_path, content in FILES.items():
+        path = folder / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def test_file_hashes_are_compared():
+    assert compare_file_hashes({"a": "1", "b": "2", "c": "3"}, {"a": "1", "b": "9", "d": "4"}) == (["b", "d"], ["c"])
+
+
+def test_unchanged_models_are_skipped_and_changed_tables_converted_alone(tmp_path):
+    input_path, output_path = tmp_path / "in", tmp_path / "out"
+    write_model(input_path / "Sales.SemanticModel")
+    write_model(input_path / "Other.SemanticModel")
+    run(str(input_path), str(output_path), DEFAULT_REPORT_PATH)
+
+    assert find_semantic_models(str(input_path), str(output_path), load_manifest(str(output_path))) == []
+    metrics = run(str(input_path), str(output_path), DEFAULT_REPORT_PATH)
+    assert metrics.counters["files_written"] == 0
+    assert metrics.counters["files_skipped"] == 2 * len(FILES)
+
+    tables = input_path / "Sales.SemanticModel" / "definition" / "tables"
+    (tables / "Sales.tmdl").write_text(FILES["definition/tables/Sales.tmdl"].replace("Amount", "Total"), encoding="utf-8")
+    (tables / "Customer.tmdl").unlink()
+    models = find_semantic_models(str(input_path), str(output_path), load_manifest(str(output_path)))
+
+    assert [(model["name"], model["changed"]) for model in models] == [
+        ("Sales.SemanticModel", ["definition/tables/Sales.tmdl"])
+    ]
+    # The table removed from the input is removed from the output
+    assert not (output_path / "Sales.SemanticModel" / "definition" / "tables" / "Customer.tmdl").exists()
+
+
+def test_model_level_changes_convert_the_whole_model_and_removed_models_are_forgotten(tmp_path):
+    input_path, output_path = tmp_path / "in", tmp_path / "out"
+    write_model(input_path / "Sales.SemanticModel")
+    write_model(input_path / "Other.SemanticModel")
+    run(str(input_path), str(output_path), DEFAULT_REPORT_PATH)
+
+    data_sources = input_path / "Sales.SemanticModel" / "definition" / "dataSources.tmdl"
+    data_sources.write_text(FILES["definition/dataSources.tmdl"].replace("sqlsrv01", "sqlsrv02"), encoding="utf-8")
+    shutil.rmtree(input_path / "Other.SemanticModel")
+    manifest = load_manifest(str(output_path))
+    models = find_semantic_models(str(input_path), str(output_path), manifest)
+
+    assert [(model["name"], model["changed"]) for model in models] == [("Sales.SemanticModel", None)]
+    assert list(manifest["models"]) == ["Sales.SemanticModel"]
+
+    run(str(input_path), str(output_path), DEFAULT_REPORT_PATH)
+    table = output_path / "Sales.SemanticModel" / "definition" / "tables" / "Customer.tmdl"
+    assert "sqlsrv02" in table.read_text(encoding="utf-8")
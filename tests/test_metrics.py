@@ -0,0 +1,61 @@
+import os
+import json
+
+from metrics import RunMetrics, format_bytes, COUNTERS, DEBUG, ERROR
+from process import run
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n",
+    "definition/tables/Sales.tmdl": "table Sales\n\tcolumn Amount\n\t\tsourceColumn: Amount\n",
+    "diagramLayout.json": "{}",
+}
+
+
+def test_counters_stages_and_report(tmp_path):
+    metrics = RunMetrics()
+    with metrics.stage("discover"):
+        metrics.count("files_read")
+        metrics.count("bytes_in", 1536)
+    metrics.merge({"files_read": 2, "files_written": 1})
+
+    assert list(metrics.counters) == list(COUNTERS)
+    assert metrics.counters["files_read"] == 3 and metrics.counters["files_written"] == 1
+    assert list(metrics.stage_seconds()) == ["discover"]
+    assert "3 read, 1 written" in metrics.summary() and "1.5 KB in" in metrics.summary()
+    assert format_bytes(512) == "512 B" and format_bytes(3 * 1024 ** 3) == "3.0 GB"
+
+    metrics.write_report(str(tmp_path / "report.json"))
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert report["counters"] == metrics.counters and list(report["stages"]) == ["discover"]
+
+
+def test_messages_are_filtered_by_verbosity(capsys):
+    RunMetrics(ERROR).log("details", DEBUG)
+    RunMetrics(ERROR).log("failure", ERROR)
+    RunMetrics(DEBUG).log("details", DEBUG)
+
+    captured = capsys.readouterr()
+    assert captured.out == "details\n" and captured.err == "failure\n"
+
+
+def test_run_counts_the_files_of_each_stage(tmp_path):
+    for relative_path, content in FILES.items():
+        path = tmp_path / "in" / "Sales.SemanticModel" / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+    metrics = run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+    assert list(metrics.stages) == ["discover", "convert_models", "render_reports", "save_manifest"]
+    # The .tmdl files are read once, the other files copied without being read, and the report template read once
+    report_files = sum(len(files) for _, _, files in os.walk(DEFAULT_REPORT_PATH))
+    assert metrics.counters["files_read"] == len(FILES) - 1 + report_files
+    assert metrics.counters["files_written"] + metrics.counters["files_linked"] == len(FILES) + report_files
+    assert metrics.counters["bytes_in"] > 0 and metrics.counters["files_failed"] == 0
+
+    metrics = run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+    assert metrics.counters["files_skipped"] == len(FILES) and metrics.counters["files_written"] == 0
@@ -0,0 +1,53 @@
+import os
+
+from process import run
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+TABLE = (
+    "table {name}\n"
+    "\tcolumn Amount\n"
+    "\t\tsourceColumn: Amount\n"
+    "\n"
+    "\tpartition {name} = query\n"
+    "\t\tdataSource: SqlDW\n"
+    "\t\tquery = SELECT * FROM [dbo].[{name}]\n"
+)
+
+
+def write_model(folder, table_count):
+    files = {
+        "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+        "definition/model.tmdl": "model Model\n\tculture: en-US\n",
+        "definition/dataSources.tmdl": (
+            "dataSource SqlDW = provider\n"
+            "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+        ),
+    }
+    for index in range(table_count):
+        files[f"definition/tables/Table{index}.tmdl"] = TABLE.format(name=f"Table{index}")
+    for relative_path, content in files.items():
+        path = folder / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def read_output(output_path):
+    return {
+        str(path.relative_to(output_path)): path.read_bytes() for path in output_path.rglob("*")
+        if path.is_file() and not path.name.startswith(".conversion")
+    }
+
+
+def test_parallel_run_gives_the_output_of_a_single_job(tmp_path):
+    write_model(tmp_path / "in" / "Sales.SemanticModel", 12)
+    write_model(tmp_path / "in" / "Finance.SemanticModel", 3)
+
+    single = run(str(tmp_path / "in"), str(tmp_path / "single"), DEFAULT_REPORT_PATH, jobs=1)
+    parallel = run(str(tmp_path / "in"), str(tmp_path / "parallel"), DEFAULT_REPORT_PATH, jobs=3)
+
+    assert read_output(tmp_path / "parallel") == read_output(tmp_path / "single")
+    # The counters of the workers are merged into the metrics of the run
+    for name in ("files_read", "files_written", "files_failed"):
+        assert parallel.counters[name] == single.counters[name]
@@ -0,0 +1,71 @@
+import os
+
+from plan import plan_run, format_plan, summarize_plan
+from process import run
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\nref table Sales\n",
+    "definition/dataSources.tmdl": (
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    ),
+    "definition/tables/Sales.tmdl": (
+        "table Sales\n"
+        "\tcolumn Amount\n"
+        "\t\tsourceColumn: Amount\n"
+        "\n"
+        "\tpartition Sales = query\n"
+        "\t\tdataSource: SqlDW\n"
+        "\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+    ),
+}
+
+
+def write_files(folder, files):
+    for relative_path, content in files.items():
+        path = folder / "Model.SemanticModel" / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def snapshot(folder):
+    return {str(path): (path.stat().st_mtime, path.read_bytes()) for path in folder.rglob("*") if path.is_file()}
+
+
+def test_plan_of_an_up_to_date_output_is_empty(tmp_path):
+    write_files(tmp_path / "in", FILES)
+    run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+    changes = plan_run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+    assert changes == []
+    assert summarize_plan(changes) == "Plan: no changes, the output is up to date."
+
+
+def test_plan_writes_nothing_and_diffs_every_change(tmp_path):
+    write_files(tmp_path / "in", FILES)
+    run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+    files = dict(FILES)
+    files["definition/tables/Sales.tmdl"] = files["definition/tables/Sales.tmdl"].replace("Amount", "Total")
+    files["definition/tables/Customer.tmdl"] = "table Customer\n\tcolumn Name\n\t\tsourceColumn: Name\n"
+    write_files(tmp_path / "in", files)
+    (tmp_path / "out" / "Model.Report" / "notes.txt").write_text("draft\n", encoding="utf-8")
+    before = snapshot(tmp_path / "out")
+
+    changes = plan_run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+    assert snapshot(tmp_path / "out") == before
+    assert [(change["action"], change["path"]) for change in changes] == [
+        ("add", "Model.SemanticModel/definition/tables/Customer.tmdl"),
+        ("change", "Model.SemanticModel/definition/tables/Sales.tmdl"),
+        ("remove", "Model.Report/notes.txt"),
+    ]
+    diff = "".join(format_plan(changes))
+    assert "--- /dev/null\n+++ b/Model.SemanticModel/definition/tables/Customer.tmdl\n" in diff
+    assert "\n-\tcolumn Amount\n" in diff and "\n+\tcolumn Total\n" in diff
+    assert "--- a/Model.Report/notes.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-draft\n" in diff
+    assert summarize_plan(changes) == "Plan: 1 to add, 1 to change, 1 to remove."
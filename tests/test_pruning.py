@@ -0,0 +1,134 @@
+import functools
+
+import pytest
+
+import utils
+from config import validate_config, ConfigError
+from filesystem import MemoryFileSystem
+from pruning import ReferenceGraph
+from streaming import iter_line_parts
+
+
+CONFIG = validate_config({"pruning": True})
+
+SALES_TABLE = (
+    "table Sales\n"
+    "\tmeasure Total = SUM(Sales[Amount]) + COUNTROWS('Sales Log')\n"
+    "\n"
+    "\tcolumn Amount\n"
+    "\t\tsourceColumn: Amount\n"
+    "\n"
+    "\t/// Surrogate key of the source\n"
+    "\tcolumn SalesKey\n"
+    "\t\tisHidden\n"
+    "\t\tsourceColumn: SalesKey\n"
+    "\n"
+    "\t\tannotation SummarizationSetBy = Automatic\n"
+    "\n"
+    "\tcolumn CustomerKey\n"
+    "\t\tisHidden\n"
+    "\t\tsourceColumn: CustomerKey\n"
+    "\n"
+    "\tcolumn Month\n"
+    "\t\tisHidden\n"
+    "\t\tsourceColumn: Month\n"
+    "\n"
+    "\tcolumn 'Month Name'\n"
+    "\t\tsortByColumn: Month\n"
+    "\t\tsourceColumn: MonthName\n"
+    "\n"
+    "\tpartition Sales = query\n"
+    "\t\tdataSource: SqlDW\n"
+    "\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+)
+
+FILES = {
+    "definition/model.tmdl": (
+        "model Model\n\tculture: en-US\n\nref table Sales\nref table Customer\nref table 'Sales Log'\nref table Audit\n"
+    ),
+    "definition/dataSources.tmdl": (
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    ),
+    "definition/relationships.tmdl": (
+        "relationship 1a2b\n"
+        "\tfromColumn: Sales.CustomerKey\n"
+        "\ttoColumn: Customer.CustomerKey\n"
+    ),
+    "definition/tables/Sales.tmdl": SALES_TABLE,
+    "definition/tables/Customer.tmdl": (
+        "table Customer\n"
+        "\tcolumn CustomerKey\n"
+        "\t\tisHidden\n"
+        "\t\tsourceColumn: CustomerKey\n"
+        "\n"
+        "\tpartition Customer = query\n"
+        "\t\tdataSource: SqlDW\n"
+        "\t\tquery = SELECT * FROM [dbo].[Customer]\n"
+    ),
+    "definition/tables/Sales Log.tmdl": (
+        "table 'Sales Log'\n"
+        "\tisHidden\n"
+        "\n"
+        "\tcolumn Id\n"
+        "\t\tsourceColumn: Id\n"
+    ),
+    "definition/tables/Audit.tmdl": (
+        "table Audit\n"
+        "\tisHidden\n"
+        "\n"
+        "\tcolumn Id\n"
+        "\t\tsourceColumn: Id\n"
+    ),
+}
+
+
+def build_graph():
+    graph = ReferenceGraph()
+    for relative_path, content in FILES.items():
+        graph.add_file(relative_path, content)
+    return graph
+
+
+def test_only_unreferenced_hidden_columns_and_tables_are_pruned():
+    tables, columns = build_graph().plan()
+    assert tables == {"definition/tables/Audit.tmdl": "Audit"}
+    assert columns == {"definition/tables/Sales.tmdl": {"saleskey"}}
+
+    # Everything unreferenced, hidden or not
+    tables, columns = build_graph().plan("all")
+    assert set(tables) == {"definition/tables/Audit.tmdl"}
+    assert columns == {"definition/tables/Sales.tmdl": {"saleskey", "month name"}}
+
+    with pytest.raises(ConfigError):
+        validate_config({"pruning": {"scope": "visible"}})
+
+
+def test_pruned_columns_and_tables_are_left_out_of_the_model():
+    dest = MemoryFileSystem()
+    assert utils.convert_semantic_model_files(MemoryFileSystem(FILES), dest, config=CONFIG) == {}
+
+    assert "definition/tables/Audit.tmdl" not in dest.files
+    assert dest.files["definition/model.tmdl"].decode("utf-8") == (
+        "model Model\n\tculture: en-US\nref table Sales\nref table Customer\nref table 'Sales Log'\n"
+    )
+    sales = dest.files["definition/tables/Sales.tmdl"].decode("utf-8")
+    assert "SalesKey" not in sales and "Surrogate key" not in sales and "SummarizationSetBy" not in sales
+    assert "\t\tsourceColumn: Amount\n\n\tcolumn CustomerKey\n" in sales
+    assert "SELECT [Amount] AS [Amount], [CustomerKey] AS [CustomerKey], [Month] AS [Month]" in sales
+
+
+def test_stream_table_file_prunes_the_same_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "iter_line_parts", functools.partial(iter_line_parts, chunk_size=20))
+    source_file = tmp_path / "Sales.tmdl"
+    source_file.write_text(SALES_TABLE, encoding="utf-8")
+    dest_file = tmp_path / "out" / "Sales.tmdl"
+    data_sources = {"sqldw": ("sqlsrv01", "DW", None)}
+
+    utils.stream_table_file(str(source_file), str(dest_file), False, data_sources, "None", None, {}, {"saleskey"})
+
+    dest = MemoryFileSystem()
+    utils.convert_table(
+        MemoryFileSystem({"T.tmdl": SALES_TABLE}), dest, "T.tmdl", False, data_sources, None, {}, {"saleskey"}
+    )
+    assert dest_file.read_text(encoding="utf-8") == dest.files["T.tmdl"].decode("utf-8")
@@ -0,0 +1,103 @@
+import functools
+
+import pytest
+
+import utils
+from config import validate_config, ConfigError
+from filesystem import MemoryFileSystem
+from refresh import find_refresh_policy
+from streaming import iter_line_parts
+
+
+CONFIG = validate_config({
+    "incrementalRefresh": {
+        "rangeStart": "2024-01-01",
+        "rules": [
+            {"tables": ["Fact*"], "dateColumn": "Order Date", "incrementalGranularity": "month"},
+            {"tables": "Sales"}
+        ]
+    }
+})
+
+COLUMNS = [
+    {"name": "Amount", "sourceColumn": "Amount", "dataType": "decimal"},
+    {"name": "Order Date", "sourceColumn": "OrderDate", "dataType": "dateTime"},
+    {"name": "Ship Date", "sourceColumn": None, "dataType": "dateTime"},
+]
+
+SALES_TABLE = (
+    "table Sales\n"
+    "\tcolumn Amount\n"
+    "\t\tdataType: decimal\n"
+    "\t\tsourceColumn: Amount\n"
+    "\n"
+    "\tcolumn 'Order Date'\n"
+    "\t\tdataType: dateTime\n"
+    "\t\tsourceColumn: OrderDate\n"
+    "\n"
+    "\tpartition Sales = query\n"
+    "\t\tdataSource: SqlDW\n"
+    "\t\tquery = SELECT * FROM [dbo].[FactSales]\n"
+)
+
+DATA_SOURCES = {"sqldw": ("sqlsrv01", "DW", None)}
+
+
+def test_config_defaults_and_errors():
+    section = CONFIG["incrementalRefresh"]
+    assert section["rangeEnd"] == "2025-01-01"
+    assert section["rules"][1]["rollingWindowGranularity"] == "year"
+    assert section["rules"][1]["tables"] == ["Sales"]
+    with pytest.raises(ConfigError):
+        validate_config({"incrementalRefresh": {"rules": [{"incrementalGranularity": "week", "tables": "*"}]}})
+    with pytest.raises(ConfigError):
+        validate_config({"incrementalRefresh": {"rules": [{"rollingWindowPeriods": 3}]}})
+
+
+def test_first_matching_rule_wins():
+    policy = find_refresh_policy(CONFIG, "FactSales", COLUMNS)
+    assert (policy["column"], policy["incrementalGranularity"]) == ("OrderDate", "month")
+    # Without dateColumn the first dateTime column loaded from the source is used
+    assert find_refresh_policy(CONFIG, "sales", COLUMNS)["column"] == "OrderDate"
+    assert find_refresh_policy(CONFIG, "Customer", COLUMNS) is None
+    assert find_refresh_policy(None, "Sales", COLUMNS) is None
+
+
+def test_refresh_policy_in_converted_table():
+    source = MemoryFileSystem({"definition/tables/Sales.tmdl": SALES_TABLE})
+    dest = MemoryFileSystem()
+
+    errors = utils.convert_semantic_model_files(source, dest, config=CONFIG)
+
+    content = dest.files["definition/tables/Sales.tmdl"].decode("utf-8")
+    assert errors == {}
+    assert "FROM [dbo].[Sales] WHERE [OrderDate] >= '\" & DateTime.ToText(RangeStart" in content
+    assert "\n    refreshPolicy\n        policyType: basic\n" in content
+    assert content.count("Sql.Database(") == 2
+    expressions = dest.files["definition/expressions.tmdl"].decode("utf-8")
+    assert expressions.startswith("expression RangeEnd = #datetime(2025, 1, 1, 0, 0, 0) meta")
+    assert "expression RangeStart = #datetime(2024, 1, 1, 0, 0, 0) meta" in expressions
+
+
+def test_existing_expressions_are_kept():
+    content = "expression RangeStart = #datetime(2000, 1, 1, 0, 0, 0)\n\tlineageTag: 1\n"
+    merged = utils.merge_expressions(content, {"RangeStart": "x", "Server Name": '"srv"'})
+    assert merged == content + "\nexpression 'Server Name' = \"srv\"\n"
+
+
+@pytest.mark.parametrize("chunk_size", [65536, 40])
+def test_stream_table_file_with_refresh_policy(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(utils, "iter_line_parts", functools.partial(iter_line_parts, chunk_size=chunk_size))
+    source_file = tmp_path / "Sales.tmdl"
+    source_file.write_text(SALES_TABLE, encoding="utf-8")
+    dest_file = tmp_path / "out" / "Sales.tmdl"
+    streamed_expressions, expressions = {}, {}
+
+    utils.stream_table_file(str(source_file), str(dest_file), False, DATA_SOURCES, "None", CONFIG, streamed_expressions)
+    dest = MemoryFileSystem()
+    utils.convert_table(
+        MemoryFileSystem({"Sales.tmdl": SALES_TABLE}), dest, "Sales.tmdl", False, DATA_SOURCES, CONFIG, expressions
+    )
+
+    assert dest_file.read_bytes() == dest.files["Sales.tmdl"]
+    assert streamed_expressions == expressions and set(expressions) == {"RangeStart", "RangeEnd"}
@@ -0,0 +1,58 @@
+import os
+import json
+
+from utils import copy_and_rename_reports, load_report_template, write_report_directory
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+
+def test_reports_point_to_their_semantic_model(tmp_path):
+    (tmp_path / "Sales.SemanticModel").mkdir()
+    (tmp_path / "Finance.SemanticModel").mkdir()
+    (tmp_path / "Notes").mkdir()
+
+    assert copy_and_rename_reports(str(tmp_path), DEFAULT_REPORT_PATH) == ["Finance", "Sales"]
+
+    report_path = tmp_path / "Sales.Report"
+    pbir = json.loads((report_path / "definition.pbir").read_text(encoding="utf-8"))
+    platform = json.loads((report_path / ".platform").read_text(encoding="utf-8"))
+    assert pbir["datasetReference"]["byPath"]["path"] == "../Sales.SemanticModel"
+    assert platform["metadata"]["displayName"] == "Sales"
+    assert (report_path / "report.json").read_bytes() == (tmp_path / "Finance.Report" / "report.json").read_bytes()
+    assert not (tmp_path / "Notes.Report").exists()
+
+
+def test_reports_are_rendered_again_only_when_they_differ(tmp_path):
+    template = load_report_template(DEFAULT_REPORT_PATH)
+    report_path = tmp_path / "Sales.Report"
+    assert write_report_directory(template, str(report_path), "Sales")
+    assert not write_report_directory(template, str(report_path), "Sales")
+
+    (report_path / "extra.json").write_text("{}", encoding="utf-8")
+    (report_path / "report.json").write_text("{}", encoding="utf-8")
+    assert write_report_directory(template, str(report_path), "Sales")
+    assert not (report_path / "extra.json").exists()
+    assert (report_path / "report.json").read_bytes() == template["files"]["report.json"]
+    assert load_report_template(DEFAULT_REPORT_PATH) == template
+
+
+def test_only_links_of_the_template_are_copied_again(tmp_path):
+    template_path = tmp_path / "Default.Report"
+    (template_path).mkdir()
+    (template_path / "report.json").write_text("{}", encoding="utf-8")
+    (template_path / "theme.json").write_text("[]", encoding="utf-8")
+    template = load_report_template(str(template_path))
+    report_path = tmp_path / "Sales.Report"
+    report_path.mkdir()
+    # Linked to the template by an earlier version
+    os.link(template_path / "report.json", report_path / "report.json")
+    # Up to date and linked to a file of the user
+    (tmp_path / "theme.json").write_text("[]", encoding="utf-8")
+    os.link(tmp_path / "theme.json", report_path / "theme.json")
+
+    write_report_directory(template, str(report_path), "Sales")
+
+    assert (report_path / "report.json").stat().st_nlink == 1
+    assert (template_path / "report.json").stat().st_nlink == 1
+    assert (report_path / "theme.json").stat().st_nlink == 2
@@ -0,0 +1,131 @@
+import functools
+
+import pytest
+
+import utils
+from config import validate_config, ConfigError
+from filesystem import MemoryFileSystem
+from streaming import iter_line_parts
+
+
+CONFIG = validate_config({
+    "transformRules": [
+        {"keyword": "annotation", "names": "PBI_*", "action": "drop"},
+        {"tables": "Fact*", "keyword": "formatString", "action": "rewrite", "pattern": "^0$", "replacement": "#,0"},
+        {"keyword": "column", "names": "rowguid", "action": "replace",
+         "with": ["column RowId", "\tdataType: string", "\tsourceColumn: rowguid"]},
+        {"files": "definition/model.tmdl", "keyword": "annotation", "names": "Owner", "action": "keep"},
+        {"files": "definition/relationships.tmdl", "keyword": "crossFilteringBehavior", "action": "drop"}
+    ]
+})
+
+TABLE = (
+    "table {name}\n"
+    "\tmeasure Total = SUM({name}[Amount])\n"
+    "\t\tformatString: 0\n"
+    "\n"
+    "\tcolumn Amount\n"
+    "\t\tdataType: int64\n"
+    "\t\tsourceProviderType: int\n"
+    "\t\tformatString: 0\n"
+    "\t\tsourceColumn: Amount\n"
+    "\n"
+    "\t\t/// Set by Power BI\n"
+    "\t\tannotation PBI_FormatHint = {{\"isGeneralNumber\":true}}\n"
+    "\n"
+    "\tcolumn rowguid\n"
+    "\t\tdataType: string\n"
+    "\t\tsourceColumn: rowguid\n"
+    "\n"
+    "\tpartition {name} = query\n"
+    "\t\tdataSource: SqlDW\n"
+    "\t\tquery = SELECT * FROM [dbo].[{name}]\n"
+)
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\n\tannotation Owner = BI\n\n\tannotation Other = 1\n",
+    "definition/dataSources.tmdl": (
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    ),
+    "definition/relationships.tmdl": (
+        "relationship 1a2b\n"
+        "\tcrossFilteringBehavior: bothDirections\n"
+        "\tfromColumn: FactSales.Amount\n"
+        "\ttoColumn: Dim.Amount\n"
+    ),
+    "definition/tables/FactSales.tmdl": TABLE.format(name="FactSales"),
+    "definition/tables/Dim.tmdl": TABLE.format(name="Dim"),
+}
+
+
+def convert(config):
+    dest = MemoryFileSystem()
+    assert utils.convert_semantic_model_files(MemoryFileSystem(FILES), dest, config=config) == {}
+    return {path: content.decode("utf-8") for path, content in dest.files.items()}
+
+
+def test_rules_of_the_configuration_are_applied_with_the_builtin_ones():
+    files = convert(CONFIG)
+
+    fact = files["definition/tables/FactSales.tmdl"]
+    assert fact.startswith(
+        "table FactSales\n"
+        "\tmeasure Total = SUM(FactSales[Amount])\n"
+        "\t\tformatString: #,0\n"
+        "\n"
+        "\tcolumn Amount\n"
+        "\t\tdataType: int64\n"
+        "\t\tformatString: #,0\n"
+        "\t\tsourceColumn: Amount\n"
+        "\n"
+        "\tcolumn RowId\n"
+        "\t\tdataType: string\n"
+        "\t\tsourceColumn: rowguid\n"
+    )
+    # Only the tables matching the rule are rewritten
+    assert "\t\tformatString: 0\n" in files["definition/tables/Dim.tmdl"]
+    assert "PBI_FormatHint" not in files["definition/tables/Dim.tmdl"]
+
+    assert files["definition/database.tmdl"] == "database Model\n\tcompatibilityLevel: 1605\n"
+    assert files["definition/model.tmdl"] == "model Model\n\tculture: en-US\n\tannotation Owner = BI\n"
+    assert "crossFilteringBehavior" not in files["definition/relationships.tmdl"]
+    assert "fromColumn: FactSales.Amount" in files["definition/relationships.tmdl"]
+
+
+def test_builtin_rules_can_be_turned_off():
+    files = convert(validate_config({"transformRules": {"builtin": False}}))
+
+    assert files["definition/database.tmdl"] == FILES["definition/database.tmdl"]
+    assert files["definition/model.tmdl"] == FILES["definition/model.tmdl"]
+    assert "sourceProviderType: int" in files["definition/tables/Dim.tmdl"]
+
+    for rule in (
+        {"keyword": "formatString", "action": "replace", "with": ""},
+        {"keyword": "column", "action": "rewrite", "replacement": "x"},
+        {"keyword": "table", "action": "drop"},
+        {"keyword": "annotation", "action": "drop", "tables": "*", "files": "*"},
+        {"keyword": "formatString", "action": "rewrite", "pattern": "(", "replacement": ""},
+        {"files": "definition/expressions.tmdl", "keyword": "annotation", "action": "drop"},
+        {"files": ["definition/*.tmdl", "Definition/DataSources.tmdl"], "keyword": "annotation", "action": "drop"},
+    ):
+        with pytest.raises(ConfigError):
+            validate_config({"transformRules": [rule]})
+    with pytest.raises(ConfigError, match="transformRule"):
+        validate_config({"transformRule": []})
+
+
+def test_stream_table_file_applies_the_same_rules(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "iter_line_parts", functools.partial(iter_line_parts, chunk_size=20))
+    content = TABLE.format(name="FactSales")
+    source_file = tmp_path / "FactSales.tmdl"
+    source_file.write_text(content, encoding="utf-8")
+    dest_file = tmp_path / "out" / "FactSales.tmdl"
+    data_sources = {"sqldw": ("sqlsrv01", "DW", None)}
+
+    utils.stream_table_file(str(source_file), str(dest_file), False, data_sources, "None", CONFIG)
+
+    dest = MemoryFileSystem()
+    utils.convert_table(MemoryFileSystem({"T.tmdl": content}), dest, "T.tmdl", False, data_sources, CONFIG)
+    assert dest_file.read_text(encoding="utf-8") == dest.files["T.tmdl"].decode("utf-8")
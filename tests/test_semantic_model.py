@@ -0,0 +1,96 @@
+import os
+
+from filesystem import MemoryFileSystem
+from semantic_model import SemanticModel
+from utils import prepare_semantic_model
+from process import run
+
+
+class CountingFileSystem(MemoryFileSystem):
+    def __init__(self, files):
+        super().__init__(files)
+        self.reads = []
+
+    def read_bytes(self, relative_path):
+        self.reads.append(relative_path)
+        return super().read_bytes(relative_path)
+
+
+MODEL_FILES = {
+    "definition/database.tmdl": "database Sales\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\tdataAccessOptions\n\t\tlegacyRedirects\n\nref table Sales\n",
+    "definition/DataSources.tmdl": "dataSource SqlDW = provider\n\tconnectionString: Data Source=srv;Initial Catalog=DW\n",
+    "definition/tables/Sales.tmdl": "table Sales\n",
+    "definition/tables/Customer.tmdl": "table Customer\n",
+    "diagramLayout.json": "{}",
+}
+
+
+def test_properties_are_loaded_once():
+    source = CountingFileSystem(MODEL_FILES)
+    model = SemanticModel(source)
+
+    assert model.tabular_editor is False
+    assert model.compatibility_level == 1500
+    assert model.data_sources == {"sqldw": ("srv", "DW", None)}
+    assert model.table_files == ["definition/tables/Customer.tmdl", "definition/tables/Sales.tmdl"]
+    model.read_text("definition/model.tmdl")
+    model.read_text("definition/database.tmdl")
+
+    assert sorted(source.reads) == ["definition/DataSources.tmdl", "definition/database.tmdl", "definition/model.tmdl"]
+
+
+def test_tabular_editor_model_has_no_data_source_index():
+    files = dict(MODEL_FILES)
+    files["definition/model.tmdl"] += "\nannotation __TEdtr = 1\n"
+    source = CountingFileSystem(files)
+    model = SemanticModel(source)
+
+    assert model.tabular_editor is True
+    assert model.data_sources == {}
+    assert "definition/DataSources.tmdl" not in source.reads
+
+
+def test_changes_are_staged_until_flush():
+    source = MemoryFileSystem(MODEL_FILES)
+    dest = MemoryFileSystem({"definition/DataSources.tmdl": "old"})
+    model = SemanticModel(source)
+
+    model.write_text("definition/model.tmdl", "model Model\n")
+    model.copy_from(source, "diagramLayout.json")
+    model.remove("definition/DataSources.tmdl")
+    assert model.read_text("definition/model.tmdl") == MODEL_FILES["definition/model.tmdl"]
+    assert dest.files == {"definition/DataSources.tmdl": b"old"}
+
+    assert model.flush(dest) == 3
+    assert dest.files == {"definition/model.tmdl": b"model Model\n", "diagramLayout.json": b"{}"}
+    assert model.flush(dest) == 0
+
+
+def test_prepare_semantic_model_reads_each_definition_file_once():
+    source = CountingFileSystem(MODEL_FILES)
+    dest = MemoryFileSystem()
+
+    table_files, tabular_editor, data_sources, pruned_columns = prepare_semantic_model(source, dest)
+
+    assert table_files == ["definition/tables/Customer.tmdl", "definition/tables/Sales.tmdl"]
+    assert not tabular_editor and "sqldw" in data_sources and pruned_columns == {}
+    assert sorted(source.reads) == [
+        "definition/DataSources.tmdl", "definition/database.tmdl", "definition/model.tmdl", "diagramLayout.json"
+    ]
+    assert dest.files["definition/database.tmdl"] == b"database Sales\n\tcompatibilityLevel: 1605\n"
+    assert dest.files["definition/model.tmdl"] == b"model Model\n\tculture: en-US\nref table Sales\n"
+    assert "definition/DataSources.tmdl" not in dest.files
+
+
+def test_unchanged_files_are_hard_linked_with_link(tmp_path):
+    source = tmp_path / "in" / "Sales.SemanticModel"
+    for relative_path, content in MODEL_FILES.items():
+        (source / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (source / relative_path).write_text(content, encoding="utf-8")
+    default_report_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+    run(str(tmp_path / "in"), str(tmp_path / "out"), default_report_path, link=True)
+
+    # Copied unchanged, so linked to the input file
+    assert (tmp_path / "out" / "Sales.SemanticModel" / "diagramLayout.json").stat().st_nlink > 1
@@ -0,0 +1,85 @@
+import os
+import json
+
+import pytest
+
+from shards import parse_shard, assign_shards, merge_shards, ShardError
+from manifest import MANIFEST_FILE_NAME
+from process import run
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+TABLE = (
+    "table {name}\n"
+    "\tcolumn Amount\n"
+    "\t\tsourceColumn: Amount\n"
+    "\n"
+    "\tpartition {name} = query\n"
+    "\t\tdataSource: SqlDW\n"
+    "\t\tquery = SELECT * FROM [dbo].[{name}]\n"
+)
+
+
+def write_model(folder, model_name, table_count):
+    files = {
+        "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+        "definition/model.tmdl": "model Model\n\tculture: en-US\n",
+        "definition/dataSources.tmdl": (
+            "dataSource SqlDW = provider\n"
+            "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+        ),
+    }
+    for index in range(table_count):
+        files[f"definition/tables/T{index}.tmdl"] = TABLE.format(name=f"T{index}")
+    for relative_path, content in files.items():
+        path = folder / model_name / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def read_tree(folder):
+    return {
+        str(path.relative_to(folder)): path.read_bytes() for path in folder.rglob("*")
+        if path.is_file() and not path.name.startswith(".conversion_")
+    }
+
+
+def test_models_are_assigned_by_weight_and_the_same_way_everywhere():
+    weights = {"A.SemanticModel": 9, "B.SemanticModel": 5, "C.SemanticModel": 4, "D.SemanticModel": 1}
+
+    shards = assign_shards(weights, 2)
+
+    assert shards == assign_shards(dict(reversed(list(weights.items()))), 2)
+    assert shards["A.SemanticModel"] != shards["B.SemanticModel"] == shards["C.SemanticModel"]
+    assert sorted(set(assign_shards(weights, 4).values())) == [1, 2, 3, 4]
+    assert parse_shard("2/4") == (2, 4)
+    for text in ("0/4", "5/4", "1", "a/b", "1/0"):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_merged_shards_match_a_single_run(tmp_path):
+    for name, table_count in (("Sales", 6), ("Finance", 3), ("HR", 2), ("Ops", 1)):
+        write_model(tmp_path / "in", f"{name}.SemanticModel", table_count)
+    write_model(tmp_path / "in" / "nested", "Inner.SemanticModel", 2)
+    run(str(tmp_path / "in"), str(tmp_path / "single"), DEFAULT_REPORT_PATH)
+
+    shard_paths = []
+    for index in (1, 2, 3):
+        shard_path = tmp_path / f"shard-{index}"
+        metrics = run(str(tmp_path / "in"), str(shard_path), DEFAULT_REPORT_PATH, shard=(index, 3))
+        metrics.write_report(str(shard_path / ".conversion_report.json"))
+        shard_paths.append(str(shard_path))
+
+    with pytest.raises(ShardError):
+        merge_shards(shard_paths[:2], str(tmp_path / "merged"), ".conversion_report.json")
+    report = merge_shards(shard_paths, str(tmp_path / "merged"), ".conversion_report.json")
+
+    assert read_tree(tmp_path / "merged") == read_tree(tmp_path / "single")
+    with open(tmp_path / "merged" / MANIFEST_FILE_NAME, encoding="utf-8") as f:
+        merged_manifest = json.load(f)
+    with open(tmp_path / "single" / MANIFEST_FILE_NAME, encoding="utf-8") as f:
+        assert merged_manifest == json.load(f)
+    assert list(report["shards"]) == ["1/3", "2/3", "3/3"]
+    assert report["counters"]["files_failed"] == 0
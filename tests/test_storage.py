@@ -0,0 +1,80 @@
+import functools
+
+import pytest
+
+import utils
+from config import validate_config, ConfigError
+from filesystem import MemoryFileSystem
+from storage import find_storage_mode
+from streaming import iter_line_parts
+
+
+CONFIG = validate_config({
+    "storageModes": {
+        "default": "Dual",
+        "rules": [{"tables": "Fact*", "mode": "directquery"}]
+    },
+    "incrementalRefresh": {"rules": [{"tables": "*", "dateColumn": "Date"}]}
+})
+
+TABLE = (
+    "table {name}\n"
+    "\tcolumn Date\n"
+    "\t\tdataType: dateTime\n"
+    "\t\tsourceColumn: OrderDate\n"
+    "\n"
+    "\tcolumn Amount\n"
+    "\t\tsourceColumn: Amount\n"
+    "\n"
+    "\tpartition {name} = query\n"
+    "{mode}"
+    "\t\tdataSource: SqlDW\n"
+    "\t\tquery = SELECT * FROM [sales].[Orders]\n"
+)
+
+DATA_SOURCES = {"sqldw": ("sqlsrv01", "DW", None)}
+
+
+def convert(name, mode=""):
+    content = TABLE.format(name=name, mode=mode)
+    dest = MemoryFileSystem()
+    expressions = {}
+    utils.convert_table(MemoryFileSystem({"T.tmdl": content}), dest, "T.tmdl", False, DATA_SOURCES, CONFIG, expressions)
+    return dest.files["T.tmdl"].decode("utf-8"), expressions
+
+
+def test_rule_then_original_mode_then_default():
+    assert find_storage_mode(CONFIG, "FactSales", "import") == "directQuery"
+    assert find_storage_mode(CONFIG, "Customer", " Import") == "import"
+    assert find_storage_mode(CONFIG, "Customer", "default") == "dual"
+    assert find_storage_mode(None, "FactSales", "directQuery") == "import"
+    with pytest.raises(ConfigError):
+        validate_config({"storageModes": {"rules": [{"tables": "*", "mode": "push"}]}})
+
+
+def test_direct_query_partition_reads_the_table_through_the_navigation():
+    content, expressions = convert("FactSales")
+    assert "mode: directQuery\n" in content
+    assert 'Data = Source{[Schema="sales", Item="FactSales"]}[Data],' in content
+    assert 'Table.SelectColumns(Data, {"OrderDate", "Amount"}),' in content
+    assert 'Renamed = Table.RenameColumns(Columns, {{"OrderDate", "Date"}})\n            in\n                Renamed' in content
+    # The incremental refresh only applies to imported tables
+    assert "refreshPolicy" not in content and expressions == {}
+
+
+def test_import_mode_from_the_original_partition():
+    content, expressions = convert("Customer", "\t\tmode: import\n")
+    assert "mode: import\n" in content and "[Query = " in content
+    assert "refreshPolicy" in content and set(expressions) == {"RangeStart", "RangeEnd"}
+
+
+@pytest.mark.parametrize("mode", ["", "\t\tmode: import\n"])
+def test_stream_table_file_chooses_the_same_mode(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(utils, "iter_line_parts", functools.partial(iter_line_parts, chunk_size=40))
+    source_file = tmp_path / "T.tmdl"
+    source_file.write_text(TABLE.format(name="Customer", mode=mode), encoding="utf-8")
+    dest_file = tmp_path / "out" / "T.tmdl"
+
+    utils.stream_table_file(str(source_file), str(dest_file), False, DATA_SOURCES, "None", CONFIG, {})
+
+    assert dest_file.read_text(encoding="utf-8") == convert("Customer", mode)[0]
@@ -0,0 +1,139 @@
+import functools
+import io
+import json
+import re
+
+import pytest
+
+import utils
+from filesystem import MemoryFileSystem
+from streaming import JsonFieldExtractor, RollingSearch, iter_line_parts
+
+
+TABLE_SCHEMA = {
+    "Columns": [{"Name": "A]}\"[{", "Description": "x\\\"y"}, {"Name": "B", "Nested": {"Name": "no"}}],
+    "Name": "Orders",
+    "Schema": "dbo",
+    "Extra": [[], {}, "Database"],
+    "Database": "Shop"
+}
+
+STANDARD_TABLE = (
+    "table 'Sales Data'\n"
+    "\tlineageTag: 1\n"
+    "\n"
+    "\tmeasure 'Total' = SUM('Sales Data'[Amount])\n"
+    "\n"
+    "\tcolumn Amount\n"
+    "\t\tdataType: decimal\n"
+    "\t\tsourceProviderType: decimal\n"
+    "\t\tsourceColumn: Amount\n"
+    "\n"
+    "\tcolumn 'Customer Key'\n"
+    "\t\tsourceColumn: CustomerKey\n"
+    "\n"
+    "\tpartition 'Sales Data' = query\n"
+    "\t\tdataSource: SqlDW\n"
+    "\t\tquery =\n"
+    "\t\t\t\tSELECT *\n"
+    "\t\t\t\tFROM   [dbo].[FactSales]\n"
+    "\n"
+    "\tannotation PBI_ResultType = Table\n"
+)
+
+TABULAR_EDITOR_TABLE = (
+    "table Orders\n"
+    "\tcolumn OrderId\n"
+    "\t\tsourceColumn: OrderId\n"
+    "\n"
+    "\tpartition Orders = query\n"
+    "\t\tdataSource: 'srv03 Shop'\n"
+    "\t\tquery = SELECT * FROM [dbo].[Orders]\n"
+    "\n"
+    "\tannotation TabularEditor_TableSchema = " + json.dumps(TABLE_SCHEMA) + "\n"
+)
+
+DATA_SOURCES = {"sqldw": ("sqlsrv01", "DW", "System.Data.SqlClient")}
+
+
+def test_json_field_extractor_split_at_every_position():
+    text = json.dumps(TABLE_SCHEMA)
+    for split in range(len(text) + 1):
+        extractor = JsonFieldExtractor(("Name", "Schema", "Database"))
+        extractor.feed(text[:split])
+        extractor.feed(text[split:])
+        assert extractor.result() == {"Name": "Orders", "Schema": "dbo", "Database": "Shop"}
+
+
+def test_json_field_extractor_one_character_at_a_time():
+    extractor = JsonFieldExtractor(("Name",))
+    for char in json.dumps(TABLE_SCHEMA, indent=1):
+        extractor.feed(char)
+    assert extractor.result() == {"Name": "Orders"}
+
+
+def test_json_field_extractor_incomplete_object():
+    extractor = JsonFieldExtractor(("Name",))
+    extractor.feed('{"Name": "Orders"')
+    with pytest.raises(ValueError):
+        extractor.result()
+
+
+def test_rolling_search_match_across_pieces():
+    search = RollingSearch(utils.QUERY_FROM_PATTERN, overlap=64)
+    for piece in ["SELECT * FR", "OM [dbo", "].[Fact", "Sales] WHERE 1 = 1"] + ["x" * 10] * 20:
+        search.feed(piece)
+    assert search.match.groups() == ("dbo", "FactSales")
+    assert not search.empty
+
+
+def test_iter_line_parts_splits_long_lines():
+    parts = []
+    for head, rest in iter_line_parts(io.StringIO("short\n" + "y" * 25 + "\nend"), chunk_size=10):
+        parts.append((head, None if rest is None else "".join(rest)))
+    assert parts == [("short\n", None), ("y" * 10, "y" * 15 + "\n"), ("end", None)]
+
+
+def convert_in_memory(content, tabular_editor):
+    source = MemoryFileSystem({"T.tmdl": content})
+    dest = MemoryFileSystem()
+    error = utils.convert_table(source, dest, "T.tmdl", tabular_editor, DATA_SOURCES)
+    return dest.files["T.tmdl"].decode("utf-8"), error
+
+
+@pytest.mark.parametrize("chunk_size", [65536, 64, 40])
+@pytest.mark.parametrize("content, tabular_editor", [
+    (STANDARD_TABLE, False),
+    (TABULAR_EDITOR_TABLE, True),
+    (TABULAR_EDITOR_TABLE.replace('"Database": "Shop"', '"Database": null'), True),
+    (TABULAR_EDITOR_TABLE.replace("table Orders", "table Orders\n\tcalculationGroup\n"), True),
+])
+def test_stream_table_file_matches_in_memory_conversion(tmp_path, monkeypatch, chunk_size, content, tabular_editor):
+    monkeypatch.setattr(utils, "iter_line_parts", functools.partial(iter_line_parts, chunk_size=chunk_size))
+    source_file = tmp_path / "in" / "T.tmdl"
+    source_file.parent.mkdir()
+    source_file.write_text(content, encoding="utf-8")
+    dest_file = tmp_path / "out" / "T.tmdl"
+
+    error = utils.stream_table_file(str(source_file), str(dest_file), tabular_editor, DATA_SOURCES, "None")
+
+    assert (dest_file.read_text(encoding="utf-8"), error) == convert_in_memory(content, tabular_editor)
+
+
+def test_stream_table_file_leaves_no_file_on_error(tmp_path):
+    source_file = tmp_path / "T.tmdl"
+    source_file.write_bytes(b"table T\n\tcolumn A\n\t\tsourceColumn: \xff\n")
+    dest_folder = tmp_path / "out"
+
+    with pytest.raises(UnicodeDecodeError):
+        utils.stream_table_file(str(source_file), str(dest_folder / "T.tmdl"), False, DATA_SOURCES)
+    assert list(dest_folder.iterdir()) == []
+
+
+def test_standard_table_conversion():
+    content, error = convert_in_memory(STANDARD_TABLE, False)
+    assert error is None
+    assert "sourceProviderType" not in content
+    assert re.search(r'Sql\.Database\("sqlsrv01", "DW"', content)
+    # The schema comes from the query, the table name from the declaration
+    assert "FROM [dbo].[Sales Data]" in content
@@ -0,0 +1,85 @@
+from tmdl import parse_tmdl, tokenize_tmdl, unquote_name
+
+
+def kinds(text):
+    return [(line.kind, line.keyword) for line in tokenize_tmdl(text.splitlines(keepends=True))]
+
+
+def test_quoted_names():
+    document = parse_tmdl(
+        "table 'Sales Data'\n"
+        "\tcolumn 'It''s = here'\n"
+        "\t\tsourceColumn: x\n"
+    )
+    table = document.find("table")
+    column = document.find("column")
+    assert table.name == "Sales Data"
+    assert column.name == "It's = here"
+    assert column.parent is table
+    assert column.properties["sourceColumn"] == "x"
+    assert unquote_name("'a''b'") == "a'b"
+
+
+def test_multi_line_expression_is_not_tokenized():
+    text = (
+        "table T\n"
+        "\tpartition P = m\n"
+        "\t\tmode: import\n"
+        "\t\tsource =\n"
+        "\t\t\t\tlet\n"
+        "\t\t\t\t\tcolumn: 1,\n"
+        "\t\t\t\t\ttable X = 2\n"
+        "\t\t\t\tin\n"
+        "\t\t\t\t\tX\n"
+        "\n"
+        "\tcolumn A\n"
+    )
+    document = parse_tmdl(text)
+    partition = document.find("partition")
+    assert partition.properties["mode"] == "import"
+    assert "column: 1," in partition.properties["source"]
+    assert "table X = 2" in partition.properties["source"]
+    assert [node.keyword for node in document.iter_nodes()] == ["table", "partition", "column"]
+    assert "".join(line.text for line in document.lines) == text
+
+
+def test_object_expression_on_next_lines():
+    document = parse_tmdl(
+        "table T\n"
+        "\tmeasure M =\n"
+        "\t\t\tVAR x = 1\n"
+        "\t\t\tRETURN x\n"
+        "\t\tformatString: 0\n"
+    )
+    measure = document.find("measure")
+    assert "RETURN x" in measure.value
+    assert measure.properties == {"formatString": "0"}
+
+
+def test_fenced_expression():
+    text = (
+        "table T\n"
+        "\tmeasure M = ```\n"
+        "column: not a property\n"
+        "\t\tpartition X = m\n"
+        "\t\t\t```\n"
+        "\tcolumn A\n"
+    )
+    assert kinds(text) == [
+        ("object", "table"),
+        ("object", "measure"),
+        ("expression", None),
+        ("expression", None),
+        ("expression", None),
+        ("object", "column"),
+    ]
+
+
+def test_fenced_expression_on_one_line():
+    assert kinds("\tmeasure M = ```1 + 1```\n\tcolumn A\n") == [("object", "measure"), ("object", "column")]
+
+
+def test_ref_lines():
+    document = parse_tmdl("model Model\n\tculture: en-US\n\nref table 'Sales Data'\nref cultureInfo en-US\n")
+    refs = list(document.iter_nodes("ref"))
+    assert [ref.name for ref in refs] == ["table 'Sales Data'", "cultureInfo en-US"]
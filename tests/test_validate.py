@@ -0,0 +1,93 @@
+import json
+
+from validate import validate_output, write_validation_report
+
+
+MODEL_FILES = {
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\nref table Sales\nref table Customer\n",
+    "definition/relationships.tmdl": (
+        "relationship 1a2b\n"
+        "\tfromColumn: Sales.CustomerKey\n"
+        "\ttoColumn: Customer.CustomerKey\n"
+    ),
+    "definition/tables/Sales.tmdl": (
+        "table Sales\n"
+        "\tmeasure Total = SUM(Sales[Amount])\n"
+        "\n"
+        "\tcolumn Amount\n"
+        "\t\tsourceColumn: Amount\n"
+        "\n"
+        "\tcolumn CustomerKey\n"
+        "\t\tsourceColumn: CustomerKey\n"
+        "\n"
+        "\tpartition Sales = m\n"
+        "\t\tmode: import\n"
+        "\t\tsource = ```\n"
+        "\t\t\t\tlet\n"
+        '\t\t\t\t\tSource = Sql.Database(Server, Database, [Query="SELECT [Amount], [CustomerKey] FROM [dbo].[Sales]"])\n'
+        "\t\t\t\tin\n"
+        "\t\t\t\t\tSource\n"
+        "\t\t\t\t```\n"
+    ),
+    "definition/tables/Customer.tmdl": (
+        "table Customer\n"
+        "\tcolumn CustomerKey\n"
+        "\t\tsourceColumn: CustomerKey\n"
+        "\n"
+        "\tcolumn 'Month Name'\n"
+        "\t\tsortByColumn: Month\n"
+        "\t\tsourceColumn: MonthName\n"
+        "\n"
+        "\tcolumn Month\n"
+        "\t\tsourceColumn: Month\n"
+        "\n"
+        "\thierarchy Calendar\n"
+        "\t\tlevel Month\n"
+        "\t\t\tcolumn: 'Month Name'\n"
+    ),
+}
+
+
+def write_model(folder, files):
+    for relative_path, content in files.items():
+        path = folder / "Model.SemanticModel" / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def test_a_consistent_model_has_no_issues(tmp_path):
+    write_model(tmp_path, MODEL_FILES)
+
+    report = validate_output(str(tmp_path))
+
+    assert report["issues"] == []
+    assert report["models"] == {"Model.SemanticModel": {"tables": 2, "columns": 5, "measures": 1, "relationships": 1}}
+
+
+def test_dangling_references_are_reported(tmp_path):
+    files = dict(MODEL_FILES)
+    files["definition/model.tmdl"] += "ref table Audit\n"
+    files["definition/relationships.tmdl"] = files["definition/relationships.tmdl"].replace(
+        "Customer.CustomerKey", "Customer.CustomerId"
+    )
+    files["definition/tables/Customer.tmdl"] = files["definition/tables/Customer.tmdl"].replace(
+        "\tcolumn Month\n\t\tsourceColumn: Month\n\n", ""
+    )
+    files["definition/tables/Sales.tmdl"] = files["definition/tables/Sales.tmdl"].replace(
+        "SELECT [Amount], [CustomerKey] FROM", "SELECT  FROM"
+    )
+    write_model(tmp_path, files)
+
+    report = validate_output(str(tmp_path))
+
+    assert sorted((issue["check"], issue["file"]) for issue in report["issues"]) == [
+        ("empty-query", "definition/tables/Sales.tmdl"),
+        ("ref-table", "definition/model.tmdl"),
+        ("relationship-column", "definition/relationships.tmdl"),
+        ("sort-by-column", "definition/tables/Customer.tmdl"),
+    ]
+    assert all(issue["model"] == "Model.SemanticModel" for issue in report["issues"])
+
+    report_file = tmp_path / "validation.json"
+    write_validation_report(report, str(report_file))
+    assert json.loads(report_file.read_text(encoding="utf-8")) == report
@@ -0,0 +1,93 @@
+import os
+import shutil
+
+from manifest import load_manifest
+from process import run
+from watch import WatchSession, split_model_path
+
+
+DEFAULT_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "Default.Report")
+
+FILES = {
+    "definition/database.tmdl": "database Model\n\tcompatibilityLevel: 1500\n",
+    "definition/model.tmdl": "model Model\n\tculture: en-US\n\nref table Sales\nref table Customer\n",
+    "definition/dataSources.tmdl": (
+        "dataSource SqlDW = provider\n"
+        "\tconnectionString: Data Source=sqlsrv01;Initial Catalog=DW\n"
+    ),
+    "definition/tables/Sales.tmdl": (
+        "table Sales\n"
+        "\tcolumn Amount\n"
+        "\t\tsourceColumn: Amount\n"
+        "\n"
+        "\tpartition Sales = query\n"
+        "\t\tdataSource: SqlDW\n"
+        "\t\tquery = SELECT * FROM [dbo].[Sales]\n"
+    ),
+    "definition/tables/Customer.tmdl": "table Customer\n\tcolumn Name\n\t\tsourceColumn: Name\n",
+}
+
+
+def write_model(folder):
+    for relative_path, content in FILES.items():
+        path = folder / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def start_session(tmp_path):
+    write_model(tmp_path / "in" / "Sales.SemanticModel")
+    write_model(tmp_path / "in" / "Other.SemanticModel")
+    run(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+    return WatchSession(str(tmp_path / "in"), str(tmp_path / "out"), DEFAULT_REPORT_PATH)
+
+
+def test_paths_are_split_by_model(tmp_path):
+    path = os.path.join(str(tmp_path), "sales", "Sales.SemanticModel", "definition", "model.tmdl")
+    assert split_model_path(str(tmp_path), path) == (
+        os.path.join("sales", "Sales.SemanticModel"), "definition/model.tmdl"
+    )
+    assert split_model_path(str(tmp_path), os.path.join(str(tmp_path), "README.md")) == (None, None)
+
+
+def test_saved_tables_are_converted_and_deleted_files_removed(tmp_path):
+    session = start_session(tmp_path)
+    tables = tmp_path / "in" / "Sales.SemanticModel" / "definition" / "tables"
+    (tables / "Sales.tmdl").write_text(FILES["definition/tables/Sales.tmdl"].replace("Amount", "Total"), encoding="utf-8")
+    (tables / "Customer.tmdl").unlink()
+
+    failures = session.apply_changes({str(tables / "Sales.tmdl"), str(tables / "Customer.tmdl")})
+
+    assert failures == {"Sales.SemanticModel": {}}
+    output_tables = tmp_path / "out" / "Sales.SemanticModel" / "definition" / "tables"
+    assert "[Total] AS [Total]" in (output_tables / "Sales.tmdl").read_text(encoding="utf-8")
+    assert not (output_tables / "Customer.tmdl").exists()
+    entry = load_manifest(str(tmp_path / "out"))["models"]["Sales.SemanticModel"]
+    assert "definition/tables/Customer.tmdl" not in entry["files"]
+    assert entry["stats"]["definition/tables/Sales.tmdl"][0] == (tables / "Sales.tmdl").stat().st_size
+
+
+def test_deleted_models_are_removed_with_their_report(tmp_path):
+    session = start_session(tmp_path)
+    shutil.rmtree(tmp_path / "in" / "Other.SemanticModel")
+
+    failures = session.apply_changes({str(tmp_path / "in" / "Other.SemanticModel")})
+
+    assert failures == {"Other.SemanticModel": {}}
+    assert not (tmp_path / "out" / "Other.SemanticModel").exists()
+    assert not (tmp_path / "out" / "Other.Report").exists()
+    assert (tmp_path / "out" / "Sales.Report").is_dir()
+    assert list(load_manifest(str(tmp_path / "out"))["models"]) == ["Sales.SemanticModel"]
+
+
+def test_rescan_records_the_file_stats(tmp_path):
+    session = start_session(tmp_path)
+    shutil.rmtree(tmp_path / "in" / "Other.SemanticModel")
+    write_model(tmp_path / "in" / "New.SemanticModel")
+
+    assert session.rescan() == {"New.SemanticModel": {}, "Other.SemanticModel": {}}
+
+    models = load_manifest(str(tmp_path / "out"))["models"]
+    assert sorted(models) == ["New.SemanticModel", "Sales.SemanticModel"]
+    assert sorted(models["New.SemanticModel"]["stats"]) == sorted(FILES)
+    assert (tmp_path / "out" / "New.Report").is_dir() and not (tmp_path / "out" / "Other.Report").exists()